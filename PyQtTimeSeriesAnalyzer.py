@@ -3,11 +3,12 @@ PyQtTimeSeriesAnalyzer.py
 
 Very much still a work in progress.
 
+The data model and analysis in this module do not depend on Qt (e.g., for batch processing, see TimeSeriesAnalyzer).
+The UI is in PyQtTimeSeriesAnalyzerGUI.py, which is only imported once any of it is used (e.g., QtTimeSeriesAnalyzer, run).
+Running this file with data files batch processes them without the UI (see main or python PyQtTimeSeriesAnalyzer.py -h).
+
 TODO:
-- reimplement measurements in ViewBox
-- reimplement curve fitting in ViewBox
 - fix delete series group error ???
-- zero, interpolate, mask
 - link ROIs across plots
 - edit x, y data in new popup table view
 - add series, attr via table view
@@ -25,55 +26,42 @@ __author__ = "Marcel P. Goldschen-Ohm"
 __author_email__ = "goldschen-ohm@utexas.edu, marcel.goldschen@gmail.com"
 
 
-import sys, os, re, ast, copy
+import sys, os, re, ast, csv, glob, json, time, argparse, functools, importlib, contextlib, collections, threading, weakref, multiprocessing
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
-import scipy as sp
-from PyQt5.QtCore import *
-from PyQt5.QtGui import *
-from PyQt5.QtWidgets import *
-import pyqtgraph as pg
-
-# OPTIONAL: For some nice icons. Highly recommended.
-try:
-    # https://github.com/spyder-ide/qtawesome
-    import qtawesome as qta
-except ImportError:
-    qta = None
-
-# OPTIONAL: Only needed for fitting custom curve equations.
-try:
-    import lmfit
-except ImportError:
-    lmfit = None
-
-# OPTIONAL: Interactive python console for the UI.
-# !!! The run() function in this module will probably provide a better console experience alongside the UI than pyqtconsole.
-try:
-    # https://github.com/pyqtconsole/pyqtconsole
-    from pyqtconsole.console import PythonConsole
-except ImportError:
-    PythonConsole = None
-
-# OPTIONAL: For importing HEKA data files.
-try:
-    # https://github.com/campagnola/heka_reader
-    # e.g., Just put heka_reader.py in the same directory as this file.
-    import heka_reader
-except ImportError:
-    heka_reader = None
-
-
-pg.setConfigOption('background', (200, 200, 200))  # Default background for plots.
-pg.setConfigOption('foreground', (0, 0, 0))   # Default foreground color for text, lines, axes, etc.
+import scipy as sp  # submodules (e.g., sp.io) are only imported on first use
+
+# OPTIONAL dependencies are only imported on first use (see _optionalImport), so that they do not slow down importing this module:
+# - lmfit: Only needed for fitting custom curve equations.
+# - h5py (https://www.h5py.org): For loading MATLAB v7.3 (HDF5) data files.
+# - heka_reader (https://github.com/campagnola/heka_reader): For importing HEKA data files.
+#   e.g., Just put heka_reader.py in the same directory as this file.
+
+
+@functools.lru_cache(maxsize=None)
+def _optionalImport(name):
+    """ Optional dependency module, or None if it is not installed. """
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
 
 
 def savemat(filepath, data):
+    # lazy and derived arrays have to be read in order to save them, missing (None) attributes are simply not saved
+    data = [_uniformAxisExpanded(series) for series in data]
+    data = [{key: np.asarray(value) if isinstance(value, (LazyArray, DerivedArray)) else value for key, value in series.items() if value is not None} for series in data]
     sp.io.savemat(filepath, {"data": data})
 
 def loadmat(filepath):
+    h5py = _optionalImport('h5py')
+    if h5py is not None and h5py.is_hdf5(filepath):
+        # MATLAB v7.3
+        return loadmat73(filepath)
     mat = sp.io.loadmat(filepath)
     matdata = mat['data']
-    matdata = np.squeeze(matdata)  # (1,N) -> (N,)
+    matdata = np.squeeze(matdata).reshape(-1)  # (1,N) -> (N,), also for N = 1
     data = []
     for i in range(matdata.size):
         keys = matdata[i].dtype.names
@@ -90,103 +78,1346 @@ def loadmat(filepath):
         data.append(series)
     return data
 
+def loadmat73(filepath):
+    """
+    Load MATLAB v7.3 (HDF5) data file.
 
-class QtTimeSeriesAnalyzer(QWidget):
-    """ Viewer/Analyzer for a collection of time (ar any x,y) series. """
+    Only metadata and small arrays are read immediately.
+    Larger arrays (e.g., series x, y) are returned as LazyArray handles that are read from disk on first access.
+    The file is closed again before returning (LazyArray handles reopen it by filename when needed).
+    """
+    h5py = _optionalImport('h5py')
+    with h5py.File(filepath, 'r') as file:
+        data = _h5matvalue(file, file['data'])
+    if isinstance(data, dict):
+        data = [data]
+    return [series for series in data if isinstance(series, dict)]
+
+def _h5matvalue(file, obj):
+    """ Decode MATLAB v7.3 HDF5 object (MATLAB arrays are column major, so HDF5 dimensions are reversed). """
+    h5py = _optionalImport('h5py')
+    matlabClass = obj.attrs.get('MATLAB_class', b'')
+    if isinstance(matlabClass, bytes):
+        matlabClass = matlabClass.decode()
+    if isinstance(obj, h5py.Group):
+        fields = {key: obj[key] for key in obj.keys()}
+        isStructArray = fields and all(
+            isinstance(field, h5py.Dataset) and h5py.check_dtype(ref=field.dtype) is not None 
+            and 'MATLAB_class' not in field.attrs for field in fields.values())
+        if isStructArray:
+            # struct array -> list of dicts
+            refs = {key: field[()].ravel() for key, field in fields.items()}
+            numElements = min([len(fieldRefs) for fieldRefs in refs.values()])
+            return [{key: _h5matvalue(file, file[fieldRefs[i]]) for key, fieldRefs in refs.items()} for i in range(numElements)]
+        # struct -> dict
+        return {key: _h5matvalue(file, field) for key, field in fields.items()}
+    if obj.attrs.get('MATLAB_empty', 0):
+        if matlabClass == 'char':
+            return ''
+        elif matlabClass == 'cell':
+            return []
+        return np.array([])
+    if h5py.check_dtype(ref=obj.dtype) is not None:
+        # cell -> list
+        return [_h5matvalue(file, file[ref]) for ref in obj[()].ravel()]
+    if matlabClass == 'char':
+        return ''.join([chr(c) for c in obj[()].ravel()])
+    if obj.size >= LazyArray.minSize:
+        return LazyArray.fromDataset(obj, transpose=True, squeeze=True)
+    value = np.squeeze(obj[()].T)
+    if matlabClass == 'logical':
+        value = value.astype(bool)
+    if value.ndim == 0:
+        value = value.item()
+    return value
+
+
+def saveh5(filepath, data, append=False):
+    """
+    Save data to a native HDF5 file with chunked, compressed series arrays and a separate metadata index.
 
-    def __init__(self, parent=None):
-        QWidget.__init__(self, parent)
+    The metadata index holds one JSON record per series, so opening a file only reads the index
+    and series arrays are returned as LazyArray handles (see loadh5).
 
-        self.data = []
+    append=True adds the series to an existing file without touching what is already in it.
+    Otherwise, when saving back to the file the data was loaded from, arrays that are already in the file
+    are kept as is and only new or replaced arrays are written.
+    """
+    h5py = _optionalImport('h5py')
+    if h5py is None:
+        raise ImportError('Saving HDF5 files requires h5py.')
+    isNativeFile = isNativeh5(filepath)
+    if not isNativeFile:
+        # the file is about to be overwritten, so read anything still stored in it (into copies of the series dicts,
+        # the handles keep the arrays in memory so they remain valid)
+        data = [dict(series) for series in data]
+        for series in data:
+            for key, value in series.items():
+                if isinstance(value, LazyArray) and _isSameFile(value.filename, filepath):
+                    series[key] = value._array = np.array(value)
+    with h5py.File(filepath, 'a' if isNativeFile else 'w') as file:
+        if not isNativeFile:
+            file.attrs['format'] = 'PyQtTimeSeriesAnalyzer'
+            file.attrs['version'] = 1
+            file.attrs['nextSeriesId'] = 0
+            file.create_dataset('metadata', shape=(0,), maxshape=(None,), chunks=(1024,), dtype=h5py.string_dtype())
+            file.create_group('arrays')
+        metadata = file['metadata']
+        arrays = file['arrays']
+        nextSeriesId = int(file.attrs['nextSeriesId'])
+        keptArrayGroups = set()
+        records = []
+        for series in data:
+            series = _uniformAxisExpanded(series)
+            record = {}
+            seriesId = None
+            for key, value in series.items():
+                if isinstance(value, LazyArray) and value.name.startswith('/arrays/') \
+                and _isSameFile(value.filename, filepath):
+                    # already stored in this file
+                    record[key] = {'__array__': value.name, 'shape': list(value.shape), 'dtype': value.dtype.str}
+                    keptArrayGroups.add(value.name.split('/')[2])
+                elif isinstance(value, (np.ndarray, LazyArray, DerivedArray)) and np.ndim(value) > 0:
+                    if seriesId is None:
+                        seriesId = str(nextSeriesId)
+                        nextSeriesId += 1
+                        arrays.require_group(seriesId)
+                    value = np.asarray(value)
+                    if value.size > 0:
+                        chunks = (min(len(value), 65536),) if value.ndim == 1 else True
+                        dataset = arrays[seriesId].create_dataset(key, data=value, chunks=chunks, compression='lzf', shuffle=True)
+                    else:
+                        dataset = arrays[seriesId].create_dataset(key, data=value)
+                    record[key] = {'__array__': dataset.name, 'shape': list(value.shape), 'dtype': value.dtype.str}
+                else:
+                    record[key] = value
+            records.append(json.dumps(record, default=_h5jsonvalue))
+        if append:
+            start = len(metadata)
+        else:
+            start = 0
+            # remove arrays of series that are no longer in the data
+            for seriesId in list(arrays.keys()):
+                if seriesId not in keptArrayGroups and int(seriesId) < int(file.attrs['nextSeriesId']):
+                    del arrays[seriesId]
+        metadata.resize((start + len(records),))
+        if records:
+            metadata[start:] = records
+        file.attrs['nextSeriesId'] = nextSeriesId
+
+def loadh5(filepath):
+    """ Load data from a native HDF5 file (see saveh5). Series arrays are LazyArray handles that are read on first access. """
+    h5py = _optionalImport('h5py')
+    if h5py is None:
+        raise ImportError('Loading HDF5 files requires h5py.')
+    with h5py.File(filepath, 'r') as file:
+        records = file['metadata'].asstr()[()]
+    data = []
+    for record in records:
+        series = json.loads(record)
+        for key, value in series.items():
+            if isinstance(value, dict) and '__array__' in value:
+                series[key] = LazyArray(filepath, value['__array__'], value['shape'], value['dtype'])
+        data.append(series)
+    return data
 
-        self.initUI()
-        self.updateUI()
-    
-    def sizeHint(self):
-        return QSize(800, 600)
-    
-    def clear(self):
-        self.data = []
-        self.updateUI()
-    
-    def save(self, filepath=None):
-        if filepath is None:
-            filepath, _ = QFileDialog.getSaveFileName(self, "Save Data", "", "MATLAB Data Files (*.mat)")
-        if not filepath:
-            return
-        savemat(filepath, {"data": self.data})
+def isNativeh5(filepath) -> bool:
+    """ True if filepath is a native HDF5 file (see saveh5). """
+    h5py = _optionalImport('h5py')
+    if h5py is None or not os.path.isfile(filepath) or not h5py.is_hdf5(filepath):
+        return False
+    with h5py.File(filepath, 'r') as file:
+        return file.attrs.get('format') == 'PyQtTimeSeriesAnalyzer'
+
+def _isSameFile(filepath1, filepath2) -> bool:
+    # False if either file does not exist (yet)
+    return os.path.isfile(filepath1) and os.path.isfile(filepath2) and os.path.samefile(filepath1, filepath2)
+
+def _uniformAxisExpanded(series) -> dict:
+    # uniform x axis -> stored as sample interval x and start x0
+    x = series.get('x')
+    if not isinstance(x, UniformAxis):
+        return series
+    series = dict(series)
+    series['x'] = x.dx
+    series['x0'] = x.x0
+    return series
+
+def _h5jsonvalue(value):
+    # JSON encoding of values in series metadata records
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (np.ndarray, LazyArray, DerivedArray)):
+        return np.asarray(value).tolist()
+    raise TypeError(f'Cannot save {type(value).__name__} to HDF5 metadata.')
+
+
+class LazyArray(np.lib.mixins.NDArrayOperatorsMixin):
+    """
+    Handle to an array in an HDF5 file that is only read on first access.
 
-    def open(self, filepath=None, clear=True):
-        if filepath is None:
-            filepath, _ = QFileDialog.getOpenFileName(self, "Open Data", "", "MATLAB Data Files (*.mat)")
-        if not filepath or not os.path.isfile(filepath):
-            return
-        data = loadmat(filepath)
-        if clear:
-            self.data = data
-        else:
-            self.data.extend(data)
-        self.updateUI()
-    
-    def importHEKA(self, filepath=None, clear=True):
+    Contiguous uncompressed datasets are memory-mapped, so the OS pages in only what is actually used.
+    Other (e.g., chunked and compressed) datasets are read into memory on first access.
+    The file is not kept open in between, so it can be written to (e.g., appended) while handles to it exist.
+    Behaves enough like a numpy array (shape, dtype, len, indexing, arithmetic, np.asarray) to be used in place of one.
+    """
+
+    minSize = 1024  # smaller arrays are not worth the indirection
+
+    def __init__(self, filename, name, shape, dtype, offset=None, transpose=False):
         """
-        Import HEKA data file.
-
-        HEKA format:
-        ------------
-        Group (Experiment)
-            Series (Recording)
-                Sweep (Episode)
-                    Trace (Data Series for Channel A)
-                    Trace (Data Series for Channel B)
+        filename, name: HDF5 file and dataset path within it.
+        shape, dtype: of the dataset. If transpose=True, shape is reversed (e.g., for MATLAB column major arrays).
+        offset: byte offset of a contiguous uncompressed dataset in the file (memory-mapped), otherwise None.
         """
-        if heka_reader is None:
+        self.filename = filename
+        self.name = name
+        self._fileShape = tuple(shape)
+        self._transpose = transpose
+        self.shape = self._fileShape[::-1] if transpose else self._fileShape
+        self.dtype = np.dtype(dtype)
+        self._offset = offset
+        self._array = None
+
+    @classmethod
+    def fromDataset(cls, dataset, transpose=False, squeeze=False):
+        offset = None
+        if dataset.chunks is None and dataset.compression is None:
+            offset = dataset.id.get_offset()
+        array = cls(dataset.file.filename, dataset.name, dataset.shape, dataset.dtype, offset, transpose)
+        if squeeze:
+            array.shape = tuple([dim for dim in array.shape if dim != 1])
+        return array
+
+    def __repr__(self):
+        return f'LazyArray(shape={self.shape}, dtype={self.dtype}, loaded={self.isLoaded()})'
+
+    def __len__(self):
+        return self.shape[0]
+
+    @property
+    def ndim(self) -> int:
+        return len(self.shape)
+
+    @property
+    def size(self) -> int:
+        return int(np.prod(self.shape))
+
+    @property
+    def nbytes(self) -> int:
+        return self.size * self.dtype.itemsize
+
+    def isLoaded(self) -> bool:
+        return self._array is not None
+
+    def load(self) -> np.ndarray:
+        if self._array is None:
+            if self._offset is not None:
+                array = np.memmap(self.filename, dtype=self.dtype, mode='r', offset=self._offset, shape=self._fileShape)
+            else:
+                h5py = _optionalImport('h5py')
+                with h5py.File(self.filename, 'r') as file:
+                    array = file[self.name][()]
+            if self._transpose:
+                array = array.T
+            self._array = array.reshape(self.shape)
+        return self._array
+
+    def unload(self):
+        """ Release the array from memory. It will be read again on next access. """
+        self._array = None
+
+    def __array__(self, dtype=None, copy=None):
+        array = self.load()
+        if dtype is not None:
+            array = array.astype(dtype)
+        if copy:
+            array = array.copy()
+        return array
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        inputs = [np.asarray(value) if isinstance(value, LazyArray) else value for value in inputs]
+        return getattr(ufunc, method)(*inputs, **kwargs)
+
+    def __getitem__(self, key):
+        if self._array is None and self._offset is None and self.ndim == 1:
+            # read only the requested part of a 1D array
+            axis = self._fileShape.index(self.shape[0])
+            index = [0] * len(self._fileShape)
+            index[axis] = key
+            h5py = _optionalImport('h5py')
+            with h5py.File(self.filename, 'r') as file:
+                return file[self.name][tuple(index)]
+        return self.load()[key]
+
+    def __iter__(self):
+        return iter(self.load())
+
+
+class UniformAxis(np.lib.mixins.NDArrayOperatorsMixin):
+    """
+    Uniformly sampled axis x0 + dx * arange(size) that is only materialized as an array when needed.
+
+    Series store this as a scalar sample interval x with an optional start x0 instead of an x array (see seriesAttr).
+    Behaves enough like a 1D numpy array (len, indexing, searchsorted, arithmetic, np.asarray) to be used in place of one.
+    Slicing and arithmetic with scalars (e.g., unit conversion) return another UniformAxis without building the array.
+    """
+
+    def __init__(self, x0=0, dx=1, size=0):
+        self.x0 = x0
+        self.dx = dx
+        self.size = int(size)
+        self.dtype = np.result_type(np.asarray(x0), np.asarray(dx))
+
+    def __repr__(self):
+        return f'UniformAxis(x0={self.x0}, dx={self.dx}, size={self.size})'
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def shape(self) -> tuple:
+        return (self.size,)
+
+    @property
+    def ndim(self) -> int:
+        return 1
+
+    @property
+    def nbytes(self) -> int:
+        # of the materialized array
+        return self.size * self.dtype.itemsize
+
+    def __array__(self, dtype=None, copy=None):
+        array = self.x0 + np.arange(self.size) * self.dx
+        if dtype is not None:
+            array = array.astype(dtype)
+        return array
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        if method == '__call__' and not kwargs:
+            if len(inputs) == 1 and ufunc is np.negative:
+                return UniformAxis(-self.x0, -self.dx, self.size)
+            if len(inputs) == 2 and np.isscalar(inputs[1] if inputs[0] is self else inputs[0]):
+                # affine transforms of a uniform axis are still uniform
+                if inputs[0] is self:
+                    value = inputs[1]
+                    if ufunc is np.add:
+                        return UniformAxis(self.x0 + value, self.dx, self.size)
+                    elif ufunc is np.subtract:
+                        return UniformAxis(self.x0 - value, self.dx, self.size)
+                    elif ufunc is np.multiply:
+                        return UniformAxis(self.x0 * value, self.dx * value, self.size)
+                    elif ufunc is np.true_divide:
+                        return UniformAxis(self.x0 / value, self.dx / value, self.size)
+                else:
+                    value = inputs[0]
+                    if ufunc is np.add:
+                        return UniformAxis(value + self.x0, self.dx, self.size)
+                    elif ufunc is np.subtract:
+                        return UniformAxis(value - self.x0, -self.dx, self.size)
+                    elif ufunc is np.multiply:
+                        return UniformAxis(value * self.x0, value * self.dx, self.size)
+        inputs = [np.asarray(value) if isinstance(value, UniformAxis) else value for value in inputs]
+        return getattr(ufunc, method)(*inputs, **kwargs)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.size)
+            return UniformAxis(self.x0 + start * self.dx, self.dx * step, len(range(start, stop, step)))
+        if isinstance(key, (int, np.integer)):
+            if key < 0:
+                key += self.size
+            if not 0 <= key < self.size:
+                raise IndexError(f'index {key} is out of bounds for UniformAxis of size {self.size}')
+            return self.x0 + key * self.dx
+        key = np.asarray(key)
+        if key.dtype.kind in 'iu':
+            # sample indexes
+            if key.size and (key.min() < -self.size or key.max() >= self.size):
+                raise IndexError(f'index out of bounds for UniformAxis of size {self.size}')
+            return self.x0 + np.where(key < 0, key + self.size, key) * self.dx
+        return np.asarray(self)[key]
+
+    def __iter__(self):
+        return iter(np.asarray(self))
+
+    def min(self, *args, **kwargs):
+        if self.size == 0 or args or kwargs:
+            return np.asarray(self).min(*args, **kwargs)
+        return self[0] if self.dx >= 0 else self[-1]
+
+    def max(self, *args, **kwargs):
+        if self.size == 0 or args or kwargs:
+            return np.asarray(self).max(*args, **kwargs)
+        return self[-1] if self.dx >= 0 else self[0]
+
+    def searchsorted(self, v, side='left', sorter=None):
+        """ Same as np.searchsorted (which calls this), but computed directly for increasing axes. """
+        if self.dx <= 0 or sorter is not None:
+            return np.searchsorted(np.asarray(self), v, side, sorter)
+        v = np.asarray(v)
+        i = (v - self.x0) / self.dx
+        if side == 'left':
+            # first sample >= v
+            k = np.clip(np.ceil(i), 0, self.size).astype(int)
+            # correct for rounding
+            k -= (k > 0) & (self.x0 + (k - 1) * self.dx >= v)
+            k += (k < self.size) & (self.x0 + k * self.dx < v)
+        else:
+            # first sample > v
+            k = np.clip(np.floor(i) + 1, 0, self.size).astype(int)
+            k -= (k > 0) & (self.x0 + (k - 1) * self.dx > v)
+            k += (k < self.size) & (self.x0 + k * self.dx <= v)
+        return k if k.ndim else int(k)
+
+
+class SeriesList(list):
+    """ List of series dicts that reports structural changes to a callback. """
+
+    def __init__(self, iterable=(), onChanged=None):
+        list.__init__(self, iterable)
+        self._onChanged = onChanged
+
+    def _changed(self, start=None):
+        # start: index of the first appended series if series were only appended, otherwise None
+        if self._onChanged is not None:
+            self._onChanged(start)
+
+    def append(self, series):
+        start = len(self)
+        list.append(self, series)
+        self._changed(start)
+
+    def extend(self, iterable):
+        start = len(self)
+        list.extend(self, iterable)
+        self._changed(start)
+
+    def __iadd__(self, iterable):
+        self.extend(iterable)
+        return self
+
+    def __imul__(self, n):
+        list.__imul__(self, n)
+        self._changed()
+        return self
+
+    def __setitem__(self, index, value):
+        list.__setitem__(self, index, value)
+        self._changed()
+
+    def __delitem__(self, index):
+        list.__delitem__(self, index)
+        self._changed()
+
+    def insert(self, index, series):
+        list.insert(self, index, series)
+        self._changed()
+
+    def remove(self, series):
+        list.remove(self, series)
+        self._changed()
+
+    def pop(self, index=-1):
+        series = list.pop(self, index)
+        self._changed()
+        return series
+
+    def clear(self):
+        list.clear(self)
+        self._changed()
+
+    def sort(self, *args, **kwargs):
+        list.sort(self, *args, **kwargs)
+        self._changed()
+
+    def reverse(self):
+        list.reverse(self)
+        self._changed()
+
+
+class SeriesColumn:
+    """ Dictionary encoded column of series attribute values: a list of unique values and an array of codes. """
+
+    def __init__(self):
+        self.categories = []
+        self._lookup = {}
+        self._codes = np.zeros(0, dtype=np.int32)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def codes(self) -> np.ndarray:
+        return self._codes[:self._size]
+
+    def code(self, value, add=False) -> int:
+        """ Return code for value or -1 if value is not in the column (unless add=True). """
+        try:
+            key = value
+            code = self._lookup.get(key, -1)
+        except TypeError:
+            # unhashable value (e.g., list)
+            key = ('__unhashable__', type(value).__name__, repr(value))
+            code = self._lookup.get(key, -1)
+        if code == -1 and add:
+            code = len(self.categories)
+            self.categories.append(value)
+            self._lookup[key] = code
+        return code
+
+    def append(self, values):
+        codes = [self.code(value, add=True) for value in values]
+        n = self._size + len(codes)
+        if n > len(self._codes):
+            # amortized O(1) appends
+            buffer = np.zeros(max(n, 2 * len(self._codes), 64), dtype=np.int32)
+            buffer[:self._size] = self.codes
+            self._codes = buffer
+        self._codes[self._size:n] = codes
+        self._size = n
+
+    def set(self, row, value):
+        self._codes[row] = self.code(value, add=True)
+
+    def value(self, row):
+        return self.categories[self._codes[row]]
+
+    def values(self, rows=None) -> list:
+        codes = self.codes if rows is None else self.codes[rows]
+        categories = self.categories
+        return [categories[code] for code in codes]
+
+    def array(self, dtype=object, default=None, rows=None) -> np.ndarray:
+        """ Column values as an array of dtype with default in place of None. """
+        categories = np.array([default if value is None else value for value in self.categories] + [default], dtype=dtype)
+        codes = self.codes if rows is None else self.codes[rows]
+        return categories[codes]
+
+    def mask(self, values) -> np.ndarray:
+        """ Boolean mask of rows whose value is in values. """
+        codes = [self.code(value) for value in values]
+        codes = [code for code in codes if code != -1]
+        if not codes:
+            return np.zeros(self._size, dtype=bool)
+        return np.isin(self.codes, codes)
+
+    def unique(self, rows=None) -> list:
+        """ Unique values in order of first appearance. """
+        codes = self.codes if rows is None else self.codes[rows]
+        if len(codes) == 0:
+            return []
+        uniqueCodes, firstIndexes = np.unique(codes, return_index=True)
+        uniqueCodes = uniqueCodes[np.argsort(firstIndexes)]
+        return [self.categories[code] for code in uniqueCodes]
+
+
+class SeriesTable:
+    """
+    Columnar cache of series metadata kept in sync with a list of series dicts.
+
+    Each column is dictionary encoded so selection queries are vectorized NumPy masks over integer codes.
+    Columns are built on first use and extended incrementally as series are appended.
+    Any other change to the list or to the series dicts themselves requires invalidate() or seriesChanged().
+    """
+
+    # default value for series missing the attribute
+    defaults = {'group': 0, 'xlabel': '', 'ylabel': ''}
+
+    def __init__(self, data=None):
+        self._data = data if data is not None else []
+        self._columns = {}
+        self._rows = None
+
+        # default episode numbering is a pure function of the sequence of (group, name) buckets,
+        # so it survives invalidate() and is only recomputed if that sequence changes
+        self._episodes = None
+        self._uniqueEpisodes = None
+        self._episodeBuckets = np.zeros(0, dtype=np.int64)
+        self._defaultEpisodes = np.zeros(0, dtype=np.int64)
+        self._episodeBucketCounts = {}
+
+    def __len__(self):
+        return len(self._data)
+
+    def setData(self, data):
+        self._data = data
+        self.invalidate()
+
+    def invalidate(self):
+        self._columns = {}
+        self._rows = None
+        self._episodes = None
+
+    def appended(self, start):
+        """ Series were appended to the list starting at index start. Columns are extended on next use. """
+        if any(len(column) > start for column in self._columns.values()):
+            self.invalidate()
             return
-        if filepath is None:
-            filepath, _ = QFileDialog.getOpenFileName(self, "Open HEKA File", "", "HEKA Data Files (*.dat)")
-        if not filepath or not os.path.isfile(filepath):
+        self._episodes = None
+        if self._rows is not None:
+            for row in range(start, len(self._data)):
+                self._rows[id(self._data[row])] = row
+
+    def seriesChanged(self, row, attr):
+        """ The value of attr was changed for the series at index row. """
+        if attr in ['episode', 'group', 'name']:
+            self._episodes = None
+        column = self._columns.get(attr)
+        if column is None:
             return
-        bundle = heka_reader.Bundle(filepath)
-        numHekaGroups = len(bundle.pul)
-        if numHekaGroups == 0:
+        if row >= len(column):
+            self._extendColumn(attr)
             return
-        elif numHekaGroups == 1:
-            hekaGroupIndex = 0
-        elif numHekaGroups > 1:
-            # choose a group (experiment) to load
-            hekaGroupNames = [bundle.pul[i].Label for i in range(numHekaGroups)]
-            hekaGroupNamesListWidget = QListWidget()
-            hekaGroupNamesListWidget.addItems(hekaGroupNames)
-            hekaGroupNamesListWidget.setSelectionMode(QAbstractItemView.SingleSelection)
-            hekaGroupNamesListWidget.setSelected(hekaGroupNamesListWidget.item(0), True)
-            dlg = QDialog()
-            dlg.setWindowTitle("Choose Recording")
-            buttonBox = QDialogButtonBox()
-            buttonBox.setStandardButtons(QDialogButtonBox.Cancel | QDialogButtonBox.Ok)
-            buttonBox.accepted.connect(dlg.accept)
-            buttonBox.rejected.connect(dlg.reject)
-            dlg.setWindowModality(Qt.ApplicationModal)
-            if dlg.exec_():
-                hekaGroupIndex = hekaGroupNamesListWidget.selectedIndexes()[0].row()
+        series = self._data[row]
+        column.set(row, series[attr] if attr in series else self.defaults.get(attr))
+
+    def column(self, attr) -> SeriesColumn:
+        column = self._columns.get(attr)
+        if column is None or len(column) > len(self._data):
+            column = self._columns[attr] = SeriesColumn()
+        if len(column) < len(self._data):
+            self._extendColumn(attr)
+        return column
+
+    def _extendColumn(self, attr):
+        column = self._columns[attr]
+        default = self.defaults.get(attr)
+        column.append([series[attr] if attr in series else default for series in self._data[len(column):]])
+
+    def row(self, series: dict) -> int:
+        """ Index of series dict in the list. """
+        if self._rows is None or len(self._rows) != len(self._data):
+            self._rows = {id(series_): i for i, series_ in enumerate(self._data)}
+        return self._rows[id(series)]
+
+    def episodes(self) -> np.ndarray:
+        """
+        Episode of every series as an integer array (float if any episode is not a whole number, so they are not truncated).
+
+        Series without an episode attribute are numbered by their order within all series having the same group and name.
+        """
+        if self._episodes is not None and len(self._episodes) == len(self._data):
+            return self._episodes
+        episodeColumn = self.column('episode')
+        values = [episodeColumn.categories[code] for code in np.unique(episodeColumn.codes)]
+        isWhole = all([float(value).is_integer() for value in values if value is not None])
+        episodes = episodeColumn.array(dtype=np.int64 if isWhole else float, default=0)
+        missingCode = episodeColumn.code(None)
+        if missingCode != -1:
+            missing = episodeColumn.codes == missingCode
+            episodes[missing] = self._defaultEpisodeArray()[missing]
+        self._episodes = episodes
+        self._uniqueEpisodes = None
+        return episodes
+
+    def uniqueEpisodes(self) -> list:
+        """ Sorted list of unique episodes. """
+        episodes = self.episodes()
+        if self._uniqueEpisodes is None:
+            self._uniqueEpisodes = np.unique(episodes).tolist()
+        return self._uniqueEpisodes
+
+    def _defaultEpisodeArray(self) -> np.ndarray:
+        """ Order of every series within its (group, name) bucket. """
+        buckets = (self.column('group').codes.astype(np.int64) << 32) | self.column('name').codes
+        n = len(self._episodeBuckets)
+        if n <= len(buckets) and np.array_equal(buckets[:n], self._episodeBuckets):
+            # only need to number appended series
+            counts = self._episodeBucketCounts
+            newDefaults = np.zeros(len(buckets) - n, dtype=np.int64)
+            for i, bucket in enumerate(buckets[n:].tolist()):
+                newDefaults[i] = counts.get(bucket, 0)
+                counts[bucket] = newDefaults[i] + 1
+            self._defaultEpisodes = np.concatenate([self._defaultEpisodes, newDefaults])
+        else:
+            # series were removed, reordered or regrouped, so renumber all of them
+            order = np.argsort(buckets, kind='stable')
+            sortedBuckets = buckets[order]
+            isBucketStart = np.ones(len(buckets), dtype=bool)
+            isBucketStart[1:] = sortedBuckets[1:] != sortedBuckets[:-1]
+            bucketStarts = np.flatnonzero(isBucketStart)
+            bucketSizes = np.diff(np.append(bucketStarts, len(buckets)))
+            defaults = np.zeros(len(buckets), dtype=np.int64)
+            defaults[order] = np.arange(len(buckets)) - np.repeat(bucketStarts, bucketSizes)
+            self._defaultEpisodes = defaults
+            self._episodeBucketCounts = dict(zip(sortedBuckets[bucketStarts].tolist(), bucketSizes.tolist()))
+        self._episodeBuckets = buckets.copy()
+        return self._defaultEpisodes
+
+    def values(self, attr, rows=None) -> list:
+        return self.column(attr).values(rows)
+
+    def mask(self, attr, values) -> np.ndarray:
+        return self.column(attr).mask(values)
+
+    def unique(self, attr, rows=None) -> list:
+        return self.column(attr).unique(rows)
+
+
+class EpisodeSelection:
+    """
+    Compiled episode selection text, e.g., '0, 3-5 10:20:2 100:'.
+
+    Fields separated by commas and/or whitespace are single episodes, inclusive ranges (first-last)
+    or python slices (start:stop:step, relative to episodes 0 through the largest episode).
+    The text is parsed once, so selecting from many episodes is a vectorized mask rather than a search per episode.
+    Empty text selects all episodes.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.episodes = []  # single episodes
+        self.ranges = []  # (first, last)
+        self.slices = []
+        for field in re.split(r'[,\s]+', text.strip()):
+            if field == '':
+                continue
+            if ':' in field:
+                sliceArgs = [int(arg) if len(arg.strip()) else None for arg in field.split(':')]
+                self.slices.append(slice(*sliceArgs))
+            elif '-' in field:
+                first, last = field.split('-')
+                self.ranges.append((int(first), int(last)))
             else:
-                return
-        data = []
-        numHekaSeries = len(bundle.pul[hekaGroupIndex])
-        for hekaSeriesIndex in range(numHekaSeries):
-            numHekaSweeps = len(bundle.pul[hekaGroupIndex][hekaSeriesIndex])
-            for hekaSweepIndex in range(numHekaSweeps):
-                episode = hekaSweepIndex
-                numHekaTraces = len(bundle.pul[hekaGroupIndex][hekaSeriesIndex][hekaSweepIndex])
-                for hekaTraceIndex in range(numHekaTraces):
-                    group = hekaTraceIndex
-                    trace = bundle.pul[hekaGroupIndex][hekaSeriesIndex][hekaSweepIndex][hekaTraceIndex]
-                    x = trace.XInterval + trace.XStart
-                    y = bundle.data[(hekaGroupIndex, hekaSeriesIndex, hekaSweepIndex, hekaTraceIndex)] + trace.YOffset
-                    xlabel = 'Time, ' + trace.XUnit
-                    ylabel = trace.Label + ', ' + trace.YUnit
-                    data.append({'x': x, 'y': y, 'xlabel': xlabel, 'ylabel': ylabel, 'episode': episode, 'group': group})
-        if not data:
+                self.episodes.append(int(field))
+
+    def isAll(self) -> bool:
+        return not (self.episodes or self.ranges or self.slices)
+
+    def mask(self, episodes) -> np.ndarray:
+        """ Mask of selected episodes in array of episodes (e.g., all unique episodes or the episode of each series). """
+        episodes = np.asarray(episodes)
+        if self.isAll():
+            return np.ones(episodes.shape, dtype=bool)
+        mask = np.isin(episodes, self.episodes)
+        for first, last in self.ranges:
+            mask |= (episodes >= first) & (episodes <= last)
+        if self.slices and episodes.size:
+            numEpisodes = int(episodes.max()) + 1
+            for sliceObj in self.slices:
+                start, stop, step = sliceObj.indices(numEpisodes)
+                if step > 0:
+                    mask |= (episodes >= start) & (episodes < stop) & ((episodes - start) % step == 0)
+                else:
+                    mask |= (episodes <= start) & (episodes > stop) & ((start - episodes) % -step == 0)
+        return mask
+
+
+class MinMaxPyramid:
+    """
+    Peak preserving (min/max) level of detail pyramid for drawing long x,y series.
+
+    Level k summarizes bins of factor**k samples by their min and max.
+    Any x range can thus be drawn with about two points per pixel without losing peaks.
+    """
+
+    factor = 4
+    minSize = 10000  # series with fewer samples are drawn as is
+    minBins = 512  # coarsest level
+
+    def __init__(self, x, y):
+        # uniform x is never materialized, only the parts of it that are drawn
+        self.x = x if isinstance(x, UniformAxis) else np.asarray(x)
+        self.y = np.asarray(y)
+        self.mins = [self.y]
+        self.maxs = [self.y]
+        if isinstance(self.x, UniformAxis):
+            isMonotonic = self.x.dx >= 0
+        else:
+            isMonotonic = np.all(self.x[1:] >= self.x[:-1])
+        if len(self.y) < 2 or len(self.x) != len(self.y) or not isMonotonic:
+            # level of detail requires monotonically increasing x
+            return
+        mins, maxs = self.y, self.y
+        while len(mins) > self.minBins:
+            mins = self._reduce(mins, np.fmin, self.factor)
+            maxs = self._reduce(maxs, np.fmax, self.factor)
+            self.mins.append(mins)
+            self.maxs.append(maxs)
+
+    @property
+    def numLevels(self) -> int:
+        return len(self.mins)
+
+    @staticmethod
+    def _reduce(values, ufunc, factor):
+        # NaN ignoring reduction of consecutive bins of factor values (last bin may be partial)
+        n = len(values) // factor * factor
+        reduced = ufunc.reduce(values[:n].reshape(-1, factor), axis=1)
+        if n < len(values):
+            reduced = np.append(reduced, ufunc.reduce(values[n:]))
+        return reduced
+
+    def decimate(self, xmin, xmax, width):
+        """
+        Return x, y, key to draw the x range [xmin, xmax] over width pixels.
+
+        The returned data extends half a view beyond each side of the range so that small pans
+        do not require new data. Views that result in the same data share the same key.
+        """
+        n = len(self.y)
+        i0 = max(0, np.searchsorted(self.x, xmin, 'left') - 1)
+        i1 = min(n, np.searchsorted(self.x, xmax, 'right') + 1)
+        count = max(i1 - i0, 1)
+        width = max(int(width), 1)
+
+        # coarsest level with at least one bin per pixel
+        level = 0
+        while level + 1 < self.numLevels and count / self.factor**(level + 1) >= width:
+            level += 1
+        binSize = self.factor**level
+        mins = self.mins[level]
+        maxs = self.maxs[level]
+        b0 = i0 // binSize
+        b1 = -(-i1 // binSize)
+        numBins = b1 - b0
+
+        # additional on the fly reduction down to between one and two bins per pixel
+        reduction = max(1, numBins // width) if level > 0 else 1
+
+        # snap range (with margin) to a grid so nearby views share the same data
+        step = reduction * max(1, (numBins // 2) // reduction)
+        lo = max(0, (b0 - numBins // 2) // step * step)
+        hi = min(len(mins), -(-(b1 + numBins // 2) // step) * step)
+        key = (level, reduction, lo, hi)
+
+        if level == 0:
+            return np.asarray(self.x[lo:hi]), self.y[lo:hi], key
+        
+        mins = mins[lo:hi]
+        maxs = maxs[lo:hi]
+        if reduction > 1:
+            mins = self._reduce(mins, np.fmin, reduction)
+            maxs = self._reduce(maxs, np.fmax, reduction)
+        binStarts = self.x[lo * binSize:min(hi * binSize, n):binSize * reduction]
+
+        # two points (min, max) per bin
+        x = np.repeat(binStarts, 2)
+        y = np.empty(len(x), dtype=mins.dtype)
+        y[0::2] = mins
+        y[1::2] = maxs
+        return x, y, key
+
+    def bounds(self, ax, orthoRange=None):
+        """ Data bounds along axis ax (0: x, 1: y), optionally restricted to orthoRange along the other axis. """
+        if len(self.y) == 0:
+            return None, None
+        if ax == 0:
+            return self.x[0], self.x[-1]
+        mins, maxs = self.mins[-1], self.maxs[-1]
+        if orthoRange is not None:
+            # bounds of bins in the x range at a level with at most ~minBins bins in range
+            i0 = np.searchsorted(self.x, orthoRange[0], 'left')
+            i1 = np.searchsorted(self.x, orthoRange[1], 'right')
+            level = 0
+            while level + 1 < self.numLevels and (i1 - i0) / self.factor**level > self.minBins:
+                level += 1
+            binSize = self.factor**level
+            mins = self.mins[level][i0 // binSize:-(-i1 // binSize)]
+            maxs = self.maxs[level][i0 // binSize:-(-i1 // binSize)]
+            if len(mins) == 0:
+                return None, None
+        return np.fmin.reduce(mins), np.fmax.reduce(maxs)
+
+
+class SeriesAccumulator:
+    """
+    Single pass (streaming) per sample mean, variance, min and max over series, e.g., episodes.
+
+    Only the running statistics (a few arrays as long as the longest series) are kept, so any number of series
+    can be reduced one at a time. Series of different lengths are reduced per sample over the series that extend
+    that far. Mean and variance are updated with Welford's algorithm.
+    """
+
+    reductions = ['mean', 'var', 'std', 'min', 'max']
+
+    def __init__(self):
+        self.count = np.zeros(0, dtype=int)
+        self._mean = np.zeros(0)
+        self._m2 = np.zeros(0)
+        self._min = np.zeros(0)
+        self._max = np.zeros(0)
+
+    def __len__(self):
+        return len(self.count)
+
+    def add(self, y):
+        y = np.asarray(y, dtype=float).ravel()
+        n = len(y)
+        if n > len(self.count):
+            pad = n - len(self.count)
+            self.count = np.append(self.count, np.zeros(pad, dtype=int))
+            self._mean = np.append(self._mean, np.zeros(pad))
+            self._m2 = np.append(self._m2, np.zeros(pad))
+            self._min = np.append(self._min, np.full(pad, np.inf))
+            self._max = np.append(self._max, np.full(pad, -np.inf))
+        self.count[:n] += 1
+        delta = y - self._mean[:n]
+        self._mean[:n] += delta / self.count[:n]
+        self._m2[:n] += delta * (y - self._mean[:n])
+        np.fmin(self._min[:n], y, out=self._min[:n])
+        np.fmax(self._max[:n], y, out=self._max[:n])
+
+    def mean(self) -> np.ndarray:
+        return self._mean.copy()
+
+    def var(self, ddof=0) -> np.ndarray:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(self.count > ddof, self._m2 / (self.count - ddof), np.nan)
+
+    def std(self, ddof=0) -> np.ndarray:
+        return np.sqrt(self.var(ddof))
+
+    def min(self) -> np.ndarray:
+        return self._min.copy()
+
+    def max(self) -> np.ndarray:
+        return self._max.copy()
+
+    def result(self, reduction) -> np.ndarray:
+        """ One of the reductions above. """
+        if reduction not in self.reductions:
+            raise ValueError(f'Unknown reduction: {reduction}')
+        return getattr(self, reduction)()
+
+
+class RingBuffer:
+    """
+    Fixed capacity buffer of the most recently appended samples.
+
+    Each sample is stored twice (at i and i + capacity), so the buffered samples are always available
+    in order as a contiguous view without copying. Memory is fixed at twice the capacity.
+    """
+
+    def __init__(self, capacity, dtype=float):
+        self.capacity = max(1, int(capacity))
+        self._buffer = np.zeros(2 * self.capacity, dtype=dtype)
+        self._start = 0  # oldest sample
+        self._size = 0
+        self.count = 0  # total samples ever appended
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def dtype(self):
+        return self._buffer.dtype
+
+    def append(self, values):
+        values = np.asarray(values, dtype=self._buffer.dtype).ravel()
+        n = len(values)
+        self.count += n
+        if n > self.capacity:
+            values = values[-self.capacity:]
+        m = len(values)
+        cap = self.capacity
+        end = (self._start + self._size) % cap
+        first = min(m, cap - end)
+        self._buffer[end:end + first] = values[:first]
+        self._buffer[end + cap:end + cap + first] = values[:first]
+        rest = m - first
+        if rest:
+            self._buffer[:rest] = values[first:]
+            self._buffer[cap:cap + rest] = values[first:]
+        self._size = min(cap, self._size + m)
+        self._start = (end + m - self._size) % cap
+
+    def view(self) -> np.ndarray:
+        """ Buffered samples from oldest to newest (read-only view, only valid until the next append). """
+        view = self._buffer[self._start:self._start + self._size]
+        view.flags.writeable = False
+        return view
+
+    def __array__(self, dtype=None, copy=None):
+        return np.array(self.view(), dtype=dtype)
+
+
+class SeriesStream:
+    """
+    Live (e.g., acquisition) series fed by a source of sample chunks and kept in fixed-memory ring buffers.
+
+    The source is any iterator (e.g., a generator or fileTailSource) yielding chunks of new samples as 1D arrays
+    (single channel) or (numChannels, numSamples) arrays, or None when no new samples are available yet.
+    Only the most recent capacity samples per channel are kept. See QtTimeSeriesAnalyzer.startStream.
+    """
+
+    def __init__(self, source, series: list, capacity=100000, dx=1, x0=0, dtype=float):
+        self.source = iter(source)
+        self.series = series  # one series dict per channel
+        self.dx = dx
+        self.x0 = x0  # x of the first sample ever streamed
+        self.buffers = [RingBuffer(capacity, dtype) for _ in series]
+        self.isFinished = False
+
+    def read(self, deadline=None) -> bool:
+        """ Buffer all currently available chunks (or those read until deadline). Return True if any samples were read. """
+        hasNewSamples = False
+        while not self.isFinished:
+            try:
+                chunk = next(self.source)
+            except StopIteration:
+                self.isFinished = True
+                break
+            if chunk is None:
+                # nothing more for now
+                break
+            chunk = np.asarray(chunk)
+            if chunk.ndim < 2:
+                chunk = chunk.reshape(1, -1)
+            for buffer, samples in zip(self.buffers, chunk):
+                buffer.append(samples)
+            hasNewSamples = True
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+        return hasNewSamples
+
+
+def fileTailSource(filepath, dtype='float32', numChannels=1, maxChunkSize=1000000):
+    """
+    Stream source of samples appended to a growing raw binary file (e.g., written by an acquisition program).
+
+    Samples of multiple channels are interleaved. Yields (numChannels, numSamples) chunks (1D for a single channel)
+    or None while waiting for more samples. Runs until closed.
+    """
+    dtype = np.dtype(dtype)
+    frameSize = dtype.itemsize * numChannels
+    pending = b''
+    with open(filepath, 'rb') as file:
+        while True:
+            data = file.read(maxChunkSize * frameSize)
+            if not data:
+                yield None
+                continue
+            data = pending + data
+            n = len(data) // frameSize * frameSize
+            pending = data[n:]
+            if n == 0:
+                yield None
+                continue
+            samples = np.frombuffer(data[:n], dtype=dtype)
+            yield samples if numChannels == 1 else samples.reshape(-1, numChannels).T
+
+
+class DerivedCache:
+    """
+    Least recently used cache of evaluated derived arrays (see DerivedArray), bounded by their total size.
+
+    Entries remember the source arrays they were evaluated from, so they are recomputed once a source array is replaced.
+    Sources edited in place have to be invalidated explicitly (TimeSeriesAnalyzer.setSeriesAttr does this for the derived series in its data).
+    Derived arrays are only weakly referenced, so the entries of removed series (and the source arrays they hold) are dropped with them.
+    hits and misses count lookups.
+    """
+
+    maxBytes = 256 * 1024 * 1024  # evaluated arrays kept in memory, the least recently used are dropped
+
+    def __init__(self):
+        self._entries = collections.OrderedDict()  # id(DerivedArray) -> (weak reference to DerivedArray, source state, array)
+        self._lock = threading.Lock()  # e.g., for prefetching in a worker thread
+        self._released = collections.deque()  # ids of garbage collected derived arrays whose entries are yet to be removed
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, node):
+        """ Evaluated array of node, evaluating it if not cached or out of date. """
+        state = node._sourceState()
+        with self._lock:
+            self._purge()
+            entry = self._entries.get(id(node))
+            if entry is not None and entry[0]() is node and len(entry[1]) == len(state) and all(a is b for a, b in zip(entry[1], state)):
+                self._entries.move_to_end(id(node))
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+        array = node._evaluate()
+        array.setflags(write=False)
+        with self._lock:
+            self._remove(id(node))
+            self._entries[id(node)] = (weakref.ref(node, functools.partial(self._onReleased, id(node))), state, array)
+            self.nbytes += array.nbytes
+            while self.nbytes > self.maxBytes and len(self._entries) > 1:
+                self._remove(next(iter(self._entries)))
+        return array
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.nbytes -= entry[2].nbytes
+
+    def _onReleased(self, key, ref):
+        # derived array was garbage collected (e.g., its series was removed), possibly while the lock is held
+        self._released.append(key)
+        if self._lock.acquire(blocking=False):
+            try:
+                self._purge()
+            finally:
+                self._lock.release()
+
+    def _purge(self):
+        # remove entries of garbage collected derived arrays (lock held)
+        while self._released:
+            key = self._released.popleft()
+            entry = self._entries.get(key)
+            if entry is not None and entry[0]() is None:
+                self._remove(key)
+
+    def invalidate(self, series=None) -> list:
+        """ Drop the evaluated arrays that depend on series (all if None) and return their derived arrays. """
+        with self._lock:
+            self._purge()
+            nodes = [entry[0]() for entry in self._entries.values()]
+            nodes = [node for node in nodes if node is not None and (series is None or node.dependsOn(series))]
+            for node in nodes:
+                self._remove(id(node))
+        return nodes
+
+    def discard(self, nodes):
+        """ Drop the evaluated arrays of the given derived arrays. """
+        if not nodes:
             return
+        with self._lock:
+            self._purge()
+            for node in nodes:
+                self._remove(id(node))
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._purge()
+        return {'hits': self.hits, 'misses': self.misses, 'arrays': len(self._entries), 'nbytes': self.nbytes}
+
+
+class DerivedArray(np.lib.mixins.NDArrayOperatorsMixin):
+    """
+    y of a derived series: a transform of source series that is only evaluated when read (e.g., plotted or measured).
+
+    Evaluated arrays are kept in a shared least recently used cache (see DerivedCache) and recomputed when a source
+    changes. Derived series can themselves be sources (e.g., filter a baseline zeroed series), so transforms form a graph.
+    Behaves enough like a read-only numpy array (shape, dtype, len, indexing, arithmetic, np.asarray) to be used in place of one.
+
+    Transforms (of the first source, sample regions are (xmin, xmax) in x):
+        baseline: subtract the mean within regions (default all samples), except for masked samples (see mergeIntervals)
+        scale: y * factor + offset
+        filter: zero-phase filters (see filterSOS)
+        interpolate: replace samples within regions by linear interpolation between the samples around them
+        mask: samples within regions -> NaN
+        subtract: y of the first minus that of the second source (e.g., a leak template)
+    """
+
+    transforms = ['baseline', 'scale', 'filter', 'interpolate', 'mask', 'subtract']
+
+    # evaluated arrays of all derived arrays
+    cache = DerivedCache()
+
+    def __init__(self, transform, sources: list, **params):
+        """ transform: one of transforms, sources: series dicts, params: of the transform (e.g., regions, factor, filters). """
+        if transform not in self.transforms:
+            raise ValueError(f'Unknown transform: {transform}')
+        if len(sources) != (2 if transform == 'subtract' else 1):
+            raise ValueError(f'{transform} requires {2 if transform == "subtract" else 1} source series.')
+        if transform == 'filter':
+            checkFilters(params.get('filters', []))
+        self.transform = transform
+        self.sources = list(sources)
+        self.params = params
+
+    def __repr__(self):
+        params = ', '.join([f'{key}={value!r}' for key, value in self.params.items()])
+        return f'DerivedArray({self.transform}{", " if params else ""}{params}, shape={self.shape})'
+
+    def __len__(self):
+        return self.shape[0]
+
+    @property
+    def shape(self) -> tuple:
+        return np.shape(self.sources[0].get('y'))
+
+    @property
+    def ndim(self) -> int:
+        return len(self.shape)
+
+    @property
+    def size(self) -> int:
+        return int(np.prod(self.shape))
+
+    @property
+    def dtype(self):
+        return np.dtype(float)
+
+    @property
+    def nbytes(self) -> int:
+        return self.size * self.dtype.itemsize
+
+    def dependsOn(self, series: dict) -> bool:
+        """ Whether series is a (direct or indirect) source. """
+        for source in self.sources:
+            if source is series:
+                return True
+            y = source.get('y')
+            if isinstance(y, DerivedArray) and y.dependsOn(series):
+                return True
+        return False
+
+    def _sourceState(self) -> tuple:
+        # what the evaluated array depends on (compared by identity)
+        state = []
+        for source in self.sources:
+            y = source.get('y')
+            state.extend([source.get('x'), source.get('x0'), source.get('mask'), y])
+            if isinstance(y, DerivedArray):
+                state.extend(y._sourceState())
+        return tuple(state)
+
+    @staticmethod
+    def _sourceY(series) -> np.ndarray:
+        # copy of y as float, lazy arrays that were not already loaded are released again
+        y = series.get('y')
+        wasLoaded = not isinstance(y, LazyArray) or y.isLoaded()
+        array = np.array(y, dtype=float)
+        if not wasLoaded:
+            y.unload()
+        return array
+
+    def _evaluate(self) -> np.ndarray:
+        source = self.sources[0]
+        y = self._sourceY(source)
+        if self.transform == 'scale':
+            return y * self.params.get('factor', 1) + self.params.get('offset', 0)
+        if self.transform == 'subtract':
+            other = self._sourceY(self.sources[1])
+            if other.shape != y.shape:
+                raise ValueError(f'Cannot subtract series of shape {other.shape} from shape {y.shape}.')
+            return y - other
+        x = source.get('x')
+        if x is None or np.ndim(x) == 0:
+            x = UniformAxis(source.get('x0', 0), 1 if x is None else x, np.size(y))
+        if self.transform == 'filter':
+            return filtfilt(filterSOS(self.params['filters'], 1 / sampleInterval(x)), y)
+        regions = self.params.get('regions')
+        if self.transform == 'baseline':
+            # baseline from unmasked samples only
+            indexes = regionIndexes(x, regions if regions else [(-np.inf, np.inf)], source.get('mask'))
+        elif not regions:
+            indexes = np.array([], dtype=int)
+        else:
+            indexes = regionIndexes(x, regions)
+        if self.transform == 'baseline':
+            if np.size(y[indexes]):
+                y -= np.nanmean(y[indexes])
+        elif self.transform == 'interpolate':
+            keep = np.ones(len(y), dtype=bool)
+            keep[indexes] = False
+            if len(indexes) and keep.any():
+                x = np.asarray(x)
+                y[indexes] = np.interp(x[indexes], x[keep], y[keep])
+        elif self.transform == 'mask':
+            y[indexes] = np.nan
+        return y
+
+    def load(self) -> np.ndarray:
+        return self.cache.get(self)
+
+    def __array__(self, dtype=None, copy=None):
+        array = self.load()
+        if dtype is not None:
+            array = array.astype(dtype)
+        if copy:
+            array = array.copy()
+        return array
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        inputs = [np.asarray(value) if isinstance(value, DerivedArray) else value for value in inputs]
+        return getattr(ufunc, method)(*inputs, **kwargs)
+
+    def __getitem__(self, key):
+        return self.load()[key]
+
+    def __iter__(self):
+        return iter(self.load())
+
+
+class TimeSeriesAnalyzer:
+    """
+    Collection of time (or any x,y) series with selection and analysis, but without a UI (e.g., for batch processing).
+
+    See QtTimeSeriesAnalyzer for the UI.
+    """
+
+    def __init__(self):
+        # columnar metadata cache for self.data
+        self._seriesTable = SeriesTable()
+
+        # (id(series), filters JSON) -> (series, y, filtered series) (see filterSeries)
+        self._filteredSeries = {}
+
+        # id(source series) -> series in self.data derived from it, and ids of those derived series (see _derivedSeriesIndex)
+        self._derivedIndex = None
+        self._derivedIds = None
+
+        # series whose data changed within batchUpdate(): id(series) -> series
+        self._seriesBatchDepth = 0
+        self._changedSeries = {}
+
+        self.data = []
+    
+    @property
+    def data(self) -> list:
+        """ List of series dicts. """
+        return self._data
+    
+    @data.setter
+    def data(self, data):
+        self._data = SeriesList(data, self._onSeriesListChanged)
+        self._seriesTable.setData(self._data)
+        self._onSeriesListChanged()
+    
+    def _onSeriesListChanged(self, start=None):
+        """ Series were appended to self.data from index start on, or self.data was otherwise changed (start=None). """
+        if start is None:
+            self._seriesTable.invalidate()
+            self._derivedIndex = None
+        else:
+            self._seriesTable.appended(start)
+            if self._derivedIndex is not None:
+                self._indexDerivedSeries(self.data[start:])
+    
+    @contextlib.contextmanager
+    def batchUpdate(self):
+        """
+        Context manager that defers handling of changed series data until the end of the batch (which may be nested), e.g.,
+
+            with tsa.batchUpdate():
+                for ...:
+                    tsa.setSeriesAttr('y', ...)
+        
+        Series derived from the changed series (see deriveSeries) are then resolved once for the whole batch.
+        """
+        self._seriesBatchDepth += 1
+        try:
+            yield self
+        finally:
+            self._seriesBatchDepth -= 1
+            if self._seriesBatchDepth == 0:
+                self._flushChangedSeries()
+    
+    def clear(self):
+        self.data = []
+        self.updateUI()
+    
+    def save(self, filepath):
+        if os.path.splitext(filepath)[1].lower() in ['.h5', '.hdf5']:
+            # only writes what is not already in the file
+            saveh5(filepath, self.data)
+        else:
+            savemat(filepath, self.data)
+    
+    def open(self, filepath, clear=True):
+        if isNativeh5(filepath):
+            data = loadh5(filepath)
+        else:
+            data = loadmat(filepath)
         if clear:
             self.data = data
         else:
@@ -196,7 +1427,21 @@ class QtTimeSeriesAnalyzer(QWidget):
     def addSeries(self, **kwargs):
         seriesDict = kwargs
         self.data.append(seriesDict)
-        self.updateUI()
+        self._refreshUI()
+    
+    def addSeriesBatch(self, seriesList: list):
+        """ Append series dicts to self.data with a single UI update. """
+        self.data.extend(seriesList)
+        self._refreshUI()
+    
+    def updateUI(self):
+        # series dicts may have been edited directly, so refresh cached metadata
+        self._seriesTable.invalidate()
+        self._derivedIndex = None
+    
+    def _refreshUI(self):
+        """ Same as updateUI, but for changes that are already tracked (e.g., appended series and setSeriesAttr). Nothing to do without a UI. """
+        pass
     
     def seriesAttr(self, attr, seriesDictOrIndexOrListThereof=None):
         if seriesDictOrIndexOrListThereof is None:
@@ -211,6 +1456,12 @@ class QtTimeSeriesAnalyzer(QWidget):
             series = seriesDictOrIndexOrListThereof
         elif isinstance(seriesDictOrIndexOrListThereof, list):
             seriesDictOrIndexList = seriesDictOrIndexOrListThereof
+            if attr == 'episode':
+                rows = self._seriesRows(seriesDictOrIndexList)
+                return self._episodeArray()[rows].tolist()
+            if attr in ['group', 'name', 'xlabel', 'ylabel']:
+                rows = self._seriesRows(seriesDictOrIndexList)
+                return self._seriesTable.values(attr, rows)
             values = [self.seriesAttr(attr, seriesDictOrIndex) for seriesDictOrIndex in seriesDictOrIndexList]
             return values
         else:
@@ -222,24 +1473,15 @@ class QtTimeSeriesAnalyzer(QWidget):
             # default values
             if attr == 'x':
                 if 'y' in series:
-                    try:
-                        N = len(series['y'])
-                    except:
-                        if isinstance(series['y'], int) or isinstance(series['y'], float):
-                            N = 1
-                        else:
-                            N = 0
-                    value = np.arange(N)
+                    # sample indexes (offset by x0)
+                    value = UniformAxis(series.get('x0', 0), 1, np.size(series['y']))
             elif attr in ['xlabel', 'ylabel']:
                 value = ''
             elif attr == 'episode':
                 # assign episode based on index of series within all series having the same group and name
                 if index is None:
-                    index = self.data.index(series)
-                group = self.seriesAttr('group', series)
-                name = self.seriesAttr('name', series)
-                indexes = self.seriesIndexes(groups=[group], names=[name])
-                value = indexes.index(index)
+                    index = self._seriesTable.row(series)
+                value = int(self._seriesTable.episodes()[index])
             elif attr == 'group':
                 value = 0
             # elif attr == 'name':
@@ -251,12 +1493,9 @@ class QtTimeSeriesAnalyzer(QWidget):
             # elif attr == 'xlink':
             #     value = 0
         elif attr == 'x':
-            # convert sample interval to 1D array?
-            if isinstance(value, float) or isinstance(value, int):
-                if 'y' in series:
-                    N = len(series['y'])
-                    if N > 1:
-                        value = np.arange(N) * value
+            # sample interval (and start x0) -> uniform axis, only materialized as an array if needed
+            if isinstance(value, (int, float, np.number)) and 'y' in series:
+                value = UniformAxis(series.get('x0', 0), value, np.size(series['y']))
         
         return value
     
@@ -273,18 +1512,108 @@ class QtTimeSeriesAnalyzer(QWidget):
             series = seriesDictOrIndexOrListThereof
         elif isinstance(seriesDictOrIndexOrListThereof, list):
             seriesDictOrIndexList = seriesDictOrIndexOrListThereof
-            for seriesDictOrIndex in seriesDictOrIndexList:
-                self.setSeriesAttr(attr, value, seriesDictOrIndex)
+            with self.batchUpdate():
+                for seriesDictOrIndex in seriesDictOrIndexList:
+                    self.setSeriesAttr(attr, value, seriesDictOrIndex)
             return
         else:
             raise TypeError('Input must be either a series index or a series dict or a list thereof.')
         
+        if attr == 'x' and isinstance(value, UniformAxis):
+            # stored as sample interval and start
+            self.setSeriesAttr('x0', value.x0 if value.x0 != 0 else None, series)
+            value = value.dx
         if value is None:
             if attr in series:
                 del series[attr]
-            return
+        else:
+            series[attr] = value
         
-        series[attr] = value
+        # keep metadata cache in sync
+        if index is None:
+            try:
+                index = self._seriesTable.row(series)
+            except KeyError:
+                # series is not in self.data
+                index = None
+        if index is not None:
+            self._seriesTable.seriesChanged(index, attr)
+        self._onSeriesAttrChanged(series, index, attr)
+    
+    def _onSeriesAttrChanged(self, series, index, attr):
+        """ Series attr was set (see setSeriesAttr). Index is None for series that are not in self.data. """
+        if attr == 'y' and self._derivedIndex is not None:
+            if id(series) in self._derivedIds:
+                # derived y was replaced
+                self._derivedIndex = None
+            elif index is not None and isinstance(series.get('y'), DerivedArray):
+                self._indexDerivedSeries([series])
+        if attr in ['x', 'x0', 'y', 'mask']:
+            # e.g., y edited in place
+            self._changedSeries[id(series)] = series
+            if not self._seriesBatchDepth:
+                self._flushChangedSeries()
+    
+    def _flushChangedSeries(self):
+        if not self._changedSeries:
+            return
+        seriesList = list(self._changedSeries.values())
+        self._changedSeries = {}
+        self._onSeriesDataChanged(seriesList, self._dependentSeries(seriesList))
+    
+    def _onSeriesDataChanged(self, seriesList, dependents):
+        """ x, x0, y or mask of series in seriesList were set, dependents are the series in self.data derived from them. """
+        DerivedArray.cache.discard([series['y'] for series in dependents])
+    
+    def _derivedSeriesIndex(self) -> dict:
+        """ id(source series) -> list of series in self.data whose y is directly derived from it (see DerivedArray). """
+        if self._derivedIndex is None:
+            self._derivedIndex = {}
+            self._derivedIds = set()
+            self._indexDerivedSeries(self.data)
+        return self._derivedIndex
+    
+    def _indexDerivedSeries(self, seriesList):
+        for series in seriesList:
+            y = series.get('y')
+            if isinstance(y, DerivedArray):
+                self._derivedIds.add(id(series))
+                for source in y.sources:
+                    self._derivedIndex.setdefault(id(source), []).append(series)
+    
+    def _dependentSeries(self, seriesList) -> list:
+        """ Series in self.data derived (directly or indirectly) from any of the series in seriesList. """
+        index = self._derivedSeriesIndex()
+        if not index:
+            return []
+        dependents = {}
+        stack = list(seriesList)
+        while stack:
+            for derived in index.get(id(stack.pop()), []):
+                if id(derived) not in dependents:
+                    dependents[id(derived)] = derived
+                    stack.append(derived)
+        return list(dependents.values())
+    
+    def _seriesRows(self, seriesDictOrIndexOrListThereof=None):
+        """ Series indexes for input series indexes and/or dicts. None => None (all series). """
+        if seriesDictOrIndexOrListThereof is None:
+            return None
+        if not isinstance(seriesDictOrIndexOrListThereof, list):
+            seriesDictOrIndexOrListThereof = [seriesDictOrIndexOrListThereof]
+        rows = []
+        for seriesDictOrIndex in seriesDictOrIndexOrListThereof:
+            if isinstance(seriesDictOrIndex, (int, np.integer)):
+                rows.append(int(seriesDictOrIndex))
+            elif isinstance(seriesDictOrIndex, dict):
+                rows.append(self._seriesTable.row(seriesDictOrIndex))
+            else:
+                raise TypeError('Input must be either a series index or a series dict or a list thereof.')
+        return rows
+    
+    def _episodeArray(self) -> np.ndarray:
+        """ Episode of every series in self.data as an integer array. """
+        return self._seriesTable.episodes()
     
     def styleAttr(self, style: dict, attr):
         attr = attr.lower()
@@ -350,1645 +1679,976 @@ class QtTimeSeriesAnalyzer(QWidget):
         if value is not None:
             style[attr] = value
     
-    def seriesIndexes(self, episodes=None, groups=None, names=None) -> list:
-        indexes = []
-        for i in range(len(self.data)):
-            if episodes is None or self.seriesAttr('episode', i) in episodes:
-                if groups is None or self.seriesAttr('group', i) in groups:
-                    if names is None or self.seriesAttr('name', i) in names:
-                        indexes.append(i)
-        return indexes
+    def seriesIndexes(self, episodes=None, groups=None, names=None, **attrs) -> list:
+        """
+        Indexes of series matching all of the specified selections.
+
+        Any other series attribute can be selected by passing a list of values as a keyword argument,
+        e.g., seriesIndexes(groups=[0], ylabel=['Current, pA']).
+        """
+        table = self._seriesTable
+        mask = np.ones(len(self.data), dtype=bool)
+        if episodes is not None:
+            mask &= np.isin(self._episodeArray(), list(episodes))
+        if groups is not None:
+            mask &= table.mask('group', groups)
+        if names is not None:
+            mask &= table.mask('name', names)
+        for attr, values in attrs.items():
+            mask &= table.mask(attr, values)
+        return np.flatnonzero(mask).tolist()
+    
+    def reduceSeries(self, reductions=['mean'], episodes=None, groups=None, names=None, **attrs) -> list:
+        """
+        Per sample reductions (mean, var, std, min, max) of the selected series (see seriesIndexes) for each group and name.
+
+        Series are reduced one at a time in a single pass (see SeriesAccumulator), so peak memory is about one series
+        no matter how many are selected. Lazy arrays that were not already loaded are released again once reduced.
+        The results are added to self.data as new series with the reduction appended to the name and returned.
+        """
+        indexes = self.seriesIndexes(episodes, groups, names, **attrs)
+        table = self._seriesTable
+        groupCodes = table.column('group').codes
+        nameCodes = table.column('name').codes
+        # (group code, name code) -> [accumulator, x of the longest series, first series]
+        buckets = {}
+        for index in indexes:
+            series = self.data[index]
+            y = series.get('y')
+            if y is None:
+                continue
+            key = (groupCodes[index], nameCodes[index])
+            if key not in buckets:
+                buckets[key] = [SeriesAccumulator(), None, series]
+            bucket = buckets[key]
+            wasLoaded = not isinstance(y, LazyArray) or y.isLoaded()
+            if np.size(y) > len(bucket[0]):
+                bucket[1] = self.seriesAttr('x', series)
+            bucket[0].add(y)
+            if not wasLoaded:
+                y.unload()
+        
+        results = []
+        for accumulator, x, series in buckets.values():
+            name = self.seriesAttr('name', series)
+            for reduction in reductions:
+                results.append({
+                    'x': x, 
+                    'y': accumulator.result(reduction), 
+                    'xlabel': self.seriesAttr('xlabel', series), 
+                    'ylabel': self.seriesAttr('ylabel', series), 
+                    'group': self.seriesAttr('group', series), 
+                    'name': reduction if not name else name + ' ' + reduction
+                    })
+        if results:
+            self.addSeriesBatch(results)
+        return results
+    
+    def maskSeries(self, intervals, seriesDictOrIndexOrListThereof=None, replace=False):
+        """
+        Exclude samples within x intervals (xmin, xmax) of the given series (default all) from plots, measurements and fits.
+
+        Masks are stored in the 'mask' attribute of each series as sorted, merged x intervals (see mergeIntervals),
+        not as copies of y. Series that had the same mask share the new one, so masking a whole dataset costs next to nothing.
+        replace=True replaces existing masks instead of adding to them.
+        """
+        rows = self._seriesRows(seriesDictOrIndexOrListThereof)
+        if rows is None:
+            rows = range(len(self.data))
+        intervals = mergeIntervals(intervals)
+        # id(old mask) -> new mask
+        masks = {}
+        # series derived from the masked series are resolved once for all of them
+        with self.batchUpdate():
+            for index in rows:
+                series = self.data[index]
+                mask = None if replace else series.get('mask')
+                if id(mask) not in masks:
+                    masks[id(mask)] = intervals if mask is None or len(mask) == 0 else mergeIntervals(np.concatenate([np.reshape(mask, (-1, 2)), intervals]))
+                self.setSeriesAttr('mask', masks[id(mask)] if len(masks[id(mask)]) else None, index)
+        self._refreshUI()
+    
+    def unmaskSeries(self, seriesDictOrIndexOrListThereof=None):
+        """ Remove the masks of the given series (default all). """
+        self.maskSeries([], seriesDictOrIndexOrListThereof, replace=True)
+    
+    def filterSeries(self, filters: list, episodes=None, groups=None, names=None, suffix='filtered', **attrs) -> list:
+        """
+        Zero-phase filtered (see filterSOS, filtfilt) copies of the selected series (see seriesIndexes).
+
+        Series with the same length and sample interval (e.g., the episodes of a group) are stacked and filtered
+        together in one call, in batches of about filterBatchSize samples. The filtered series are added to self.data
+        alongside their originals (same episode and group, with suffix appended to the name) and returned in selection order.
+        They are cached: filtering again with the same filters returns the existing filtered series (which are not filtered
+        again themselves), and only refilters those whose original y was replaced since (updating the filtered series in place).
+        """
+        checkFilters(filters)
+        filtersKey = json.dumps(filters, sort_keys=True)
+        dataIds = set(id(series) for series in self.data)
+        self._filteredSeries = {key: value for key, value in self._filteredSeries.items() if id(value[0]) in dataIds}
+        filteredIds = set(id(value[2]) for key, value in self._filteredSeries.items() if key[1] == filtersKey)
+
+        # (length, sample interval) -> [(index, series), ...] to (re)filter
+        batches = {}
+        results = {}
+        for index in self.seriesIndexes(episodes, groups, names, **attrs):
+            series = self.data[index]
+            y = series.get('y')
+            if y is None or id(series) in filteredIds:
+                continue
+            cached = self._filteredSeries.get((id(series), filtersKey))
+            if cached is not None and cached[0] is series and id(cached[2]) in dataIds:
+                results[index] = cached[2]
+                if cached[1] is y:
+                    continue
+            key = (np.size(y), sampleInterval(self.seriesAttr('x', series)))
+            batches.setdefault(key, []).append((index, series))
+        
+        newSeries = []
+        for (numSamples, dx), batch in batches.items():
+            sos = filterSOS(filters, 1 / dx)
+            batchSize = max(1, filterBatchSize // max(1, numSamples))
+            for start in range(0, len(batch), batchSize):
+                rows = batch[start:start + batchSize]
+                ys = [series['y'] for index, series in rows]
+                wasLoaded = [not isinstance(y, LazyArray) or y.isLoaded() for y in ys]
+                filtered = filtfilt(sos, np.stack([np.asarray(y, dtype=float).ravel() for y in ys]))
+                for (index, series), y, loaded, yFiltered in zip(rows, ys, wasLoaded, filtered):
+                    if not loaded:
+                        y.unload()
+                    dtype = getattr(y, 'dtype', None)
+                    if dtype is not None and np.issubdtype(dtype, np.floating):
+                        yFiltered = yFiltered.astype(dtype, copy=False)
+                    filteredSeries = results.get(index)
+                    if filteredSeries is not None:
+                        self.setSeriesAttr('y', yFiltered, filteredSeries)
+                    else:
+                        name = self.seriesAttr('name', series)
+                        filteredSeries = {
+                            'x': series.get('x'), 
+                            'x0': series.get('x0'), 
+                            'y': yFiltered, 
+                            'mask': series.get('mask'), 
+                            'xlabel': self.seriesAttr('xlabel', series), 
+                            'ylabel': self.seriesAttr('ylabel', series), 
+                            'episode': self.seriesAttr('episode', index), 
+                            'group': self.seriesAttr('group', series), 
+                            'name': suffix if not name else name + ' ' + suffix
+                            }
+                        filteredSeries = {key: value for key, value in filteredSeries.items() if value is not None}
+                        newSeries.append(filteredSeries)
+                        results[index] = filteredSeries
+                    self._filteredSeries[(id(series), filtersKey)] = (series, y, filteredSeries)
+        if newSeries:
+            self.addSeriesBatch(newSeries)
+        return [results[index] for index in sorted(results)]
+    
+    def deriveSeries(self, transform, seriesDictOrIndexOrListThereof=None, suffix=None, other=None, **params) -> list:
+        """
+        Lazily derived (see DerivedArray) series of each of the given series (default all), e.g.,
+
+            deriveSeries('baseline', indexes, regions=[(0, 0.01)])
+            deriveSeries('subtract', indexes, other=leakSeries)
+
+        other: series dict or index subtracted from each series (subtract only).
+        params: of the transform (e.g., regions, factor and offset, filters).
+        The derived series are added to self.data alongside their sources (same x, episode and group, with suffix,
+        default the transform, appended to the name) and returned. Their y is only evaluated when plotted or measured,
+        and is recomputed after the sources are changed (e.g., edited with setSeriesAttr).
+        """
+        rows = self._seriesRows(seriesDictOrIndexOrListThereof)
+        if rows is None:
+            rows = range(len(self.data))
+        if isinstance(other, int):
+            other = self.data[other]
+        if suffix is None:
+            suffix = transform
+        derived = []
+        for index in rows:
+            series = self.data[index]
+            if series.get('y') is None:
+                continue
+            sources = [series] if other is None else [series, other]
+            name = self.seriesAttr('name', series)
+            derivedSeries = {
+                'x': series.get('x'), 
+                'x0': series.get('x0'), 
+                'y': DerivedArray(transform, sources, **params), 
+                'mask': series.get('mask'), 
+                'xlabel': self.seriesAttr('xlabel', series), 
+                'ylabel': self.seriesAttr('ylabel', series), 
+                'episode': self.seriesAttr('episode', index), 
+                'group': self.seriesAttr('group', series), 
+                'name': suffix if not name else name + ' ' + suffix
+                }
+            derived.append({key: value for key, value in derivedSeries.items() if value is not None})
+        if derived:
+            self.addSeriesBatch(derived)
+        return derived
     
     def seriesEpisodes(self, seriesIndexes=None) -> list:
-        return np.unique(self.seriesAttr('episode', seriesIndexes)).tolist()
+        rows = self._seriesRows(seriesIndexes)
+        if rows is None:
+            return list(self._seriesTable.uniqueEpisodes())
+        return np.unique(self._episodeArray()[rows]).tolist()
     
     def seriesGroups(self, seriesIndexes=None) -> list:
-        if isinstance(seriesIndexes, int):
-            seriesIndexes = [seriesIndexes]
-        groups = []
-        for group in self.seriesAttr('group', seriesIndexes):
-            if group not in groups:
-                groups.append(group)
+        groups = self._seriesTable.unique('group', self._seriesRows(seriesIndexes))
         if groups and np.all([isinstance(group, int) for group in groups]):
             groups = sorted(groups)
         return groups
     
     def seriesNames(self, seriesIndexes=None) -> list:
-        if isinstance(seriesIndexes, int):
-            seriesIndexes = [seriesIndexes]
-        names = []
-        for name in self.seriesAttr('name', seriesIndexes):
-            if name not in names:
-                names.append(name)
-        return names
+        return self._seriesTable.unique('name', self._seriesRows(seriesIndexes))
     
     def groupNames(self, groups=None) -> list:
         if groups is None:
             groups = self.seriesGroups()
+        table = self._seriesTable
+        ylabelColumn = table.column('ylabel')
+        hasYLabel = ylabelColumn.codes != ylabelColumn.code('')
         names = []
         for group in groups:
             name = group if isinstance(group, str) else str(group)
             if isinstance(group, int):
                 # name -> int: ylabel
-                indexes = self.seriesIndexes(groups=[group])
-                for index in indexes:
-                    ylabel = self.seriesAttr('ylabel', index)
-                    if ylabel != "":
-                        name += ": " + ylabel
-                        break
+                indexes = np.flatnonzero(table.mask('group', [group]) & hasYLabel)
+                if len(indexes):
+                    name += ": " + ylabelColumn.value(indexes[0])
             names.append(name)
         return names
-    
-    def visibleEpisodes(self) -> list:
-        episodes = self.seriesEpisodes()
-        if not episodes:
-            return []
-        visibleEpisodesText = self._visibleEpisodesEdit.text().strip()
-        if visibleEpisodesText == '':
-            return episodes
-        visibleEpisodesFields = re.split('[,\s]+', visibleEpisodesText)
-        visibleEpisodes = []
-        for field in visibleEpisodesFields:
-            if field == '':
-                continue
-            if ':' in field:
-                sliceArgs = [int(arg) if len(arg.strip()) else None for arg in field.split(':')]
-                sliceObj = slice(*sliceArgs)
-                sliceIndexes = list(range(*sliceObj.indices(max(episodes) + 1)))
-                visibleEpisodes.extend(sliceIndexes)
-            elif '-' in field:
-                start, end = field.split('-')
-                visibleEpisodes.extend(list(range(int(start), int(end)+1)))
-            else:
-                visibleEpisodes.append(int(field))
-        visibleEpisodes = np.unique(visibleEpisodes)
-        return [episode for episode in visibleEpisodes if episode in episodes]
-    
-    def setVisibleEpisodes(self, visibleEpisodes: list):
-        episodes = self.seriesEpisodes()
-        if not episodes:
-            self._visibleEpisodesEdit.setText('')
-            self._updateGroupPlots()
-            return
-        visibleEpisodes = [episode for episode in visibleEpisodes if episode in episodes]
-        visibleEpisodesText = []
-        i = 0
-        while i < len(visibleEpisodes):
-            j = i
-            while j + 1 < len(visibleEpisodes) and  visibleEpisodes[j+1] == visibleEpisodes[j] + 1:
-                j += 1
-            if i == j:
-                visibleEpisodesText.append(str(visibleEpisodes[i]))
-            else:
-                visibleEpisodesText.append(str(visibleEpisodes[i]) + '-' + str(visibleEpisodes[j]))
-            i = j + 1
-        self._visibleEpisodesEdit.setText(' '.join(visibleEpisodesText))
-        self._updateGroupPlots()
-    
-    def visibleGroups(self) -> list:
-        groups = self.seriesGroups()
-        if not groups:
-            return []
-        visibleGroupIndexes = [index.row() for index in self._visibleGroupsListWidget.selectedIndexes()]
-        visibleGroups = [groups[i] for i in visibleGroupIndexes if i < len(groups)]
-        return visibleGroups if visibleGroups else groups
-    
-    def setVisibleGroups(self, visibleGroups: list):
-        self._updateVisibleGroupsListView()
-        groups = self.seriesGroups()
-        listWidget = self._visibleGroupsListWidget
-        listWidget.itemSelectionChanged.disconnect()
-        for item in listWidget.items():
-            item.setSelected(False)
-        for group in visibleGroups:
-            if group in groups:
-                listWidget.item(groups.index(group)).setSelected(True)
-        listWidget.itemSelectionChanged.connect(self._onVisibleGroupsChanged)
-        self._onVisibleGroupsChanged()
-    
-    def visibleNames(self) -> list:
-        names = self.seriesNames()
-        if not names:
-            return []
-        selectedIndexes = [index.row() for index in self._visibleNamesListWidget.selectedIndexes()]
-        visibleNames = [names[i] for i in selectedIndexes if i < len(names)]
-        return visibleNames if visibleNames else names
-    
-    def setVisibleNames(self, visibleNames: list):
-        self._updateVisibleNamesListView()
-        names = self.seriesNames()
-        listWidget = self._visibleNamesListWidget
-        listWidget.itemSelectionChanged.disconnect()
-        for item in listWidget.items():
-            item.setSelected(False)
-        for name in visibleNames:
-            if name in names:
-                listWidget.item(names.index(name)).setSelected(True)
-        listWidget.itemSelectionChanged.connect(self._onVisibleNamesChanged)
-        self._onVisibleNamesChanged()
-    
-    def initUI(self):
-        # episode traversal
-        self._visibleEpisodesEdit = QLineEdit("0")
-        self._visibleEpisodesEdit.setMinimumWidth(64)
-        self._visibleEpisodesEdit.setMaximumWidth(128)
-        self._visibleEpisodesEdit.setToolTip("Visible Episodes")
-        self._visibleEpisodesEdit.textEdited.connect(self._updateGroupPlots)
-
-        self._prevEpisodeButton = QPushButton()
-        if qta is not None:
-            icon = qta.icon("fa.step-backward")
-            self._prevEpisodeButton.setIcon(icon)
-        else:
-            self._prevEpisodeButton.setText("<")
-            self._prevEpisodeButton.setMaximumWidth(32)
-        self._prevEpisodeButton.setToolTip("Previous Episode")
-        self._prevEpisodeButton.clicked.connect(self.prevEpisode)
-
-        self._nextEpisodeButton = QPushButton()
-        if qta is not None:
-            icon = qta.icon("fa.step-forward")
-            self._nextEpisodeButton.setIcon(icon)
-        else:
-            self._nextEpisodeButton.setText(">")
-            self._nextEpisodeButton.setMaximumWidth(32)
-        self._nextEpisodeButton.setToolTip("Next Episode")
-        self._nextEpisodeButton.clicked.connect(self.nextEpisode)
-
-        # visible group selection
-        self._visibleGroupsListWidget = QListWidget()
-        self._visibleGroupsListWidget.setSelectionMode(QAbstractItemView.MultiSelection)
-        self._visibleGroupsListWidget.itemSelectionChanged.connect(self._onVisibleGroupsChanged)
-
-        # visible name selection
-        self._visibleNamesListWidget = QListWidget()
-        self._visibleNamesListWidget.setSelectionMode(QAbstractItemView.MultiSelection)
-        self._visibleNamesListWidget.itemSelectionChanged.connect(self._onVisibleNamesChanged)
-
-        # data table model/view
-        self._dataTableModel = None
-        self._dataTableView = None
-
-        # Python interactive console
-        if PythonConsole is not None:
-            self._console = PythonConsole()
-            # In the console the variable `self` provides access to this instance.
-            self._console.push_local_ns('self', self)
-            self._console.eval_queued()
-
-            # TODO: Use better console colors. The default colors suck.
-            pal = self._console.palette()
-            pal.setColor(pal.Base, QColor(82, 82, 82))
-            self._console.setPalette(pal)
-        else:
-            self._console = None
-        
-        # main menu
-        self._fileMenu = QMenu("&File")
-        self._fileMenu.addAction("&Open", self.open)
-        self._fileMenu.addSection(" ")
-        self._fileMenu.addAction("Import HEKA", self.importHEKA)
-        self._fileMenu.addSection(" ")
-        self._fileMenu.addAction("&Save", self.save)
-
-        self._groupsMenu = QMenu("Groups")
-        action = QWidgetAction(self._groupsMenu)
-        action.setDefaultWidget(self._visibleGroupsListWidget)
-        self._groupsMenu.addAction(action)
-
-        self._namesMenu = QMenu("Names")
-        action = QWidgetAction(self._namesMenu)
-        action.setDefaultWidget(self._visibleNamesListWidget)
-        self._namesMenu.addAction(action)
-
-        self._mainMenu = QMenu()
-        self._mainMenu.addMenu(self._fileMenu)
-        self._mainMenu.addSection(" ")
-        self._mainMenu.addMenu(self._groupsMenu)
-        self._mainMenu.addMenu(self._namesMenu)
-        self._mainMenu.addSection(" ")
-        action = self._makeAction(self._mainMenu, "Data Table", self.showDataTable, "fa.table")
-        self._mainMenu.addAction(action)
-        if self._console is not None:
-            action = self._makeAction(self._mainMenu, "Python Console", self.showCosole, "fa.terminal")
-            self._mainMenu.addAction(action)
-
-        self._mainMenuButton = QToolButton()
-        self._mainMenuButton.setPopupMode(QToolButton.InstantPopup)
-        self._mainMenuButton.setMenu(self._mainMenu)
-        if qta is not None:
-            icon = qta.icon("fa.bars")
-            self._mainMenuButton.setIcon(icon)
-        else:
-            self._mainMenuButton.setText("Menu")
-
-        # top toolbar
-        self._toolbar = QToolBar()
-        self._mainMenuButtonAction = self._toolbar.addWidget(self._mainMenuButton)
-        self._visibleEpisodesEditAction = self._toolbar.addWidget(self._visibleEpisodesEdit)
-        self._prevEpisodeButtonAction = self._toolbar.addWidget(self._prevEpisodeButton)
-        self._nextEpisodeButtonAction = self._toolbar.addWidget(self._nextEpisodeButton)
-        
-        # plots layout
-        self._groupPlotsLayout = QVBoxLayout()
-        self._groupPlotsLayout.setContentsMargins(0, 0, 0, 0)
-        self._groupPlotsLayout.setSpacing(0)
-
-        # main layout
-        self._mainLayout = QVBoxLayout(self)
-        self._mainLayout.setContentsMargins(3, 3, 3, 3)
-        self._mainLayout.setSpacing(0)
-        self._mainLayout.addWidget(self._toolbar)
-        self._mainLayout.addLayout(self._groupPlotsLayout)
-    
-    def updateUI(self):
-        # update visible groups and names
-        self._updateVisibleGroupsListView()
-        self._updateVisibleNamesListView()
-
-        # update plots
-        self._updateGroupPlots()
-
-        # update toolbar
-        showEpisodeControls = len(self.seriesEpisodes()) > 1
-        self._visibleEpisodesEditAction.setVisible(showEpisodeControls)
-        self._prevEpisodeButtonAction.setVisible(showEpisodeControls)
-        self._nextEpisodeButtonAction.setVisible(showEpisodeControls)
-
-        # update table model/view
-        if self._dataTableView is not None and self._dataTableView.isVisible():
-            self.showDataTable()
-    
-    def _updateGroupPlots(self):
-        visibleEpisodes = self.visibleEpisodes()
-        visibleGroups = self.visibleGroups()
-        visibleNames = self.visibleNames()
-        groups = self.seriesGroups()
-        plots = self.groupPlots()
-
-        for i, group in enumerate(groups):
-            # group plot
-            if len(plots) > i:
-                plot = plots[i]
-            else:
-                plot = PlotWidget()
-                self._groupPlotsLayout.addWidget(plot, stretch=1)
-                plots.append(plot)
-            
-            # plot series
-            indexes = self.seriesIndexes(groups=[group], episodes=visibleEpisodes, names=visibleNames)
-            plotDataItems = [item for item in plot.listDataItems() if isinstance(item, PlotDataItem)]
-            textItems = [item for item in plot.getViewBox().allChildren() if isinstance(item, TextItem)]
-            plotDataItemCount = 0
-            textItemCount = 0
-            colorIndex = 0
-            for index in indexes:
-                series = self.data[index]
-                x = self.seriesAttr('x', series)
-                y = self.seriesAttr('y', series)
-                if x is None or y is None:
-                    continue
-                
-                if len(plotDataItems) > plotDataItemCount:
-                    # update existing plot data item
-                    plotDataItem = plotDataItems[plotDataItemCount]
-                    plotDataItem.setData(x, y)
-                else:
-                    # add new plot data item
-                    plotDataItem = PlotDataItem(x, y)
-                    plot.addItem(plotDataItem)
-                    plotDataItems.append(plotDataItem)
-                plotDataItem.seriesDict = series
-                
-                # style
-                style = self.seriesAttr('style', series)
-                if style is None:
-                    style = {}
-                colorIndex = plotDataItem.setCustomStyle(style, colorIndex)
-                
-                # axis labels (based on first plot with axis labels)
-                if plotDataItemCount == 0 or plot.getAxis('bottom').labelText == '':
-                    xlabel = self.seriesAttr('xlabel', index)
-                    plot.getAxis('bottom').setLabel(xlabel)
-                if plotDataItemCount == 0 or plot.getAxis('left').labelText == '':
-                    group = self.seriesAttr('group', index)
-                    ylabel = self.seriesAttr('ylabel', index)
-                    if isinstance(group, int):
-                        ylabel = str(group) + ":" + ylabel
-                    plot.getAxis('left').setLabel(ylabel)
-                
-                # text items
-                if 'labels' in series:
-                    for label in series['labels']:
-                        if len(textItems) > textItemCount:
-                            # update existing text item
-                            textItem = textItems[textItemCount]
-                        else:
-                            # add new text item
-                            textItem = TextItem()
-                            plot.getViewBox().addItem(textItem)
-                            textItems.append(textItem)
-                        textItem.seriesDict = series
-                        textItem.setLabelDict(label)
-                        textItemCount += 1
-                
-                # next plot data item
-                plotDataItemCount += 1
-            
-            # remove extra plot data items
-            while len(plotDataItems) > plotDataItemCount:
-                plotDataItem = plotDataItems.pop()
-                plot.removeItem(plotDataItem)
-                plotDataItem.deleteLater()
-            
-            # remove extra text items
-            while len(textItems) > textItemCount:
-                textItem = textItems.pop()
-                plot.getViewBox().removeItem(textItem)
-                textItem.deleteLater()
-                
-            # show/hide plot
-            if group in visibleGroups:
-                plot.show()
-            else:
-                plot.hide()
-        
-        # remove extra plots
-        while len(plots) > len(groups):
-            i = len(plots) - 1
-            self._groupPlotsLayout.takeAt(i)
-            plot = plots.pop(i)
-            plot.deleteLater()
-
-        # left align visible plot axes
-        visiblePlots = [plot for plot in plots if plot.isVisible()]
-        leftAxisWidths = [plot.getAxis('left').width() for plot in visiblePlots]
-        for plot in visiblePlots:
-            plot.getAxis('left').setWidth(max(leftAxisWidths))
-
-        # link x-axis
-        # TODO: link based on xlink attr?
-        for i in range(1, len(plots)):
-            plots[i].setXLink(plots[0])
-    
-    def groupPlots(self):
-        widgets = [self._groupPlotsLayout.itemAt(i).widget() for i in range(self._groupPlotsLayout.count())]
-        plots = [widget for widget in widgets if isinstance(widget, PlotWidget)]
-        return plots
-    
-    def nextEpisode(self):
-        episodes = self.seriesEpisodes()
-        if not episodes:
-            return
-        if self._visibleEpisodesEdit.text().strip() == '':
-            self.setVisibleEpisodes([episodes[0]])
-            return
-        visibleEpisodes = self.visibleEpisodes()
-        if not visibleEpisodes:
-            self.setVisibleEpisodes([episodes[0]])
-            return
-        index = episodes.index(visibleEpisodes[-1])
-        index = min(index + 1, len(episodes) - 1)
-        self.setVisibleEpisodes([episodes[index]])
-    
-    def prevEpisode(self):
-        episodes = self.seriesEpisodes()
-        if not episodes:
-            return
-        if self._visibleEpisodesEdit.text().strip() == '':
-            self.setVisibleEpisodes([episodes[-1]])
-            return
-        visibleEpisodes = self.visibleEpisodes()
-        if not visibleEpisodes:
-            self.setVisibleEpisodes([episodes[-1]])
-            return
-        index = episodes.index(visibleEpisodes[0])
-        index = max(0, index - 1)
-        self.setVisibleEpisodes([episodes[index]])
-    
-    def _updateVisibleGroupsListView(self):
-        groups = self.seriesGroups()
-        groupNames = self.groupNames()
-        listWidget = self._visibleGroupsListWidget
-        selectedIndexes = [index.row() for index in listWidget.selectedIndexes()]
-        listWidget.itemSelectionChanged.disconnect()
-        listWidget.clear()
-        if qta is not None:
-            for name in groupNames:
-                item = QListWidgetItem(name)
-                item.setIcon(qta.icon('mdi.circle-small'))
-                listWidget.addItem(item)
-            listWidget.setIconSize(QSize(16, 16))
-        else:
-            listWidget.addItems(groupNames)
-        for i in selectedIndexes:
-            if i < len(groups):
-                listWidget.item(i).setSelected(True)
-        listWidget.itemSelectionChanged.connect(self._onVisibleGroupsChanged)
-    
-    def _onVisibleGroupsChanged(self):
-        groups = self.seriesGroups()
-        visibleGroups = self.visibleGroups()
-        for i, plot in enumerate(self.groupPlots()):
-            if i < len(groups) and groups[i] in visibleGroups:
-                plot.show()
-            else:
-                plot.hide()
-
-    def _updateVisibleNamesListView(self):
-        names = self.seriesNames()
-        listWidget = self._visibleNamesListWidget
-        selectedIndexes = [index.row() for index in listWidget.selectedIndexes()]
-        listWidget.itemSelectionChanged.disconnect()
-        listWidget.clear()
-        if qta is not None:
-            for name in names:
-                item = QListWidgetItem(name)
-                item.setIcon(qta.icon('mdi.circle-small'))
-                listWidget.addItem(item)
-            listWidget.setIconSize(QSize(16, 16))
-        else:
-            listWidget.addItems(names)
-        for i in selectedIndexes:
-            if i < len(names):
-                listWidget.item(i).setSelected(True)
-        listWidget.itemSelectionChanged.connect(self._onVisibleNamesChanged)
-    
-    def _onVisibleNamesChanged(self):
-        self._updateGroupPlots()
-    
-    def showDataTable(self):
-        if self._dataTableModel is not None:
-            self._dataTableModel.deleteLater()
-        self._dataTableModel = DataTableModel(self)
-
-        if self._dataTableView is None:
-            self._dataTableView = QTableView()
-        self._dataTableView.setModel(self._dataTableModel)
-        self._dataTableView.show()
-        self._dataTableView.resizeColumnsToContents()
-    
-    def showCosole(self):
-        if self._console is None:
-            return
-        self._console.show()
-    
-    def _makeAction(self, parent, text, func, qta_icon=None) -> QAction:
-        action = QAction(parent)
-        action.setText(text)
-        if qta_icon is not None and qta is not None:
-            icon = qta.icon(qta_icon)
-            action.setIcon(icon)
-        action.triggered.connect(func)
-        return action
-    
 
-class PlotWidget(pg.PlotWidget):
-    """ pg.PlotWidget with custom view box. """
-
-    def __init__(self,  *args, **kwargs):
-        kwargs['viewBox'] = ViewBox()
-        pg.PlotWidget.__init__(self, *args, **kwargs)
-
-        # colormap (for default line colors)
-        self.colormap = [
-            [0, 113.9850, 188.9550],
-            [216.7500, 82.8750, 24.9900],
-            [236.8950, 176.9700, 31.8750],
-            [125.9700, 46.9200, 141.7800],
-            [118.8300, 171.8700, 47.9400],
-            [76.7550, 189.9750, 237.9150],
-            [161.9250, 19.8900, 46.9200]
-        ]
-        self.colorIndex = 0
-
-
-class ViewBox(pg.ViewBox):
-    """ pg.ViewBox with custom context menu for measuring and curve fitting. """
 
-    def __init__(self,  *args, **kwargs):
-        pg.ViewBox.__init__(self, *args, **kwargs)
+def hekaSweepTraceIndexes(bundle, hekaGroupIndex=0) -> list:
+    """ Trace indexes (group, series, sweep, trace) in file order for each sweep in HEKA group hekaGroupIndex. """
+    hekaGroup = bundle.pul[hekaGroupIndex]
+    sweeps = []
+    for hekaSeriesIndex in range(len(hekaGroup)):
+        for hekaSweepIndex in range(len(hekaGroup[hekaSeriesIndex])):
+            numHekaTraces = len(hekaGroup[hekaSeriesIndex][hekaSweepIndex])
+            sweeps.append([(hekaGroupIndex, hekaSeriesIndex, hekaSweepIndex, hekaTraceIndex) for hekaTraceIndex in range(numHekaTraces)])
+    return sweeps
 
-        self._initContextMenu()
 
-        self._isDrawingROIs = False
+def hekaTraceSeries(bundle, index, y=None) -> dict:
+    """ Series dict for HEKA trace at index (group, series, sweep, trace) in bundle. Pass y if already decoded. """
+    hekaGroupIndex, hekaSeriesIndex, hekaSweepIndex, hekaTraceIndex = index
+    trace = bundle.pul[hekaGroupIndex][hekaSeriesIndex][hekaSweepIndex][hekaTraceIndex]
+    episode = hekaSweepIndex
+    group = hekaTraceIndex
+    # uniform sampling: interval x and start x0
+    x = trace.XInterval
+    x0 = trace.XStart
+    if y is None:
+        y = hekaTraceY(bundle, index)
+    xlabel = 'Time, ' + trace.XUnit
+    ylabel = trace.Label + ', ' + trace.YUnit
+    return {'x': x, 'x0': x0, 'y': y, 'xlabel': xlabel, 'ylabel': ylabel, 'episode': episode, 'group': group}
 
-        self.sigTransformChanged.connect(self._onViewChanged)
-        self.sigResized.connect(self._onViewChanged)
-    
-    def getPlotItem(self):
-        return self.parentWidget()
-    
-    def getPlotWidget(self):
-        return self.getViewWidget()
-    
-    def mousePressEvent(self, event):
-        if self._isDrawingROIs:
-            if event.button() == Qt.LeftButton:
-                posInAxes = self.mapSceneToView(self.mapToScene(event.pos()))
-                if self._roiOrientation == "vertical":
-                    posAlongAxis = posInAxes.x()
-                elif self._roiOrientation == "horizontal":
-                    posAlongAxis = posInAxes.y()
-                self._roiStartPos = posAlongAxis
-            else:
-                self.stopDrawingROIs()
-            event.accept()
-            return
-        pg.ViewBox.mousePressEvent(self, event)
-    
-    def mouseReleaseEvent(self, event):
-        if self._isDrawingROIs:
-            if event.button() == Qt.LeftButton:
-                self._roi = None
-                event.accept()
-                return
-        pg.ViewBox.mouseReleaseEvent(self, event)
-    
-    def mouseMoveEvent(self, event):
-        if self._isDrawingROIs:
-            if event.buttons() & Qt.LeftButton:
-                posInAxes = self.mapSceneToView(self.mapToScene(event.pos()))
-                if self._roiOrientation == "vertical":
-                    posAlongAxis = posInAxes.x()
-                elif self._roiOrientation == "horizontal":
-                    posAlongAxis = posInAxes.y()
-                limits = sorted([self._roiStartPos, posAlongAxis])
-                if self._roi is None:
-                    self._roi = LinearRegionItem(orientation=self._roiOrientation, values=limits)
-                    self.addItem(self._roi)
-                else:
-                    self._roi.setRegion(limits)
-                event.accept()
-                return
-        pg.ViewBox.mouseMoveEvent(self, event)
-    
-    def _initContextMenu(self):
-        self._roiMenu = QMenu("ROIs")
-        self._roiMenu.addAction("Draw X-Axis ROIs", lambda: self.startDrawingROIs(orientation="vertical"))
-        self._roiMenu.addSection(" ")
-        self._roiMenu.addAction("Hide All", self.hideROIs)
-        self._roiMenu.addAction("Show All", self.showROIs)
-        self._roiMenu.addSection(" ")
-        self._roiMenu.addAction("Delete All", self.deleteROIs)
-
-        self._measureMenu = QMenu("Measure")
-        self._measureMenu.addAction("Mean", lambda: self.measure(measurementType="mean"))
-        self._measureMenu.addAction("Median", lambda: self.measure(measurementType="median"))
-        self._measureMenu.addAction("Min", lambda: self.measure(measurementType="min"))
-        self._measureMenu.addAction("Max", lambda: self.measure(measurementType="max"))
-        self._measureMenu.addAction("AbsMax", lambda: self.measure(measurementType="absmax"))
-        self._measureMenu.addAction("Variance", lambda: self.measure(measurementType="var"))
-        self._measureMenu.addAction("Standard Deviation", lambda: self.measure(measurementType="std"))
-
-        self._curveFitMenu = QMenu("Curve Fit")
-        self._curveFitMenu.addAction("Mean", lambda: self.curveFit(fitType="mean"))
-        self._curveFitMenu.addAction("Line", lambda: self.curveFit(fitType="line"))
-        self._curveFitMenu.addAction("Polynomial", lambda: self.curveFit(fitType="polynomial"))
-        self._curveFitMenu.addAction("Spline", lambda: self.curveFit(fitType="spline"))
-        self._curveFitMenu.addAction("Custom", lambda method="custom": self.curveFit(fitType=method))
-
-        # append to default context menu
-        self.menu.addSection(" ")
-        self.menu.addMenu(self._roiMenu)
-        self.menu.addSection(" ")
-        self.menu.addMenu(self._measureMenu)
-        self.menu.addMenu(self._curveFitMenu)
-        self.menu.addSection(" ")
-    
-    def _onViewChanged(self):
-        for item in self.allChildren():
-            if isinstance(item, LinearRegionItem):
-                # reposition ROI label
-                item.updateLabelPos()
-    
-    def startDrawingROIs(self, orientation="vertical"):
-        self._isDrawingROIs = True
-        self._roiOrientation = orientation
-        self._roi = None
-
-    def stopDrawingROIs(self):
-        self._isDrawingROIs = False
-        self._roi = None
-    
-    def hideROIs(self):
-        for item in self.allChildren():
-            if isinstance(item, LinearRegionItem):
-                item.setVisible(False)
-    
-    def showROIs(self):
-        for item in self.allChildren():
-            if isinstance(item, LinearRegionItem):
-                item.setVisible(True)
-    
-    def deleteROIs(self):
-        for item in self.allChildren():
-            if isinstance(item, LinearRegionItem):
-                self.removeItem(item)
-                item.deleteLater()
 
+def hekaTraceY(bundle, index) -> np.ndarray:
+    hekaGroupIndex, hekaSeriesIndex, hekaSweepIndex, hekaTraceIndex = index
+    trace = bundle.pul[hekaGroupIndex][hekaSeriesIndex][hekaSweepIndex][hekaTraceIndex]
+    return bundle.data[index] + trace.YOffset
 
-class PlotDataItem(pg.PlotDataItem):
-    """ Clickable pg.PlotDataItem with context menu. """
 
-    def __init__(self, *args, **kwargs):
-        pg.PlotDataItem.__init__(self, *args, **kwargs)
+def loadHEKA(filepath, hekaGroupIndex=0) -> list:
+    """ Series dicts for all traces of HEKA group (experiment) hekaGroupIndex in file order (e.g., for batch processing). """
+    heka_reader = _optionalImport('heka_reader')
+    if heka_reader is None:
+        raise ImportError('Importing HEKA files requires heka_reader.')
+    bundle = heka_reader.Bundle(filepath)
+    if len(bundle.pul) == 0:
+        return []
+    return [hekaTraceSeries(bundle, index) for sweep in hekaSweepTraceIndexes(bundle, hekaGroupIndex) for index in sweep]
 
-        self.seriesDict = None
 
-        self.menu = None
-    
-    def _delete(self):
-        self.getViewBox().removeItem(self)
-        self.deleteLater()
+# HEKA bundle opened once in each worker process for parallel decoding.
+_hekaProcessBundle = None
 
-    def shape(self):
-        return self.curve.shape()
 
-    def boundingRect(self):
-        return self.shape().boundingRect()
-    
-    def setName(self, name):
-        self.opts['name'] = name
-    
-    def setCustomStyle(self, style: dict, colorIndex=0):
-        plot = self.getViewBox().getPlotWidget()
-        tsa = plot.parentWidget()
-
-        # color
-        color = tsa.styleAttr(style, 'color')
-        if color is not None:
-            color = str2color(color)
-        if color is None or (len(color) == 4 and color[3] == 0):
-            colormap = plot.colormap
-            color = colormap[colorIndex % len(colormap)]
-            color = [int(c) for c in color]
-            if len(color) == 3:
-                color.append(255)
-            color = tuple(color)
-            colorIndex += 1
-
-        # line
-        lineStyle = tsa.styleAttr(style, 'linestyle')
-        if not isinstance(lineStyle, int):
-            lineStyles = {
-                '-': Qt.SolidLine, '--': Qt.DashLine, ':': Qt.DotLine, '-.': Qt.DashDotLine, 
-                'none': None, '': None, None: Qt.SolidLine
-            }
-            lineStyle = lineStyles[lineStyle]
-
-        lineWidth = tsa.styleAttr(style, 'linewidth')
-        if lineWidth is None:
-            lineWidth = 2
-        else:
-            lineWidth = float(lineWidth)
-        
-        if lineStyle is None:
-            linePen = None
-        else:
-            linePen = pg.mkPen(color=color, width=lineWidth, style=lineStyle)
-        self.setPen(linePen)
+def _hekaProcessInit(filepath):
+    global _hekaProcessBundle
+    _hekaProcessBundle = _optionalImport('heka_reader').Bundle(filepath)
 
-        # symbol
-        symbol = tsa.styleAttr(style, 'marker')
-        self.setSymbol(symbol)
-        
-        symbolSize = tsa.styleAttr(style, 'markersize')
-        if symbolSize is None:
-            symbolSize = 10
-        else:
-            symbolSize = float(symbolSize)
-        self.setSymbolSize(symbolSize)
 
-        symbolEdgeWidth = tsa.styleAttr(style, 'markeredgewidth')
-        if symbolEdgeWidth is None:
-            symbolEdgeWidth = lineWidth
-        else:
-            symbolEdgeWidth = float(symbolEdgeWidth)
-        
-        symbolEdgeColor = tsa.styleAttr(style, 'markeredgecolor')
-        if symbolEdgeColor is None:
-            symbolEdgeColor = color
-        else:
-            symbolEdgeColor = str2color(symbolEdgeColor)
-        
-        symbolPen = pg.mkPen(color=symbolEdgeColor, width=symbolEdgeWidth)
-        self.setSymbolPen(symbolPen)
+def _hekaDecodeTraces(indexes):
+    """ Decode HEKA traces in a worker process.
 
-        symbolFaceColor = tsa.styleAttr(style, 'markerfacecolor')
-        if symbolFaceColor is None:
-            symbolFaceColor = symbolEdgeColor[:3] + (0,)
-        else:
-            symbolFaceColor = str2color(symbolFaceColor)
-        self.setSymbolBrush(symbolFaceColor)
-        
-        return colorIndex
-    
-    def mouseClickEvent(self, event):
-        if event.button() == Qt.RightButton:
-            if self.curve.mouseShape().contains(event.pos()):
-                if self.raiseContextMenu(event):
-                    self._lastClickPos = self.mapToView(event.pos())
-                    event.accept()
-    
-    def raiseContextMenu(self, event):
-        menu = self.getContextMenus()
-        
-        # Let the scene add on to the end of our context menu (this is optional)
-        menu = self.scene().addParentContextMenus(self, menu, event)
-        
-        pos = event.screenPos()
-        menu.popup(QPoint(int(pos.x()), int(pos.y())))
-        return True
-    
-    def getContextMenus(self, event=None):
-        name = self.name()
-        if name is None:
-            name = "Data Series"
-        self._dataMenu = QMenu(name)
-        self._dataMenu.addAction("Rename", self.editNameDialog)
-        self._dataMenu.addAction("Edit Style", self.editStyleDialog)
-        self._dataMenu.addSection(" ")
-        self._dataMenu.addAction("Add Label", self.addTextItem)
-        self._dataMenu.addSection(" ")
-        self._dataMenu.addAction("Delete", self._delete)
-
-        self.menu = QMenu()
-        self.menu.addMenu(self._dataMenu)
-        self.menu.addSection(" ")
-        return self.menu
-    
-    def editNameDialog(self):
-        name = self.name()
-        if name is None:
-            name = ''
-        name, ok = QInputDialog.getText(self.getViewBox().getPlotWidget(), "Series Name", "Name:", text=name)
-        if not ok:
-            return
-        name = name.strip()
-        if name == '':
-            name = None
-
-        # update this widget
-        self.setName(name)
-
-        # update series dict
-        if self.seriesDict is not None:
-            if name is None:
-                if 'name' in self.seriesDict:
-                    del self.seriesDict['name']
-                else:
-                    self.seriesDict['name'] = name
-    
-    def editStyleDialog(self):
-        try:
-            tsa = self.getViewBox().getPlotWidget().parentWidget()
-        except:
-            tsa = None
-        if (tsa is not None) and (self.seriesDict is not None):
-            style = tsa.seriesAttr('style', self.seriesDict)
-            if style is None:
-                style = {}
-        else:
-            style = None
-        
-        dlg = QDialog()
-        form = QFormLayout(dlg)
-
-        # QPen, QBrush
-        pen = pg.mkPen(self.opts['pen'])
-        symbolPen = pg.mkPen(self.opts['symbolPen'])
-        symbolBrush = pg.mkBrush(self.opts['symbolBrush'])
-
-        # Qt.PenStyle.NoPen = 0
-        # Qt.PenStyle.SolidLine = 1
-        # Qt.PenStyle.DashLine = 2
-        # Qt.PenStyle.DotLine = 3
-        # Qt.PenStyle.DashDotLine = 4
-        lineStyleComboBox = QComboBox()
-        lineStyleComboBox.addItems(['No Line', 'Solid Line', 'Dash Line', 'Dot Line', 'Dash Dot Line'])
-        lineStyleComboBox.setCurrentIndex(pen.style())  # Set via a Qt.PenStyle enum value.
-        form.addRow('Line Style', lineStyleComboBox)
-
-        lineWidthSpinBox = QDoubleSpinBox()
-        lineWidthSpinBox.setMinimum(0)
-        lineWidthSpinBox.setValue(pen.widthF())
-        form.addRow('Line Width', lineWidthSpinBox)
-
-        if style is not None:
-            color = tsa.styleAttr(style, 'color')
-            if color is None:
-                color = QColor('transparent')
-            else:
-                color = QColor(*color)
-        else:
-            color = pen.color()
-        colorButton = ColorButton(color)
-        defaultColorButton = QPushButton('Default')
-        defaultColorButton.setToolTip('Use current color in colormap')
-        defaultColorButton.clicked.connect(lambda: colorButton.setColor(QColor('transparent')))
-        colorLayout = QHBoxLayout()
-        colorLayout.setContentsMargins(0, 0, 0, 0)
-        colorLayout.setSpacing(5)
-        colorLayout.addWidget(colorButton)
-        colorLayout.addWidget(defaultColorButton)
-        form.addRow('Color', colorLayout)
-
-        markerComboBox = QComboBox()
-        markers = [None, 'o', 't', 't1', 't2', 't3', 's', 'p', 'h', 'star', '+', 'd', 'x']
-        markerComboBox.addItems([
-            'None', 'Circle', 'Triangle Down', 'Triangle Up', 'Triangle Right', 'Triangle Left', 'Square', 
-            'Pentagon', 'Hexagon', 'Star', 'Plus', 'Prism', 'Cross'])
-        markerComboBox.setCurrentIndex(markers.index(self.opts['symbol']))
-        form.addRow('Marker', markerComboBox)
-
-        markerSizeSpinBox = QDoubleSpinBox()
-        markerSizeSpinBox.setMinimum(0)
-        markerSizeSpinBox.setValue(self.opts['symbolSize'])
-        form.addRow('Marker Size', markerSizeSpinBox)
-
-        markerEdgeWidthSpinBox = QDoubleSpinBox()
-        markerEdgeWidthSpinBox.setMinimum(0)
-        markerEdgeWidthSpinBox.setValue(symbolPen.widthF())
-        form.addRow('Marker Edge Width', markerEdgeWidthSpinBox)
-
-        if style is not None:
-            markerEdgeColor = tsa.styleAttr(style, 'markeredgecolor')
-            if markerEdgeColor is None:
-                markerEdgeColor = QColor('transparent')
-            else:
-                markerEdgeColor = QColor(*markerEdgeColor)
-        else:
-            markerEdgeColor = symbolPen.color()
-        markerEdgeColorButton = ColorButton(markerEdgeColor)
-        defaultMarkerEdgeColorButton = QPushButton('Default')
-        defaultMarkerEdgeColorButton.setToolTip('Same as color')
-        defaultMarkerEdgeColorButton.clicked.connect(lambda: markerEdgeColorButton.setColor(QColor('transparent')))
-        markerEdgeColorLayout = QHBoxLayout()
-        markerEdgeColorLayout.setContentsMargins(0, 0, 0, 0)
-        markerEdgeColorLayout.setSpacing(5)
-        markerEdgeColorLayout.addWidget(markerEdgeColorButton)
-        markerEdgeColorLayout.addWidget(defaultMarkerEdgeColorButton)
-        form.addRow('Marker Edge Color', markerEdgeColorLayout)
-
-        if style is not None:
-            markerFaceColor = tsa.styleAttr(style, 'markerfacecolor')
-            if markerFaceColor is None:
-                markerFaceColor = QColor('transparent')
-            else:
-                markerFaceColor = QColor(*markerFaceColor)
-        else:
-            markerFaceColor = symbolBrush.color()
-        markerFaceColorButton = ColorButton(markerFaceColor)
-        defaultMarkerFaceColorButton = QPushButton('Default')
-        defaultMarkerFaceColorButton.setToolTip('Transparent')
-        defaultMarkerFaceColorButton.clicked.connect(lambda: markerFaceColorButton.setColor(QColor('transparent')))
-        markerFaceColorLayout = QHBoxLayout()
-        markerFaceColorLayout.setContentsMargins(0, 0, 0, 0)
-        markerFaceColorLayout.setSpacing(5)
-        markerFaceColorLayout.addWidget(markerFaceColorButton)
-        markerFaceColorLayout.addWidget(defaultMarkerFaceColorButton)
-        form.addRow('Marker Edge Color', markerFaceColorLayout)
-
-        btns = QDialogButtonBox()
-        btns.setStandardButtons(QDialogButtonBox.Cancel | QDialogButtonBox.Ok)
-        btns.accepted.connect(dlg.accept)
-        btns.rejected.connect(dlg.reject)
-        form.addRow(btns)
-
-        dlg.setWindowModality(Qt.ApplicationModal)
-        if dlg.exec_() != QDialog.Accepted:
-            return
-        
-        # apply style
-        linestyle = lineStyleComboBox.currentIndex()
-        lineWidth = lineWidthSpinBox.value()
-        color = colorButton.color()
-        if color == QColor('transparent'):
-            color = None
-        marker = markers[markerComboBox.currentIndex()]
-        markerSize = markerSizeSpinBox.value()
-        markerEdgeWidth = markerEdgeWidthSpinBox.value()
-        markerEdgeColor = markerEdgeColorButton.color()
-        if markerEdgeColor == QColor('transparent'):
-            markerEdgeColor = None
-        markerFaceColor = markerFaceColorButton.color()
-        if markerFaceColor == QColor('transparent'):
-            markerFaceColor = None
-
-        pen.setStyle(linestyle)
-        pen.setWidthF(lineWidth)
-        if color is not None:
-            pen.setColor(color)
-        self.setPen(pen)
-
-        self.setSymbol(marker)
-        self.setSymbolSize(markerSize)
-
-        symbolPen.setWidthF(markerEdgeWidth)
-        if markerEdgeColor is not None:
-            symbolPen.setColor(markerEdgeColor)
-        else:
-            symbolPen.setColor(pen.color())
-        self.setSymbolPen(symbolPen)
+    The concatenated arrays are left in a new shared memory block rather than pickled back to the parent process,
+    which copies them out and unlinks the block. Returns (shared memory name, dtype, array lengths).
+    """
+    ys = [hekaTraceY(_hekaProcessBundle, index) for index in indexes]
+    lengths = [len(y) for y in ys]
+    dtype = np.result_type(*ys)
+    sharedMemory = shared_memory.SharedMemory(create=True, size=max(1, sum(lengths) * dtype.itemsize))
+    buffer = np.ndarray((sum(lengths),), dtype=dtype, buffer=sharedMemory.buf)
+    np.concatenate(ys, out=buffer)
+    del buffer
+    sharedMemory.close()
+    return sharedMemory.name, dtype.str, lengths
+
+
+def measureRegions(xs, ys, regions, measurementType='mean', masks=None):
+    """
+    Measure each of the (possibly ragged) series xs[i], ys[i] within each x region (xmin, xmax) in one vectorized pass.
 
-        if markerFaceColor is not None:
-            symbolBrush.setColor(markerFaceColor)
+    measurementType: mean, median, min, max, absmax, var or std.
+    masks: optional x intervals to exclude (see mergeIntervals) for each series (or None).
+    Returns x, y arrays of shape (#series, #regions). x is the region center, except for min, max and absmax
+    where it is the location of the extreme value. Regions that do not contain any (unmasked) samples of a series are NaN.
+    """
+    regions = np.asarray(regions, dtype=float).reshape(-1, 2)
+    numSeries, numRegions = len(ys), len(regions)
+    mx = np.full((numSeries, numRegions), np.nan)
+    my = np.full((numSeries, numRegions), np.nan)
+    if numSeries == 0 or numRegions == 0:
+        return mx, my
+
+    # sample index range of each region in each series (x is increasing)
+    starts = np.zeros((numSeries, numRegions), dtype=int)
+    stops = np.zeros((numSeries, numRegions), dtype=int)
+    for i, x in enumerate(xs):
+        starts[i] = np.searchsorted(x, regions[:, 0], 'left')
+        stops[i] = np.minimum(np.searchsorted(x, regions[:, 1], 'right'), np.size(ys[i]))
+    lengths = np.maximum(stops - starts, 0)
+    # (i, j) -> sample indexes of region j in series i without the masked samples (only for masked series)
+    segmentIndexes = {}
+    if masks is not None:
+        for i, mask in enumerate(masks):
+            if mask is None or len(mask) == 0:
+                continue
+            maskStarts, maskStops = maskRanges(xs[i], mask)
+            for j in np.flatnonzero(lengths[i]):
+                indexes = np.arange(starts[i, j], stops[i, j])
+                segmentIndexes[i, j] = indexes[~_inRanges(indexes, maskStarts, maskStops)]
+                lengths[i, j] = len(segmentIndexes[i, j])
+    nonempty = np.flatnonzero(lengths > 0)
+    if len(nonempty) == 0:
+        return mx, my
+    
+    # all segments end to end so each measurement is a single reduction over segments
+    rows, cols = np.unravel_index(nonempty, lengths.shape)
+    values = np.concatenate([np.asarray(ys[i][starts[i, j]:stops[i, j]], dtype=float) if (i, j) not in segmentIndexes 
+        else np.asarray(ys[i], dtype=float)[segmentIndexes[i, j]] for i, j in zip(rows, cols)])
+    counts = lengths[rows, cols]
+    offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+
+    if measurementType == 'mean':
+        result = np.add.reduceat(values, offsets) / counts
+    elif measurementType in ['var', 'std']:
+        mean = np.add.reduceat(values, offsets) / counts
+        result = np.add.reduceat((values - np.repeat(mean, counts))**2, offsets) / counts
+        if measurementType == 'std':
+            result = np.sqrt(result)
+    elif measurementType == 'median':
+        # no median reduceat, but segments of equal length can be stacked and partitioned together
+        result = np.empty(len(counts))
+        for count in np.unique(counts):
+            segments = np.flatnonzero(counts == count)
+            result[segments] = np.median(values[offsets[segments, None] + np.arange(count)], axis=1)
+    elif measurementType in ['min', 'max', 'absmax']:
+        if measurementType == 'min':
+            extremes = np.minimum.reduceat(values, offsets)
+            hits = values == np.repeat(extremes, counts)
+        elif measurementType == 'max':
+            extremes = np.maximum.reduceat(values, offsets)
+            hits = values == np.repeat(extremes, counts)
         else:
-            r = symbolPen.color().red()
-            g = symbolPen.color().green()
-            b = symbolPen.color().blue()
-            symbolBrush.setColor(QColor(r, g, b, 0))
-        self.setSymbolBrush(symbolBrush)
-
-        # update style dict
-        if style is None:
-            return
-
-        lineStyles = ['none', '-', '--', ':', '-.']
-        tsa.setStyleAttr(style, 'linestyle', lineStyles[linestyle])
-        tsa.setStyleAttr(style, 'linewidth', lineWidth)
-        if colorButton.colorWasPicked():
-            if color:
-                color = color.red(), color.green(), color.blue(), color.alpha()
-            tsa.setStyleAttr(style, 'color', color)
-        tsa.setStyleAttr(style, 'marker', marker)
-        tsa.setStyleAttr(style, 'markersize', markerSize)
-        tsa.setStyleAttr(style, 'markeredgewidth', markerEdgeWidth)
-        if markerEdgeColorButton.colorWasPicked():
-            if markerEdgeColor:
-                markerEdgeColor = markerEdgeColor.red(), markerEdgeColor.green(), markerEdgeColor.blue(), markerEdgeColor.alpha()
-            tsa.setStyleAttr(style, 'markeredgecolor', markerEdgeColor)
-        if markerFaceColorButton.colorWasPicked():
-            if markerFaceColor:
-                markerFaceColor = markerFaceColor.red(), markerFaceColor.green(), markerFaceColor.blue(), markerFaceColor.alpha()
-            tsa.setStyleAttr(style, 'markerfacecolor', markerFaceColor)
-        tsa.setSeriesAttr('style', style, self.seriesDict)
+            extremes = np.maximum.reduceat(np.abs(values), offsets)
+            hits = np.abs(values) == np.repeat(extremes, counts)
+        # first occurrence of the extreme value in each segment (if any, e.g., not for all NaN segments)
+        firstHits = np.minimum.reduceat(np.where(hits, np.arange(len(values)), len(values)), offsets)
+        found = firstHits < len(values)
+        firstHits[~found] = offsets[~found]
+        result = np.where(found, values[firstHits], np.nan)
+        indexes = starts[rows, cols] + firstHits - offsets
+        if segmentIndexes:
+            for n, (i, j) in enumerate(zip(rows, cols)):
+                if (i, j) in segmentIndexes and found[n]:
+                    indexes[n] = segmentIndexes[i, j][firstHits[n] - offsets[n]]
+        locations = np.empty(len(counts))
+        # segments are ordered by series
+        for segments in np.split(np.arange(len(rows)), np.flatnonzero(np.diff(rows)) + 1):
+            locations[segments] = xs[rows[segments[0]]][indexes[segments]]
+        mx[rows, cols] = np.where(found, locations, np.nan)
+        my[rows, cols] = result
+        return mx, my
+    else:
+        raise ValueError(f'Unknown measurement type: {measurementType}')
     
-    def addTextItem(self):
-        if self.seriesDict is None:
-            return
-        textItem = TextItem()
-        self.getViewBox().addItem(textItem)
-        textItem.seriesDict = self.seriesDict
-        x = self._lastClickPos.x()
-        y = self._lastClickPos.y()
-        labelDict = {'x': x, 'y': y, 'text': ''}
-        if 'labels' not in self.seriesDict:
-            self.seriesDict['labels'] = [labelDict]
-        else:
-            self.seriesDict['labels'].append(labelDict)
-        textItem.setLabelDict(labelDict)
-        textItem.editDialog()
-        print(self.seriesDict)
+    mx[rows, cols] = regions[cols].mean(axis=1)
+    my[rows, cols] = result
+    return mx, my
 
 
-class LinearRegionItem(pg.LinearRegionItem):
-    """ pg.LinearRegionItem with optional label in upper left corner and context menu for editing. """
+def regionIndexes(x, regions, mask=None) -> np.ndarray:
+    """ Indexes of increasing x samples within any of the x regions (xmin, xmax), except those within the mask intervals. """
+    # merged regions so that indexes are unique and increasing
+    starts, stops = maskRanges(x, mergeIntervals(regions))
+    indexes = [np.arange(start, stop) for start, stop in zip(starts, stops) if stop > start]
+    if not indexes:
+        return np.array([], dtype=int)
+    indexes = np.concatenate(indexes)
+    if mask is not None and len(mask):
+        indexes = indexes[~_inRanges(indexes, *maskRanges(x, mask))]
+    return indexes
 
-    def __init__(self, *args, **kwargs):
-        pg.LinearRegionItem.__init__(self, *args, **kwargs)
 
-        # self._labelItem = None
-        self.menu = None
-
-        # self.sigRegionChanged.connect(self._onRegionChanged)
-    
-    def _delete(self):
-        # self.removeLabel()
-        self.getViewBox().removeItem(self)
-        self.deleteLater()
-    
-    def _setVisible(self, isVisible: bool):
-        self.setVisible(isVisible)
-        # if self._labelItem:
-        #     self._labelItem.setVisible(isVisible)
-    
-    # def _onRegionChanged(self):
-    #     self.updateLabelPos()
-    
-    def mouseClickEvent(self, event):
-        if event.button() == Qt.RightButton:
-            if self.boundingRect().contains(event.pos()):
-                if self.raiseContextMenu(event):
-                    event.accept()
-    
-    def raiseContextMenu(self, event):
-        menu = self.getContextMenus()
-        
-        # Let the scene add on to the end of our context menu (this is optional)
-        menu = self.scene().addParentContextMenus(self, menu, event)
-        
-        pos = event.screenPos()
-        menu.popup(QPoint(int(pos.x()), int(pos.y())))
-        return True
-    
-    def getContextMenus(self, event=None):
-        self._roiMenu = QMenu("ROI")
-        self._roiMenu.addAction("Set Limits", self.editDialog)
-        self._roiMenu.addSection(" ")
-        self._roiMenu.addAction("Hide", lambda: self._setVisible(False))
-        self._roiMenu.addSection(" ")
-        self._roiMenu.addAction("Delete", self._delete)
-
-        self.menu = QMenu()
-        self.menu.addMenu(self._roiMenu)
-        self.menu.addSection(" ")
-        return self.menu
-    
-    # def labelText(self):
-    #     try:
-    #         return self._labelItem.text
-    #     except:
-    #         return ''
-    
-    # def setLabelText(self, text):
-    #     if text == '':
-    #         self.removeLabel()
-    #         return
-    #     if self._labelItem is None:
-    #         self._labelItem = pg.LabelItem(text=text, size="8pt", color=(0,0,0,128))
-    #         self._labelItem.setParentItem(self.getViewBox())
-    #         self.updateLabelPos()
-    #     else:
-    #         self._labelItem.setText(text)
-    
-    # def removeLabel(self):
-    #     if self._labelItem is not None:
-    #         self.getViewBox().removeItem(self._labelItem)
-    #         self._labelItem = None
-    
-    # def updateLabelPos(self):
-    #     """ place label in upper left of visible portion of region """
-    #     if self._labelItem is None:
-    #         return
-    #     viewBox = self.getViewBox()
-    #     if self.orientation == 'vertical':
-    #         xViewMin, xViewMax = viewBox.viewRange()[0]
-    #         xRegionMin, xRegionMax = self.getRegion()
-    #         if xRegionMin >= xViewMax or xRegionMax <= xViewMin:
-    #             # hide the label if the region is not visible
-    #             self._labelItem.setVisible(False)
-    #             return
-    #         xFraction = (max(xRegionMin, xViewMin) - xViewMin) / (xViewMax - xViewMin)
-    #         # itemPos=(0,0) => anchor top left of label
-    #         # parentPos=(x,0) => place label anchor at top left of portion of region in view
-    #         # offset=(2,2) => offset label 2 pixels right and 2 pixels down
-    #         self._labelItem.anchor(itemPos=(0,0), parentPos=(xFraction,0), offset=(2,2))
-    #         self._labelItem.setVisible(True)
-    #     elif self.orientation == 'horizontal':
-    #         yViewMin, yViewMax = viewBox.viewRange()[1]
-    #         yRegionMin, yRegionMax = self.getRegion()
-    #         if yRegionMin >= yViewMax or yRegionMax <= yViewMin:
-    #             # hide the label if the region is not visible
-    #             self._labelItem.setVisible(False)
-    #             return
-    #         yFraction = (yViewMax - min(yRegionMax, yViewMax)) / (yViewMax - yViewMin)
-    #         # itemPos=(0,0) => anchor top left of label
-    #         # parentPos=(0,y) => place label anchor at top left of portion of region in view
-    #         # offset=(2,2) => offset label 2 pixels right and 2 pixels down
-    #         self._labelItem.anchor(itemPos=(0,0), parentPos=(0,yFraction), offset=(2,2))
-    #         self._labelItem.setVisible(True)
-    
-    def editDialog(self):
-        dlg = QDialog()
-        form = QFormLayout(dlg)
+def mergeIntervals(intervals) -> np.ndarray:
+    """
+    Sorted (N, 2) array of x intervals (xmin, xmax) with overlapping intervals merged, e.g., series masks.
 
-        limits = self.getRegion()
-        form.addRow('Limits', QLineEdit(str(limits[0])+", "+str(limits[1])))
-        # form.addRow('Label', QLineEdit(self.labelText()))
+    A series mask (the 'mask' attribute, see TimeSeriesAnalyzer.maskSeries) holds the x intervals of samples that are
+    excluded from plots, measurements and fits. It is only a few numbers per artifact and series with the same mask share it.
+    """
+    merged = []
+    for xmin, xmax in sorted([tuple(interval) for interval in np.asarray(intervals, dtype=float).reshape(-1, 2)]):
+        if merged and xmin <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], xmax)
+        else:
+            merged.append([xmin, xmax])
+    return np.asarray(merged, dtype=float).reshape(-1, 2)
 
-        btns = QDialogButtonBox()
-        btns.setStandardButtons(QDialogButtonBox.Cancel | QDialogButtonBox.Ok)
-        btns.accepted.connect(dlg.accept)
-        btns.rejected.connect(dlg.reject)
-        form.addRow(btns)
 
-        dlg.setWindowModality(Qt.ApplicationModal)
-        if dlg.exec_() == QDialog.Accepted:
-            limits = [float(value) for value in form.itemAt(0, 1).widget().text().split(',')]
-            self.setRegion(sorted(limits))
-            # text = form.itemAt(1, 1).widget().text()
-            # self.setLabelText(text)
+def maskRanges(x, mask) -> tuple:
+    """ Sample index ranges [starts, stops) of increasing x within the sorted, merged x intervals of mask. """
+    mask = np.asarray(mask, dtype=float).reshape(-1, 2)
+    return np.searchsorted(x, mask[:, 0], 'left'), np.searchsorted(x, mask[:, 1], 'right')
 
 
-class TextItem(pg.TextItem):
-    """ Draggable pg.TextItem with context menu for editing text, color, etc. """
+def _inRanges(indexes, starts, stops) -> np.ndarray:
+    # whether each index is within any of the sorted, non-overlapping ranges [starts, stops)
+    if len(starts) == 0:
+        return np.zeros(len(indexes), dtype=bool)
+    i = np.searchsorted(starts, indexes, 'right') - 1
+    return (i >= 0) & (indexes < stops[np.maximum(i, 0)])
 
-    def __init__(self, *args, **kwargs):
-        pg.TextItem.__init__(self, *args, **kwargs)
 
-        self.seriesDict = None
-        self.labelDict = None
-        
-        self.menu = None
+def maskedValues(x, y, mask) -> np.ndarray:
+    """ Float copy of y with the samples within the mask intervals set to NaN (e.g., for drawing broken segments). """
+    y = np.array(y, dtype=float)
+    if mask is not None:
+        for start, stop in zip(*maskRanges(x, mask)):
+            y[start:stop] = np.nan
+    return y
 
-        self.setColor((0,0,0,255))
-    
-    def _delete(self):
-        if self.seriesDict is not None:
-            if self.labelDict is not None:
-                self.seriesDict['labels'].remove(self.labelDict)
-        self.getViewBox().removeItem(self)
-        self.deleteLater()
-    
-    def setLabelDict(self, labelDict: dict):
-        self.labelDict = labelDict
 
-        self.setPlainText(labelDict['text'])
+def polyfitRegions(xs, ys, regions, degree=1, masks=None) -> list:
+    """
+    Least squares polynomial fits to each of the (possibly ragged) series xs[i], ys[i] within the x regions
+    (without the samples within masks[i], if given, see mergeIntervals).
 
-        x = labelDict.get('x', self.pos().x())
-        y = labelDict.get('y', self.pos().y())
-        self.setPos(x, y)
+    The normal equations of all series are accumulated with reduceat over their concatenated samples
+    and solved as one stack of (degree+1)x(degree+1) systems. For conditioning, x is mapped to [-1, 1]
+    for each series (the domain of the returned np.polynomial.Polynomial fits, None for series without samples).
+    """
+    fits = [None] * len(ys)
+    if masks is None:
+        masks = [None] * len(xs)
+    indexes = [regionIndexes(x, regions, mask) for x, mask in zip(xs, masks)]
+    fitted = [i for i, index in enumerate(indexes) if len(index)]
+    if not fitted:
+        return fits
+    x = np.concatenate([np.asarray(xs[i][indexes[i]], dtype=float) for i in fitted])
+    y = np.concatenate([np.asarray(ys[i], dtype=float)[indexes[i]] for i in fitted])
+    counts = np.array([len(indexes[i]) for i in fitted])
+    offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+
+    # map x to t in [-1, 1] for each series
+    center = (np.minimum.reduceat(x, offsets) + np.maximum.reduceat(x, offsets)) / 2
+    halfWidth = np.maximum.reduceat(x, offsets) - center
+    halfWidth[halfWidth == 0] = 1
+    t = (x - np.repeat(center, counts)) / np.repeat(halfWidth, counts)
+
+    # normal equations A c = b with A[j, k] = sum t^(j+k) and b[j] = sum t^j y
+    moments = np.empty((len(fitted), 2 * degree + 1))
+    b = np.empty((len(fitted), degree + 1))
+    power = np.ones(len(t))
+    for k in range(2 * degree + 1):
+        moments[:, k] = np.add.reduceat(power, offsets)
+        if k <= degree:
+            b[:, k] = np.add.reduceat(power * y, offsets)
+        power *= t
+    A = moments[:, np.add.outer(np.arange(degree + 1), np.arange(degree + 1))]
+    # pinv for series with fewer samples than coefficients
+    coef = np.matmul(np.linalg.pinv(A), b[:, :, None])[:, :, 0]
+    
+    for n, i in enumerate(fitted):
+        domain = [center[n] - halfWidth[n], center[n] + halfWidth[n]]
+        fits[i] = np.polynomial.Polynomial(coef[n], domain=domain, window=[-1, 1])
+    return fits
+
+
+def splinefitRegions(xs, ys, regions, numKnots=8, masks=None) -> list:
+    """ Least squares cubic spline fits with numKnots evenly spaced interior knots to each series xs[i], ys[i] within the x regions (except masks[i]). """
+    fits = []
+    if masks is None:
+        masks = [None] * len(xs)
+    for x, y, mask in zip(xs, ys, masks):
+        index = regionIndexes(x, regions, mask)
+        x = np.asarray(x[index], dtype=float)
+        y = np.asarray(y, dtype=float)[index]
+        if len(x) < 4:
+            fits.append(None)
+            continue
+        knots = np.linspace(x[0], x[-1], min(numKnots, len(x) - 4) + 2)[1:-1]
+        fits.append(sp.interpolate.LSQUnivariateSpline(x, y, knots, k=3))
+    return fits
+
+
+def lmfitRegions(xs, ys, regions, expression, initialValues=None, processes=None, masks=None) -> list:
+    """
+    Fits of lmfit.models.ExpressionModel(expression) with independent variable x to each series xs[i], ys[i] within the x regions
+    (except masks[i], if given).
+
+    Each fit is warm started from the best fit parameters of the previous series (e.g., episode).
+    The first series is fitted here starting from initialValues (parameter name -> value, default 1).
+    The others are split into consecutive chunks that are fitted in parallel by the given number of worker processes
+    (None for one per core if there are at least 64 series), each chunk warm started from the first fit.
+    Returns parameter name -> best fit value for each series (None for series without samples).
+    """
+    lmfit = _optionalImport('lmfit')
+    if lmfit is None:
+        raise ImportError('Custom curve fits require lmfit.')
+    fits = [None] * len(ys)
+    if masks is None:
+        masks = [None] * len(xs)
+    indexes = [regionIndexes(x, regions, mask) for x, mask in zip(xs, masks)]
+    fitted = [i for i, index in enumerate(indexes) if len(index)]
+    if not fitted:
+        return fits
+    xs = [np.asarray(xs[i][indexes[i]], dtype=float) for i in fitted]
+    ys = [np.asarray(ys[i], dtype=float)[indexes[i]] for i in fitted]
+
+    model = lmfit.models.ExpressionModel(expression)
+    values = {name: 1.0 for name in model.param_names}
+    if initialValues:
+        values.update(initialValues)
+    values = _lmfitSeries(expression, values, xs[:1], ys[:1])[0]
+    if processes is None:
+        # fewer fits are not worth the process startup
+        processes = (os.cpu_count() or 1) if len(xs) >= 64 else 1
+    processes = max(1, min(processes, len(xs) - 1))
+    if processes == 1:
+        results = [values] + _lmfitSeries(expression, values, xs[1:], ys[1:])
+    else:
+        bounds = np.linspace(1, len(xs), processes + 1).astype(int)
+        # spawn rather than fork the GUI process along with its threads
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(processes, mp_context=context) as pool:
+            futures = [pool.submit(_lmfitSeries, expression, values, xs[start:stop], ys[start:stop]) 
+                for start, stop in zip(bounds[:-1], bounds[1:])]
+            results = [values] + [result for future in futures for result in future.result()]
+    for i, result in zip(fitted, results):
+        fits[i] = result
+    return fits
+
+
+def _lmfitSeries(expression, values, xs, ys) -> list:
+    """ Fit expression to each x, y in turn, each warm started from the previous fit (e.g., in a worker process). """
+    lmfit = _optionalImport('lmfit')
+    model = lmfit.models.ExpressionModel(expression)
+    results = []
+    for x, y in zip(xs, ys):
+        result = model.fit(y, model.make_params(**values), x=x)
+        values = dict(result.best_values)
+        results.append(values)
+    return results
+
+
+# Zero-phase digital filters (e.g., see TimeSeriesAnalyzer.filterSeries).
+
+filterTypes = ['lowpass', 'highpass', 'bandpass', 'bandstop', 'notch']
+filterChunkSize = 1 << 20  # longer traces are filtered in overlapping chunks of about this many samples (see filtfilt)
+filterBatchSize = 1 << 22  # samples of stacked equal-length series filtered per call (see TimeSeriesAnalyzer.filterSeries)
+
+
+def checkFilters(filters: list):
+    """ Raise ValueError for invalid filters (see filterSOS). """
+    for stage in filters:
+        if stage.get('type') not in filterTypes:
+            raise ValueError(f'Unknown filter type: {stage.get("type")}')
+        numCutoffs = 2 if stage['type'] in ['bandpass', 'bandstop'] else 1
+        if np.size(stage.get('cutoff')) != numCutoffs:
+            raise ValueError(f'{stage["type"]} filters require {numCutoffs} cutoff frequencies: {stage}')
+
+
+def parseFilters(text: str) -> list:
+    """
+    Filters (see filterSOS) from text, e.g., 'lowpass 1000, notch 60 q=20, bandpass 1-100 order=2'.
+    """
+    filters = []
+    for item in re.split('[,;]', text):
+        fields = item.split()
+        if not fields:
+            continue
+        if len(fields) < 2:
+            raise ValueError(f'Filters must be TYPE CUTOFF [order=N] [q=Q]: {item.strip()}')
+        try:
+            cutoff = [float(value) for value in fields[1].split('-')]
+            options = {key: float(value) for key, value in (field.split('=') for field in fields[2:])}
+        except ValueError:
+            raise ValueError(f'Filters must be TYPE CUTOFF [order=N] [q=Q]: {item.strip()}') from None
+        stage = {'type': fields[0].lower(), 'cutoff': cutoff if len(cutoff) > 1 else cutoff[0]}
+        if 'order' in options:
+            stage['order'] = int(options.pop('order'))
+        stage.update(options)
+        filters.append(stage)
+    checkFilters(filters)
+    return filters
+
+
+def filterSOS(filters: list, fs) -> np.ndarray:
+    """
+    Second order sections (see scipy.signal.sosfilt) for the cascade of filters at sample rate fs.
+
+    filters: list of dicts with
+        type: one of filterTypes
+        cutoff: frequency, or (low, high) for bandpass/bandstop, in the inverse units of x (e.g., Hz for x in seconds)
+        order: Butterworth filter order (default 4)
+        q: notch quality factor (default 30)
+    Cascading all stages into one set of sections filters the data in a single pass (designs are cached).
+    """
+    checkFilters(filters)
+    return _filterSOS(json.dumps(filters, sort_keys=True), float(fs)).copy()
 
-        if 'anchor' in labelDict:
-            try:
-                halign, valign = labelDict['anchor']
-                self.setAnchorAlignment(halign, valign)
-            except:
-                pass
 
-        if 'color' in labelDict:
-            self.setColor(labelDict['color'])
+@functools.lru_cache(maxsize=64)
+def _filterSOS(filtersJson, fs):
+    sections = []
+    for stage in json.loads(filtersJson):
+        if stage['type'] == 'notch':
+            b, a = sp.signal.iirnotch(stage['cutoff'], stage.get('q', 30), fs=fs)
+            sections.append(sp.signal.tf2sos(b, a))
+        else:
+            sections.append(sp.signal.butter(stage.get('order', 4), stage['cutoff'], btype=stage['type'], output='sos', fs=fs))
+    return np.concatenate(sections)
 
-        if 'angle' in labelDict:
-            self.setAngle(labelDict['angle'])
 
-        if 'font-size' in labelDict:
-            self.textItem.font().setPointSize(labelDict['font-size'])
-    
-    def mouseClickEvent(self, event):
-        if event.button() == Qt.RightButton:
-            if self.boundingRect().contains(event.pos()):
-                if self.raiseContextMenu(event):
-                    event.accept()
-    
-    def mouseDragEvent(self, event):
-        if event.button() == Qt.LeftButton:
-            if event.isStart():
-                self._dragOffset = self.pos() - self.getViewBox().mapSceneToView(self.mapToScene(event.buttonDownPos()))
-            elif event.isFinish():
-                self._dragOffset = None
-                return
-            if self._dragOffset is not None:
-                self.setPos(self.getViewBox().mapSceneToView(self.mapToScene(event.pos())) + self._dragOffset)
-                event.accept()
-    
-    def raiseContextMenu(self, event):
-        menu = self.getContextMenus()
-        
-        # Let the scene add on to the end of our context menu (this is optional)
-        menu = self.scene().addParentContextMenus(self, menu, event)
-        
-        pos = event.screenPos()
-        menu.popup(QPoint(int(pos.x()), int(pos.y())))
-        return True
-    
-    def getContextMenus(self, event=None):
-        self._labelMenu = QMenu("Label")
-        self._labelMenu.addAction("Edit", self.editDialog)
-        self._labelMenu.addSection(" ")
-        self._labelMenu.addAction("Delete", self._delete)
-
-        self.menu = QMenu()
-        self.menu.addMenu(self._labelMenu)
-        self.menu.addSection(" ")
+def filtfilt(sos, y, chunkSize=None) -> np.ndarray:
+    """
+    Zero-phase filter y along its last axis, e.g., all rows of stacked equal-length series in one call.
 
-        return self.menu
-    
-    def setAnchorAlignment(self, halign, valign):
-        if halign == 'left':
-            halign = 0
-        elif halign == 'right':
-            halign = 1
-        elif halign == 'center':
-            halign = 0.5
-        
-        if valign == 'top':
-            valign = 0
-        elif valign == 'bottom':
-            valign = 1
-        elif valign == 'middle':
-            valign = 0.5
-        
-        self.anchor[0] = halign
-        self.anchor[1] = valign
-    
-    def editDialog(self):
-        dlg = QDialog()
-        form = QFormLayout(dlg)
-
-        text = self.toPlainText()
-        textEdit = QTextEdit()
-        textEdit.setPlainText(text)
-        form.addRow('Text', textEdit)
-
-        xStr = f'{self.pos().x():.6f}'.rstrip('0').rstrip('.')
-        yStr = f'{self.pos().y():.6f}'.rstrip('0').rstrip('.')
-        form.addRow('Position', QLineEdit(xStr + ', ' + yStr))
-
-        leftAlignBtn = QRadioButton()
-        centerAlignBtn = QRadioButton()
-        rightAlignBtn = QRadioButton()
-        topAlignBtn = QRadioButton()
-        middleAlignBtn = QRadioButton()
-        bottomAlignBtn = QRadioButton()
-        if self.anchor[0] == 0:
-            leftAlignBtn.setChecked(True)
-        elif self.anchor[0] == 0.5:
-            centerAlignBtn.setChecked(True)
-        elif self.anchor[0] == 1:
-            rightAlignBtn.setChecked(True)
-        if self.anchor[1] == 0:
-            topAlignBtn.setChecked(True)
-        elif self.anchor[1] == 0.5:
-            middleAlignBtn.setChecked(True)
-        elif self.anchor[1] == 1:
-            bottomAlignBtn.setChecked(True)
-        if qta is not None:
-            leftAlignBtn.setIcon(qta.icon('mdi.format-horizontal-align-left'))
-            centerAlignBtn.setIcon(qta.icon('mdi.format-horizontal-align-center'))
-            rightAlignBtn.setIcon(qta.icon('mdi.format-horizontal-align-right'))
-            topAlignBtn.setIcon(qta.icon('mdi.format-vertical-align-top'))
-            middleAlignBtn.setIcon(qta.icon('mdi.format-vertical-align-center'))
-            bottomAlignBtn.setIcon(qta.icon('mdi.format-vertical-align-bottom'))
+    Traces longer than chunkSize (default filterChunkSize) are filtered in overlapping chunks, each padded on both sides
+    by the length of the filter's impulse response, so that chunk edge transients are discarded along with the padding.
+    This bounds memory (sosfiltfilt needs several copies of its input), and results match a single pass to within ~1e-8 of the signal amplitude.
+    """
+    y = np.asarray(y, dtype=float)
+    numSamples = y.shape[-1]
+    # default padding of sosfiltfilt at the ends of the data
+    edge = 3 * (2 * len(sos) + 1 - min((sos[:, 2] == 0).sum(), (sos[:, 5] == 0).sum()))
+    if numSamples <= edge:
+        return sp.signal.sosfiltfilt(sos, y, axis=-1, padlen=numSamples - 1) if numSamples > 1 else y.copy()
+    if chunkSize is None:
+        chunkSize = filterChunkSize
+    if numSamples <= chunkSize:
+        return sp.signal.sosfiltfilt(sos, y, axis=-1)
+    pad = max(_sosSettlingLength(sos.tobytes()), edge)
+    step = max(chunkSize, 4 * pad) - 2 * pad
+    filtered = np.empty_like(y)
+    for start in range(0, numSamples, step):
+        stop = min(start + step, numSamples)
+        chunkStart = max(0, start - pad)
+        chunkStop = min(stop + pad, numSamples)
+        chunk = sp.signal.sosfiltfilt(sos, y[..., chunkStart:chunkStop], axis=-1)
+        filtered[..., start:stop] = chunk[..., start - chunkStart:stop - chunkStart]
+    return filtered
+
+
+@functools.lru_cache(maxsize=64)
+def _sosSettlingLength(sosBytes, tol=1e-12, maxLength=1 << 24) -> int:
+    # samples until the impulse response has decayed below tol relative to its peak
+    sos = np.frombuffer(sosBytes).reshape(-1, 6).copy()
+    length = 1024
+    while True:
+        impulse = np.zeros(length)
+        impulse[0] = 1
+        response = np.abs(sp.signal.sosfilt(sos, impulse))
+        last = np.flatnonzero(response > tol * response.max())[-1]
+        if last < length // 2 or length >= maxLength:
+            return int(last) + 1
+        length *= 4
+
+
+def sampleInterval(x) -> float:
+    """ Sample interval of a uniformly sampled x (UniformAxis or array). """
+    if isinstance(x, UniformAxis):
+        return float(x.dx)
+    x = np.asarray(x)
+    return float(np.median(np.diff(x))) if len(x) > 1 else 1.0
+
+
+# Batch processing of many data files (e.g., from the command line, see main).
+
+batchExtensions = ['.mat', '.h5', '.hdf5', '.dat']
+batchColumns = ['file', 'series', 'episode', 'group', 'name', 'analysis', 'region', 'xmin', 'xmax', 'param', 'value']
+batchMeasurementTypes = ['mean', 'median', 'min', 'max', 'absmax', 'var', 'std']
+batchFitTypes = ['mean', 'line', 'polynomial', 'custom']
+
+
+def batchFiles(paths) -> list:
+    """ Data files for paths, each a file, a directory (searched recursively) or a glob pattern. """
+    filepaths = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                filepaths.extend(os.path.join(root, file) for file in sorted(files))
+        elif glob.has_magic(path):
+            filepaths.extend(sorted(glob.glob(path, recursive=True)))
         else:
-            leftAlignBtn.setText('Left')
-            centerAlignBtn.setText('Center')
-            rightAlignBtn.setText('Right')
-            topAlignBtn.setText('Top')
-            middleAlignBtn.setText('Middle')
-            bottomAlignBtn.setText('Bottom')
-        halignBtnGroup = QButtonGroup()
-        halignBtnGroup.setExclusive(True)
-        halignBtnGroup.addButton(leftAlignBtn)
-        halignBtnGroup.addButton(centerAlignBtn)
-        halignBtnGroup.addButton(rightAlignBtn)
-        valignBtnGroup = QButtonGroup()
-        valignBtnGroup.setExclusive(True)
-        valignBtnGroup.addButton(topAlignBtn)
-        valignBtnGroup.addButton(middleAlignBtn)
-        valignBtnGroup.addButton(bottomAlignBtn)
-        halignBtnLayout = QHBoxLayout()
-        halignBtnLayout.addWidget(leftAlignBtn)
-        halignBtnLayout.addWidget(centerAlignBtn)
-        halignBtnLayout.addWidget(rightAlignBtn)
-        halignBtnLayout.addStretch()
-        valignBtnLayout = QHBoxLayout()
-        valignBtnLayout.addWidget(topAlignBtn)
-        valignBtnLayout.addWidget(middleAlignBtn)
-        valignBtnLayout.addWidget(bottomAlignBtn)
-        valignBtnLayout.addStretch()
-        form.addRow('Horizontal Anchor', halignBtnLayout)
-        form.addRow('Vertical Anchor', valignBtnLayout)
-
-        form.addRow('Color', ColorButton(self.color))
-
-        angleSpinBox = QSpinBox()
-        angleSpinBox.setValue(self.angle)
-        angleSpinBox.setMinimum(-90)
-        angleSpinBox.setMaximum(90)
-        angleSpinBox.setSuffix(' degrees')
-        form.addRow('Rotation', angleSpinBox)
-
-        ptSizeSpinBox = QSpinBox()
-        ptSizeSpinBox.setValue(self.textItem.font().pointSize())
-        ptSizeSpinBox.setMinimum(1)
-        ptSizeSpinBox.setSuffix(' pt')
-        form.addRow('Font Size', ptSizeSpinBox)
-
-        btns = QDialogButtonBox()
-        btns.setStandardButtons(QDialogButtonBox.Cancel | QDialogButtonBox.Ok)
-        btns.accepted.connect(dlg.accept)
-        btns.rejected.connect(dlg.reject)
-        form.addRow(btns)
-
-        dlg.setWindowModality(Qt.ApplicationModal)
-        if dlg.exec_() != QDialog.Accepted:
-            if text == '':
-                self._delete()
-            return
-        
-        text = form.itemAt(0, 1).widget().toPlainText()
-        if text == '':
-            self._delete()
-            return
-        self.setPlainText(text)
-
-        x, y = [float(value) for value in form.itemAt(1, 1).widget().text().split(',')]
-        self.setPos(x, y)
-
-        if halignBtnGroup.checkedButton() is leftAlignBtn:
-            self.anchor[0] = 0
-            halign = 'left'
-        elif halignBtnGroup.checkedButton() is centerAlignBtn:
-            self.anchor[0] = 0.5
-            halign = 'center'
-        elif halignBtnGroup.checkedButton() is rightAlignBtn:
-            self.anchor[0] = 1
-            halign = 'right'
-        if valignBtnGroup.checkedButton() is topAlignBtn:
-            self.anchor[1] = 0
-            valign = 'top'
-        elif valignBtnGroup.checkedButton() is middleAlignBtn:
-            self.anchor[1] = 0.5
-            valign = 'middle'
-        elif valignBtnGroup.checkedButton() is bottomAlignBtn:
-            self.anchor[1] = 1
-            valign = 'bottom'
-
-        color = form.itemAt(4, 1).widget().color()
-        self.setColor(color)
-
-        angle = form.itemAt(5, 1).widget().value()
-        self.setAngle(angle)
-
-        fontPointSize = form.itemAt(6, 1).widget().value()
-        self.textItem.font().setPointSize(fontPointSize)
-
-        if self.labelDict is None:
-            return
-        
-        self.labelDict['text'] = text
-        self.labelDict['x'] = x
-        self.labelDict['y'] = y
-        self.labelDict['anchor'] = (halign, valign)
-        self.labelDict['color'] = (color.red(), color.green(), color.blue(), color.alpha())
-        self.labelDict['angle'] = angle
-        self.labelDict['font-size'] = fontPointSize
-
-
-class DataTableModel(QAbstractTableModel):
-    def __init__(self, tsa):
-        QAbstractTableModel.__init__(self)
-        self._tsa = tsa
-        self._data = tsa.data
-        self._requiredColumns = ['episode', 'group', 'name', 'x', 'y', 'xlabel', 'ylabel', 'style']
-        self._columns = []
-        self._updateColumns()
-
-    def rowCount(self, index):
-        return len(self._data)
+            filepaths.append(path)
+    filepaths = [filepath for filepath in filepaths if os.path.splitext(filepath)[1].lower() in batchExtensions]
+    return list(dict.fromkeys(filepaths))
 
-    def columnCount(self, index):
-        return len(self._columns)
 
-    def data(self, index, role=Qt.DisplayRole):
-        if not index.isValid():
-            return None
-        if role == Qt.DisplayRole or role == Qt.EditRole:
-            seriesIndex = index.row()
-            attr = self._columns[index.column()]
-            if attr in self._data[seriesIndex]:
-                value = self._data[seriesIndex][attr]
-                if role == Qt.DisplayRole and isinstance(value, np.ndarray):# and len(value) > 10:
-                    if value.ndim == 1:
-                        return f'x{len(value)} {value.dtype}'
-                    else:
-                        return 'x'.join([*value.shape]) + f' {value.dtype}'
-            elif attr not in ['x', 'y']:
-                value = self._tsa.seriesAttr(attr, seriesIndex)
-            else:
-                value = None
-            if value is None:
-                if attr == 'style':
-                    return '{}'
-                elif attr == 'labels':
-                    return '[]'
-                return ''
-            return str(value)
-        elif role == Qt.FontRole:
-            seriesIndex = index.row()
-            attr = self._columns[index.column()]
-            if attr in self._data[seriesIndex]:
-                value = self._data[seriesIndex][attr]
-                if isinstance(value, np.ndarray):
-                    font = QFont()
-                    font.setItalic(True)
-                    return font
-
-    def setData(self, index, value, role):
-        if not index.isValid():
-            return False
-        if role == Qt.EditRole:
-            seriesIndex = index.row()
-            attr = self._columns[index.column()]
-            try:
-                value = int(value)
-            except ValueError:
-                try:
-                    value = float(value)
-                except ValueError:
-                    try:
-                        value = str(value)
-                    except ValueError:
-                        return False
-            if attr == 'episode':
-                if not isinstance(value, int):
-                    return False
-                applyChange = QMessageBox.question(self._tsa, 'Confirm', 'Are you sure you want to change the episode number? This could invalidate your data structure.', QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
-                if applyChange == QMessageBox.No:
-                    return False
-            elif attr in ['x', 'y']:
-                if isinstance(value, str):
-                    value = value.strip()
-                    if value.startswith('[') and value.endswith(']'):
-                        value = value[1:-1]
-                    fields = re.split('[,\s]+', value)
-                    values = []
-                    for field in fields:
-                        field = field.strip()
-                        if field == '':
-                            continue
-                        elif field == '...':
-                            # the string rep of this array is too long to display
-                            # if we were to update based on this string rep, we would lose data
-                            return False
-                        try:
-                            field = int(field)
-                        except ValueError:
-                            try:
-                                field = float(field)
-                            except ValueError:
-                                # non-numeric value
-                                return False
-                        values.append(field)
-                    if not values:
-                        value = None
-                        if attr == 'y':
-                            return False
-                    elif len(values) == 1:
-                        value = values[0]
-                    else:
-                        value = np.array(values)
-                elif isinstance(value, int) or isinstance(value, float):
-                    pass
-                else:
-                    return False
-                applyChange = QMessageBox.question(self._tsa, 'Confirm', 'Are you sure you want to change the series data?', QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
-                if applyChange == QMessageBox.No:
-                    return False
-                if isinstance(value, np.ndarray) and isinstance(self._data[seriesIndex][attr], np.ndarray):
-                    if len(value) == len(self._data[seriesIndex][attr]):
-                        # mutate array in place
-                        self._data[seriesIndex][attr][:] = value
-                        self._tsa.updateUI()
-                        return True
-            elif attr == 'style':
-                # should be a dictionary
-                try:
-                    value = ast.literal_eval(value)
-                except:
-                    return False
-                if not isinstance(value, dict):
-                    return False
-            if value == '' and attr not in self._data[seriesIndex]:
-                return False
-            self._data[seriesIndex][attr] = value
-            self._tsa.updateUI()
-            return True
-        return False
-
-    def flags(self, index):
-        return Qt.ItemIsSelectable | Qt.ItemIsEnabled | Qt.ItemIsEditable
-    
-    def headerData(self, section, orientation, role=Qt.DisplayRole):
-        if role == Qt.DisplayRole:
-            if orientation == Qt.Horizontal:
-                return self._columns[section]
-            elif orientation == Qt.Vertical:
-                return section
-    
-    def _updateColumns(self):
-        self._columns = self._requiredColumns
-        for series in self._data:
-            for attr in series:
-                if attr not in self._columns:
-                    self._columns.append(attr)
+def checkAnalysis(analysis: dict):
+    """
+    Raise ValueError for an invalid analysis (see analyzeFile), e.g., before processing lots of files.
+    """
+    unknown = set(analysis) - {'episodes', 'groups', 'names', 'filters', 'regions', 'measurements', 'fits'}
+    if unknown:
+        raise ValueError(f'Unknown analysis keys: {sorted(unknown)}')
+    checkFilters(analysis.get('filters', []))
+    for measurementType in analysis.get('measurements', []):
+        if measurementType not in batchMeasurementTypes:
+            raise ValueError(f'Unknown measurement: {measurementType}')
+    for fit in analysis.get('fits', []):
+        if fit.get('type') not in batchFitTypes:
+            raise ValueError(f'Unknown fit type: {fit.get("type")}')
+        if fit['type'] == 'custom' and not fit.get('expression'):
+            raise ValueError('Custom fits require an expression.')
+    for region in analysis.get('regions', []):
+        if len(region) != 2:
+            raise ValueError(f'Regions must be (xmin, xmax): {region}')
+
+
+def analyzeFile(filepath, analysis: dict) -> list:
+    """
+    Apply analysis to the series in a .mat, HDF5 or HEKA (.dat) file and return result rows (dicts with batchColumns).
+
+    analysis: dict (e.g., from JSON) with any of
+        episodes: visible episodes text (e.g., '0-4 10') or list of episodes
+        groups, names: lists of groups, names
+        filters: list of filters (see filterSOS) applied to the selected series before measuring and fitting
+        regions: list of (xmin, xmax), default is everything
+        measurements: list of batchMeasurementTypes, each in each region, with params x and y (see measureRegions)
+        fits: list of dicts with type (see batchFitTypes) and degree (polynomial) or expression and initialValues (custom)
+              over all regions, with the fit coefficients (c0, c1, ...) or parameters as params
+    """
+    tsa = TimeSeriesAnalyzer()
+    if os.path.splitext(filepath)[1].lower() == '.dat':
+        tsa.data = loadHEKA(filepath)
+    else:
+        tsa.open(filepath)
+
+    episodes = analysis.get('episodes')
+    if isinstance(episodes, str):
+        allEpisodes = np.array(tsa.seriesEpisodes())
+        episodes = allEpisodes[EpisodeSelection(episodes).mask(allEpisodes)].tolist() if len(allEpisodes) else []
+    indexes = tsa.seriesIndexes(episodes, analysis.get('groups'), analysis.get('names'))
+    indexes = [index for index in indexes if tsa.data[index].get('y') is not None]
+    if not indexes:
+        return []
+    xs = [tsa.seriesAttr('x', index) for index in indexes]
+    if analysis.get('filters'):
+        ys = [series['y'] for series in tsa.filterSeries(analysis['filters'], episodes, analysis.get('groups'), analysis.get('names'))]
+    else:
+        ys = [tsa.data[index]['y'] for index in indexes]
+    masks = [tsa.seriesAttr('mask', index) for index in indexes]
+    regions = [tuple(region) for region in analysis.get('regions', [])]
+    if not regions:
+        regions = [(-np.inf, np.inf)]
+    
+    seriesColumns = [{
+        'file': filepath, 
+        'series': index, 
+        'episode': tsa.seriesAttr('episode', index), 
+        'group': tsa.seriesAttr('group', index), 
+        'name': tsa.seriesAttr('name', index)
+        } for index in indexes]
+    rows = []
+
+    for measurementType in analysis.get('measurements', []):
+        mx, my = measureRegions(xs, ys, regions, measurementType, masks)
+        for i, columns in enumerate(seriesColumns):
+            for j, (xmin, xmax) in enumerate(regions):
+                for param, value in [('x', mx[i, j]), ('y', my[i, j])]:
+                    rows.append({**columns, 'analysis': measurementType, 'region': j, 'xmin': xmin, 'xmax': xmax, 'param': param, 'value': value})
+    
+    xmin = min([region[0] for region in regions])
+    xmax = max([region[1] for region in regions])
+    for fit in analysis.get('fits', []):
+        fitType = fit['type']
+        if fitType == 'custom':
+            # files are already processed in parallel
+            params = lmfitRegions(xs, ys, regions, fit['expression'], fit.get('initialValues'), processes=1, masks=masks)
+        else:
+            degree = {'mean': 0, 'line': 1}.get(fitType, fit.get('degree', 2))
+            polynomials = polyfitRegions(xs, ys, regions, degree, masks)
+            params = [None if polynomial is None else {f'c{k}': float(c) for k, c in enumerate(polynomial.convert().coef)} for polynomial in polynomials]
+        for columns, fitParams in zip(seriesColumns, params):
+            if fitParams is None:
+                continue
+            for param, value in fitParams.items():
+                rows.append({**columns, 'analysis': 'fit ' + fitType, 'region': 'all', 'xmin': xmin, 'xmax': xmax, 'param': param, 'value': value})
+    return rows
 
 
-class ColorButton(QGroupBox):
-    def __init__(self, color=QColor('transparent')):
-        QGroupBox.__init__(self)
+def _analyzeFile(filepath, analysis: dict):
+    # (rows, error message) so that one bad file does not stop a batch
+    try:
+        return analyzeFile(filepath, analysis), None
+    except Exception as error:
+        return [], f'{type(error).__name__}: {error}'
 
-        layout = QVBoxLayout(self)
-        layout.setContentsMargins(0, 0, 0, 0)
-        layout.setSpacing(5)
 
-        self.colorButton = QPushButton()
-        self.colorButton.clicked.connect(self.pickColor)
-        self._colorWasPicked = False
-        layout.addWidget(self.colorButton)
+def batchAnalyze(filepaths, analysis: dict, processes=None):
+    """
+    Yield (filepath, rows, error message or None) for each file in order, see analyzeFile.
 
-        self.setColor(color)
-    
-    def color(self) -> QColor:
-        pal = self.colorButton.palette()
-        return pal.brush(QPalette.Button).color()
-
-    def setColor(self, color):
-        if isinstance(color, str):
-            color = str2qcolor(color)
-        pal = self.colorButton.palette()
-        pal.setBrush(QPalette.Button, QBrush(color))
-        self.colorButton.setPalette(pal)
-        self.colorButton.setGraphicsEffect(QGraphicsOpacityEffect(opacity=color.alphaF()))
-    
-    def pickColor(self):
-        color = QColorDialog.getColor(self.color(), None, "Select Color", options=QColorDialog.ShowAlphaChannel)
-        if color.isValid():
-            self.setColor(color)
-            self._colorWasPicked = True
-    
-    def colorWasPicked(self) -> bool:
-        return self._colorWasPicked
-    
+    Files are analyzed in parallel by the given number of worker processes (default one per core).
+    """
+    checkAnalysis(analysis)
+    filepaths = list(filepaths)
+    if processes is None:
+        processes = os.cpu_count() or 1
+    processes = min(processes, len(filepaths))
+    if processes <= 1:
+        for filepath in filepaths:
+            yield (filepath, *_analyzeFile(filepath, analysis))
+        return
+    
+    # one file per core, not one BLAS thread pool per core in each worker
+    threadVars = ['OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS']
+    environ = {var: os.environ.get(var) for var in threadVars}
+    for var in threadVars:
+        os.environ.setdefault(var, '1')
+    try:
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(processes, mp_context=context) as pool:
+            results = pool.map(_analyzeFile, filepaths, [analysis] * len(filepaths))
+            for filepath, (rows, error) in zip(filepaths, results):
+                yield filepath, rows, error
+    finally:
+        for var, value in environ.items():
+            if value is None:
+                os.environ.pop(var, None)
+            else:
+                os.environ[var] = value
 
-# Utilities
-
-def str2color(colorStr):
-    if (colorStr.startswith('(') and colorStr.endswith(')')) or (colorStr.startswith('[') and colorStr.endswith(']')):
-        rgba = [int(c) for c in colorStr[1:-1].split(',')]
-        if len(rgba) == 3:
-            rgba.append(255)
-        return tuple(rgba)
-    elif colorStr in QColor.colorNames():
-        qcolor = QColor(colorStr)
-        return qcolor.red(), qcolor.green(), qcolor.blue(), qcolor.alpha()
-
-def str2qcolor(colorStr):
-    if (colorStr.startswith('(') and colorStr.endswith(')')) or (colorStr.startswith('[') and colorStr.endswith(']')):
-        rgba = [int(c) for c in colorStr[1:-1].split(',')]
-        return QColor(*rgba)
-    elif colorStr in QColor.colorNames():
-        return QColor(colorStr)
-    else:
-        return pg.mkColor(colorStr)  # ???
-
-def qcolor2str(color):
-    for name in QColor.colorNames():
-        if QColor(name) == color:
-            return name
-    if color.alpha() == 255:
-        return f'({color.red()},{color.green()},{color.blue()})'
-    else:
-        return f'({color.red()},{color.green()},{color.blue()},{color.alpha()})'
 
+def _parseValue(text):
+    # e.g., group 0 -> int, group Vm -> str
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        return text
 
-# Run UI from REPL without blocking the REPL.
 
-def run():
+def main(argv=None) -> int:
     """
-    Run the application from a REPL without blocking the REPL.
-    
-    e.g., in a REPL, run the following:
-
-    ```
-    import PyQtTimeSeriesAnalyzer
-    app, tsa = PyQtTimeSeriesAnalyzer.run()
-    ```
+    Command line entry point. Launches the UI if no files are given, otherwise batch processes them, e.g.,
 
-    This will launch the UI and allow you to continue using the REPL
-    where you can access the QApplication object and QtTimeSeriesAnalyzer UI widget
-    via the variables `app` and `tsa`, respectively.
+        python PyQtTimeSeriesAnalyzer.py data/ --groups 0 --regions 0.1:0.2 0.5:0.6 --measure mean max --fit line -o results.csv
+    
+    Results of all files are written to one CSV table with batchColumns (one value per row).
     """
+    parser = argparse.ArgumentParser(prog='PyQtTimeSeriesAnalyzer.py', description='Time series analysis. Without any files, launches the UI.')
+    parser.add_argument('paths', nargs='*', help='data files (.mat, .h5, HEKA .dat), directories or glob patterns')
+    parser.add_argument('-a', '--analysis', help='JSON file with the analysis (see analyzeFile), the options below override it')
+    parser.add_argument('--episodes', help="episodes, e.g., '0-4 10'")
+    parser.add_argument('--groups', nargs='+', type=_parseValue, help='groups')
+    parser.add_argument('--names', nargs='+', help='series names')
+    parser.add_argument('--filter', help="zero-phase filters applied before measuring and fitting, e.g., 'lowpass 1000, notch 60 q=20, highpass 1 order=2'")
+    parser.add_argument('--regions', nargs='+', metavar='XMIN:XMAX', help='x regions for measurements and fits')
+    parser.add_argument('--measure', nargs='+', choices=batchMeasurementTypes, help='measurements in each region')
+    parser.add_argument('--fit', nargs='+', choices=batchFitTypes, help='fits over all regions')
+    parser.add_argument('--degree', type=int, default=2, help='polynomial fit degree')
+    parser.add_argument('--expression', help="custom fit expression in x, e.g., 'a * exp(-x / tau) + b'")
+    parser.add_argument('--initial-values', nargs='+', metavar='NAME=VALUE', default=[], help='custom fit initial values')
+    parser.add_argument('-o', '--output', default='-', help='output CSV file (default: stdout)')
+    parser.add_argument('-j', '--processes', type=int, help='number of worker processes (default: one per core)')
+    args = parser.parse_args(argv)
+
+    if not args.paths and not args.analysis:
+        import runpy
+        runpy.run_module('PyQtTimeSeriesAnalyzerGUI', run_name='__main__')
+        return 0
+    
+    analysis = {}
+    if args.analysis:
+        with open(args.analysis) as file:
+            analysis = json.load(file)
+    if args.episodes is not None:
+        analysis['episodes'] = args.episodes
+    if args.groups is not None:
+        analysis['groups'] = args.groups
+    if args.names is not None:
+        analysis['names'] = args.names
+    if args.filter is not None:
+        try:
+            analysis['filters'] = parseFilters(args.filter)
+        except ValueError as error:
+            parser.error(str(error))
+    if args.regions is not None:
+        try:
+            analysis['regions'] = [[float(value) for value in region.split(':')] for region in args.regions]
+        except ValueError:
+            parser.error('regions must be XMIN:XMAX')
+    if args.measure is not None:
+        analysis['measurements'] = args.measure
+    if args.fit is not None:
+        fits = []
+        for fitType in args.fit:
+            fit = {'type': fitType}
+            if fitType == 'polynomial':
+                fit['degree'] = args.degree
+            elif fitType == 'custom':
+                fit['expression'] = args.expression
+                fit['initialValues'] = {name: float(value) for name, value in (item.split('=') for item in args.initial_values)}
+            fits.append(fit)
+        analysis['fits'] = fits
+    try:
+        checkAnalysis(analysis)
+    except ValueError as error:
+        parser.error(str(error))
+    filepaths = batchFiles(args.paths)
+    if not filepaths:
+        parser.error('no data files found')
+    
+    numErrors = 0
+    output = sys.stdout if args.output == '-' else open(args.output, 'w', newline='')
+    try:
+        writer = csv.DictWriter(output, batchColumns)
+        writer.writeheader()
+        for i, (filepath, rows, error) in enumerate(batchAnalyze(filepaths, analysis, args.processes)):
+            writer.writerows(rows)
+            if error is None:
+                print(f'[{i + 1}/{len(filepaths)}] {filepath}: {len(rows)} rows', file=sys.stderr)
+            else:
+                numErrors += 1
+                print(f'[{i + 1}/{len(filepaths)}] {filepath}: {error}', file=sys.stderr)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 1 if numErrors else 0
 
-    # Create the application
-    app = QApplication(sys.argv)
-    app.setStyle('Fusion')
 
-    # Create, show and return widget
-    tsa = QtTimeSeriesAnalyzer()
-    tsa.show()
-    tsa.raise_()  # bring UI window to front
-    
-    return app, tsa
+# The UI (e.g., QtTimeSeriesAnalyzer, run) is only imported when first accessed.
+
+def __getattr__(name):
+    if name.startswith('__'):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import PyQtTimeSeriesAnalyzerGUI
+    try:
+        return getattr(PyQtTimeSeriesAnalyzerGUI, name)
+    except AttributeError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
 
 
-# Running this file directly will launch the UI.
+# Running this file directly will launch the UI, or batch process files (see main).
 
 if __name__ == '__main__':
-    # Create the application
-    app = QApplication(sys.argv)
-    app.setStyle('Fusion')
-
-    # Create widget
-    tsa = QtTimeSeriesAnalyzer()
-
-    # testing
-    # tsa.importHEKA('heka.dat')
-    tsa.data = []
-    tsa.addSeries(y=np.random.random(10), xlabel="Time, s", ylabel="Current, pA", group=0, labels=[{'text': 'testing 1', 'x': 3, 'y': 0.5}])
-    tsa.addSeries(y=np.random.random(10) * 1000, xlabel="Time, s", ylabel="Voltage, mV", group=1)
-    tsa.addSeries(y=np.random.random(10), xlabel="Time, s", ylabel="Current, pA", group=0, labels=[{'text': 'testing 2', 'x': 6, 'y': 0.5}])
-    tsa.addSeries(y=np.random.random(10) * 1000, xlabel="Time, s", ylabel="Voltage, mV", group=1)
-    tsa.addSeries(y=np.random.random(10), xlabel="Time, s", ylabel="Current, pA", group=0, episode=1, name='fit')
-    tsa.updateUI()
-
-    # tsa.open()
-
-
-    # Show widget and run application
-    tsa.show()
-    status = app.exec()
-    sys.exit(status)
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,3005 @@
+"""
+PyQtTimeSeriesAnalyzerGUI.py
+
+UI for the time series data model and analysis in PyQtTimeSeriesAnalyzer.py.
+"""
+
+
+__author__ = "Marcel P. Goldschen-Ohm"
+__author_email__ = "goldschen-ohm@utexas.edu, marcel.goldschen@gmail.com"
+
+
+import sys, os, re, ast, copy, time, itertools, collections, contextlib, functools, multiprocessing
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from PyQt5.QtCore import *
+from PyQt5.QtGui import *
+from PyQt5.QtWidgets import *
+import pyqtgraph as pg
+from PyQtTimeSeriesAnalyzer import (
+    TimeSeriesAnalyzer, LazyArray, DerivedArray, UniformAxis, EpisodeSelection, MinMaxPyramid, SeriesStream, parseFilters, 
+    hekaSweepTraceIndexes, hekaTraceSeries, _hekaProcessInit, _hekaDecodeTraces, 
+    measureRegions, polyfitRegions, splinefitRegions, lmfitRegions, maskedValues, _optionalImport)
+
+# OPTIONAL: For some nice icons. Highly recommended.
+try:
+    # https://github.com/spyder-ide/qtawesome
+    import qtawesome as qta
+except ImportError:
+    qta = None
+
+# OPTIONAL: Interactive python console for the UI.
+# !!! The run() function in this module will probably provide a better console experience alongside the UI than pyqtconsole.
+try:
+    # https://github.com/pyqtconsole/pyqtconsole
+    from pyqtconsole.console import PythonConsole
+except ImportError:
+    PythonConsole = None
+
+
+pg.setConfigOption('background', (200, 200, 200))  # Default background for plots.
+pg.setConfigOption('foreground', (0, 0, 0))   # Default foreground color for text, lines, axes, etc.
+
+
+class Profiler:
+    """
+    Opt-in timings of UI stages (e.g., updateUI, setData, paint), the most recent of each stage are kept in a ring buffer.
+
+    Disabled by default. Instrumented code brackets a stage with
+
+        start = profiler.start()
+        ...
+        profiler.stop('stage', start)
+
+    which does next to nothing while disabled (start() returns None). Stages may be nested (e.g., setData within _updateGroupPlots).
+    From the console, e.g., self.profiler.enabled = True, then print(self.profiler.report()) or self.profiler.timings('paint').
+    """
+
+    capacity = 1000  # timings kept per stage
+
+    def __init__(self):
+        self.enabled = False
+
+        # stage -> deque of (end time, duration) in seconds, oldest first
+        self._timings = {}
+
+    def start(self):
+        """ Start time for stop(), or None if disabled. """
+        return time.perf_counter() if self.enabled else None
+
+    def stop(self, stage, start):
+        """ Record the time since start (from start()) for stage. """
+        if start is None:
+            return
+        end = time.perf_counter()
+        timings = self._timings.get(stage)
+        if timings is None:
+            timings = self._timings[stage] = collections.deque(maxlen=self.capacity)
+        timings.append((end, end - start))
+
+    @contextlib.contextmanager
+    def timed(self, stage):
+        start = self.start()
+        try:
+            yield
+        finally:
+            self.stop(stage, start)
+
+    def stages(self) -> list:
+        return list(self._timings)
+
+    def timings(self, stage) -> np.ndarray:
+        """ (N, 2) array of (end time, duration) in seconds for the last N (at most capacity) runs of stage. """
+        return np.array(self._timings.get(stage, ()), dtype=float).reshape(-1, 2)
+
+    def stats(self, window=1.0) -> dict:
+        """
+        Per stage summary (times in ms) of the kept timings: count, last, mean, max,
+        and over the last window seconds: rate (runs/s) and load (fraction of the time spent in the stage).
+        """
+        now = time.perf_counter()
+        stats = {}
+        for stage, timings in self._timings.items():
+            if not timings:
+                continue
+            ends, durations = self.timings(stage).T
+            recent = durations[ends >= now - window]
+            stats[stage] = {
+                'count': len(durations),
+                'last': durations[-1] * 1000,
+                'mean': durations.mean() * 1000,
+                'max': durations.max() * 1000,
+                'rate': len(recent) / window,
+                'load': recent.sum() / window
+                }
+        return stats
+
+    def report(self, window=1.0) -> str:
+        lines = [f"{'stage':<24} {'last':>8} {'mean':>8} {'max':>8} {'/s':>6} {'load':>5}"]
+        for stage, stats in self.stats(window).items():
+            lines.append(f"{stage:<24} {stats['last']:8.2f} {stats['mean']:8.2f} {stats['max']:8.2f} {stats['rate']:6.1f} {stats['load']:5.0%}")
+        return "\n".join(lines)
+
+    def clear(self):
+        self._timings.clear()
+
+
+class QtTimeSeriesAnalyzer(TimeSeriesAnalyzer, QWidget):
+    """ Viewer/Analyzer for a collection of time (ar any x,y) series. """
+
+    streamRefreshRate = 30  # Hz, plots of live streams are redrawn at most this often
+    playbackRate = 30  # episodes per second (see play)
+    prefetchCount = 30  # upcoming episodes loaded and decimated in the background during playback/stepping
+    prefetchCacheSize = 90  # prefetched episodes kept in memory, the least recently used are released
+    profilingOverlayRate = 2  # Hz, refresh rate of the profiling overlay (see showProfilingOverlay)
+
+    # opt-in timings of UI stages shared by all analyzers and their plots (e.g., self.profiler.report() from the console)
+    profiler = Profiler()
+
+    def __init__(self, parent=None):
+        QWidget.__init__(self, parent)
+
+        # series that need to be redrawn (by id)
+        self._dirtySeries = set()
+        self._allSeriesDirty = True
+
+        # id(series) -> ((x, y), MinMaxPyramid) level of detail for drawing long series
+        self._pyramids = {}
+
+        # (QThread, HEKAImportWorker, QProgressDialog) for background HEKA import
+        self._hekaImport = None
+
+        # compiled visible episodes text (see visibleEpisodes)
+        self._episodeSelection = None
+
+        # UI updates are deferred within batchUpdate(): None, 'refresh' or 'all' (see updateUI)
+        self._batchUpdateDepth = 0
+        self._pendingUpdate = None
+
+        # live streams (see startStream) are polled and redrawn on a display rate timer
+        self._streams = []
+        self._streamTimer = None
+
+        # episode playback (see play) and background prefetch of upcoming episodes
+        self._playbackTimer = None
+        self._prefetch = None  # (QThread, EpisodePrefetchWorker) while prefetching
+        self._prefetchRequests = collections.deque()  # (episode, [(series, rawData, x, y, mask), ...])
+        self._prefetchPending = set()  # requested episodes
+        self._prefetchedEpisodes = collections.OrderedDict()  # episode -> series list, least recently used first
+
+        # data table model/view (the model is kept in sync with self.data once created)
+        self._dataTableModel = None
+        self._dataTableView = None
+
+        # last filters entered (see filterVisibleSeries)
+        self._filtersText = "lowpass 1000"
+
+        # on-plot profiling overlay (see showProfilingOverlay)
+        self._profilingOverlay = None
+        self._profilingTimer = None
+
+        TimeSeriesAnalyzer.__init__(self)
+
+        self.initUI()
+        self.updateUI()
+    
+    def _onSeriesListChanged(self, start=None):
+        TimeSeriesAnalyzer._onSeriesListChanged(self, start)
+        if start is None:
+            self._clearPrefetch()
+            if self._dataTableModel is not None:
+                self._dataTableModel.reset()
+        elif self._dataTableModel is not None:
+            self._dataTableModel.seriesAppended(start)
+    
+    def sizeHint(self):
+        return QSize(800, 600)
+    
+    def save(self, filepath=None):
+        if filepath is None:
+            fileTypes = "MATLAB Data Files (*.mat)"
+            if _optionalImport('h5py') is not None:
+                fileTypes += ";;HDF5 Data Files (*.h5 *.hdf5)"
+            filepath, _ = QFileDialog.getSaveFileName(self, "Save Data", "", fileTypes)
+        if not filepath:
+            return
+        TimeSeriesAnalyzer.save(self, filepath)
+    
+    def open(self, filepath=None, clear=True):
+        if filepath is None:
+            fileTypes = "MATLAB Data Files (*.mat)"
+            if _optionalImport('h5py') is not None:
+                fileTypes = "Data Files (*.mat *.h5 *.hdf5);;" + fileTypes + ";;HDF5 Data Files (*.h5 *.hdf5)"
+            filepath, _ = QFileDialog.getOpenFileName(self, "Open Data", "", fileTypes)
+        if not filepath or not os.path.isfile(filepath):
+            return
+        TimeSeriesAnalyzer.open(self, filepath, clear)
+    
+    def importHEKA(self, filepath=None, clear=True, background=True, processes=None):
+        """
+        Import HEKA data file.
+
+        HEKA format:
+        ------------
+        Group (Experiment)
+            Series (Recording)
+                Sweep (Episode)
+                    Trace (Data Series for Channel A)
+                    Trace (Data Series for Channel B)
+        
+        If background is True, traces are decoded in a worker thread and streamed into self.data in batches
+        (the first sweep is shown as soon as it is decoded) along with a progress dialog that allows cancelling the import.
+        Otherwise, this blocks until all traces have been imported.
+
+        Traces are decoded in parallel by the given number of worker processes (None for one per core when there are
+        enough traces to be worth it, see HEKAImportWorker). Series are still added to self.data in file order.
+        """
+        heka_reader = _optionalImport('heka_reader')
+        if heka_reader is None:
+            return
+        if filepath is None:
+            filepath, _ = QFileDialog.getOpenFileName(self, "Open HEKA File", "", "HEKA Data Files (*.dat)")
+        if not filepath or not os.path.isfile(filepath):
+            return
+        bundle = heka_reader.Bundle(filepath)
+        numHekaGroups = len(bundle.pul)
+        if numHekaGroups == 0:
+            return
+        elif numHekaGroups == 1:
+            hekaGroupIndex = 0
+        elif numHekaGroups > 1:
+            # choose a group (experiment) to load
+            hekaGroupNames = [bundle.pul[i].Label for i in range(numHekaGroups)]
+            hekaGroupNamesListWidget = QListWidget()
+            hekaGroupNamesListWidget.addItems(hekaGroupNames)
+            hekaGroupNamesListWidget.setSelectionMode(QAbstractItemView.SingleSelection)
+            hekaGroupNamesListWidget.item(0).setSelected(True)
+            dlg = QDialog()
+            dlg.setWindowTitle("Choose Recording")
+            buttonBox = QDialogButtonBox()
+            buttonBox.setStandardButtons(QDialogButtonBox.Cancel | QDialogButtonBox.Ok)
+            buttonBox.accepted.connect(dlg.accept)
+            buttonBox.rejected.connect(dlg.reject)
+            layout = QVBoxLayout(dlg)
+            layout.addWidget(hekaGroupNamesListWidget)
+            layout.addWidget(buttonBox)
+            dlg.setWindowModality(Qt.ApplicationModal)
+            if dlg.exec_():
+                hekaGroupIndex = hekaGroupNamesListWidget.selectedIndexes()[0].row()
+            else:
+                return
+        
+        # only one import at a time
+        self.cancelHEKAImport()
+
+        worker = HEKAImportWorker(filepath, hekaGroupIndex, processes)
+        if not background:
+            data = []
+            errors = []
+            worker.sigSeriesDecoded.connect(data.extend)
+            worker.sigError.connect(errors.append)
+            worker.run()
+            for error in errors:
+                QMessageBox.warning(self, "Import HEKA", error)
+            if not data:
+                return
+            if clear:
+                self.data = data
+            else:
+                self.data.extend(data)
+            self.updateUI()
+            return
+        
+        if clear:
+            self.data = []
+            self.updateUI()
+        
+        progressDialog = QProgressDialog("Importing " + os.path.basename(filepath), "Cancel", 0, 0, self)
+        progressDialog.setWindowTitle("Import HEKA")
+        progressDialog.setMinimumDuration(500)
+        # direct call from the GUI thread, the worker's thread is busy decoding
+        progressDialog.canceled.connect(lambda: worker.cancel())
+
+        thread = QThread()
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.sigSeriesDecoded.connect(self._onHEKASeriesDecoded)
+        worker.sigProgress.connect(self._onHEKAImportProgress)
+        worker.sigError.connect(self._onHEKAImportError)
+        # direct so that quit does not wait on the GUI thread's event loop (e.g., while blocked in cancelHEKAImport)
+        worker.sigFinished.connect(thread.quit, Qt.DirectConnection)
+        thread.finished.connect(self._onHEKAImportFinished)
+        self._hekaImport = (thread, worker, progressDialog)
+        thread.start()
+    
+    def cancelHEKAImport(self):
+        """ Cancel background HEKA import (if any). Series imported so far are kept. """
+        if self._hekaImport is None:
+            return
+        thread, worker, progressDialog = self._hekaImport
+        worker.cancel()
+        thread.wait()
+        # deliver what the worker emitted before it stopped, so none of it ends up in a subsequent import
+        QCoreApplication.sendPostedEvents(None, QEvent.MetaCall)
+        self._onHEKAImportFinished()
+    
+    def _onHEKASeriesDecoded(self, data):
+        # ignore batches of a previous (cancelled) import
+        if self._hekaImport is None or self.sender() is not self._hekaImport[1]:
+            return
+        self.addSeriesBatch(data)
+    
+    def _onHEKAImportProgress(self, numDecoded, numTotal):
+        if self._hekaImport is None or self.sender() is not self._hekaImport[1]:
+            return
+        progressDialog = self._hekaImport[2]
+        progressDialog.setMaximum(numTotal)
+        progressDialog.setValue(numDecoded)
+    
+    def _onHEKAImportError(self, error):
+        if self._hekaImport is None or self.sender() is not self._hekaImport[1]:
+            return
+        QMessageBox.warning(self, "Import HEKA", error)
+    
+    def _onHEKAImportFinished(self):
+        if self._hekaImport is None:
+            return
+        thread, worker, progressDialog = self._hekaImport
+        if isinstance(self.sender(), QThread) and self.sender() is not thread:
+            # finished signal of a previous (cancelled) import
+            return
+        self._hekaImport = None
+        progressDialog.reset()
+        progressDialog.deleteLater()
+        worker.deleteLater()
+        thread.deleteLater()
+    
+    def startStream(self, source, numChannels=1, capacity=100000, dx=1, x0=0, dtype=float, groups=None, names=None, **attrs) -> SeriesStream:
+        """
+        Add live series (one per channel) fed by source, e.g., a generator or fileTailSource.
+
+        Only the most recent capacity samples per channel are kept, so memory is bounded regardless of how long
+        the stream runs. Channels default to consecutive groups. Plots are updated at most streamRefreshRate times
+        per second. Call stopStream to stop streaming; the series are kept.
+        """
+        if groups is None:
+            groups = list(range(numChannels))
+        if names is None:
+            names = [None] * numChannels
+        seriesList = []
+        for group, name in zip(groups, names):
+            series = {'x': dx, 'y': np.zeros(0, dtype=dtype), 'group': group}
+            if x0 != 0:
+                series['x0'] = x0
+            if name is not None:
+                series['name'] = name
+            series.update(copy.deepcopy(attrs))
+            seriesList.append(series)
+        stream = SeriesStream(source, seriesList, capacity, dx, x0, dtype)
+        self._streams.append(stream)
+        self.addSeriesBatch(seriesList)
+        if self._streamTimer is None:
+            self._streamTimer = QTimer(self)
+            self._streamTimer.timeout.connect(self._onStreamTimeout)
+        if not self._streamTimer.isActive():
+            self._streamTimer.start(int(1000 / self.streamRefreshRate))
+        return stream
+    
+    def stopStream(self, stream: SeriesStream = None):
+        """ Stop streaming (all streams by default). The streamed series keep a copy of their buffered samples. """
+        streams = list(self._streams) if stream is None else [stream]
+        for stream in streams:
+            if stream not in self._streams:
+                continue
+            self._streams.remove(stream)
+            self._updateStreamSeries(stream)
+            for series, buffer in zip(stream.series, stream.buffers):
+                # detach from the ring buffer
+                series['y'] = np.array(buffer)
+            close = getattr(stream.source, 'close', None)
+            if close is not None:
+                close()
+        if not self._streams and self._streamTimer is not None:
+            self._streamTimer.stop()
+    
+    def _onStreamTimeout(self):
+        # read what is available for at most half a frame, then redraw only the streamed series
+        deadline = time.perf_counter() + 0.5 / self.streamRefreshRate
+        isUpdated = False
+        for stream in list(self._streams):
+            if stream.read(deadline):
+                self._updateStreamSeries(stream)
+                isUpdated = True
+            if stream.isFinished:
+                self.stopStream(stream)
+        if isUpdated:
+            self._updateGroupPlots()
+    
+    def _updateStreamSeries(self, stream: SeriesStream):
+        for series, buffer in zip(stream.series, stream.buffers):
+            x0 = stream.x0 + (buffer.count - len(buffer)) * stream.dx
+            self.setSeriesAttr('x0', x0 if x0 != 0 else None, series)
+            self.setSeriesAttr('y', buffer.view(), series)
+    
+    def closeEvent(self, event):
+        self.pause()
+        self._clearPrefetch()
+        if self._prefetch is not None:
+            self._prefetch[0].wait()
+        self.stopStream()
+        self.cancelHEKAImport()
+        self.showProfilingOverlay(False)
+        QWidget.closeEvent(self, event)
+    
+    @contextlib.contextmanager
+    def batchUpdate(self):
+        """
+        Context manager that defers UI updates until the end of the batch, e.g.,
+
+            with tsa.batchUpdate():
+                for ...:
+                    tsa.addSeries(...)
+        
+        All updates requested within the batch (which may be nested) are coalesced into one when it ends.
+        That is a full update if updateUI() was called, otherwise only what changed is redrawn.
+        Series derived from changed series are also only resolved once (see TimeSeriesAnalyzer.batchUpdate).
+        """
+        self._batchUpdateDepth += 1
+        try:
+            with TimeSeriesAnalyzer.batchUpdate(self):
+                yield self
+        finally:
+            self._batchUpdateDepth -= 1
+            if self._batchUpdateDepth == 0 and self._pendingUpdate is not None:
+                pendingUpdate = self._pendingUpdate
+                self._pendingUpdate = None
+                if pendingUpdate == 'all':
+                    self.updateUI()
+                else:
+                    self._refreshUI()
+    
+    def _onSeriesAttrChanged(self, series, index, attr):
+        TimeSeriesAnalyzer._onSeriesAttrChanged(self, series, index, attr)
+        # redraw the series
+        self._dirtySeries.add(id(series))
+        if index is not None and self._dataTableModel is not None:
+            self._dataTableModel.seriesChanged(index, attr)
+    
+    def _onSeriesDataChanged(self, seriesList, dependents):
+        TimeSeriesAnalyzer._onSeriesDataChanged(self, seriesList, dependents)
+        # redraw the series and any series derived from them (e.g., y edited in place)
+        for series in seriesList + dependents:
+            self._dirtySeries.add(id(series))
+            self._pyramids.pop(id(series), None)
+    
+    def reduceVisibleSeries(self, reductions=['mean']) -> list:
+        return self.reduceSeries(reductions, self.visibleEpisodes(), self.visibleGroups(), self.visibleNames())
+    
+    def filterVisibleSeries(self, filters=None) -> list:
+        """ Zero-phase filter the visible series (see filterSeries), filters are asked for if not given. """
+        if filters is None:
+            text, ok = QInputDialog.getText(self, "Filter Visible Episodes", "Filters (e.g., lowpass 1000, notch 60 q=30, highpass 1 order=2):", 
+                text=self._filtersText)
+            if not ok or not text.strip():
+                return []
+            try:
+                filters = parseFilters(text)
+            except ValueError as error:
+                QMessageBox.warning(self, "Filter Visible Episodes", str(error))
+                return []
+            self._filtersText = text
+        return self.filterSeries(filters, self.visibleEpisodes(), self.visibleGroups(), self.visibleNames())
+    
+    def visibleEpisodes(self) -> list:
+        episodes = self.seriesEpisodes()
+        if not episodes:
+            return []
+        selection = self._visibleEpisodeSelection()
+        if selection.isAll():
+            return episodes
+        episodes = np.array(episodes)
+        return episodes[selection.mask(episodes)].tolist()
+    
+    def _visibleEpisodeSelection(self) -> EpisodeSelection:
+        # compiled once per edit of the visible episodes text
+        text = self._visibleEpisodesEdit.text()
+        if self._episodeSelection is None or self._episodeSelection.text != text:
+            self._episodeSelection = EpisodeSelection(text)
+        return self._episodeSelection
+    
+    def setVisibleEpisodes(self, visibleEpisodes: list):
+        episodes = self.seriesEpisodes()
+        if not episodes:
+            self._visibleEpisodesEdit.setText('')
+            self._updateGroupPlots()
+            return
+        visibleEpisodes = np.unique(visibleEpisodes).astype(int)
+        visibleEpisodes = visibleEpisodes[np.isin(visibleEpisodes, episodes)]
+        # runs of consecutive episodes => first-last
+        breaks = np.flatnonzero(np.diff(visibleEpisodes) != 1) + 1
+        firsts = visibleEpisodes[np.concatenate([[0], breaks])] if len(visibleEpisodes) else []
+        lasts = visibleEpisodes[np.concatenate([breaks - 1, [len(visibleEpisodes) - 1]])] if len(visibleEpisodes) else []
+        visibleEpisodesText = [str(first) if first == last else f'{first}-{last}' for first, last in zip(firsts, lasts)]
+        self._visibleEpisodesEdit.setText(' '.join(visibleEpisodesText))
+        self._updateGroupPlots()
+        self._updateEpisodeSlider()
+    
+    def visibleGroups(self) -> list:
+        groups = self.seriesGroups()
+        if not groups:
+            return []
+        visibleGroupIndexes = [index.row() for index in self._visibleGroupsListWidget.selectedIndexes()]
+        visibleGroups = [groups[i] for i in visibleGroupIndexes if i < len(groups)]
+        return visibleGroups if visibleGroups else groups
+    
+    def setVisibleGroups(self, visibleGroups: list):
+        self._updateVisibleGroupsListView()
+        groups = self.seriesGroups()
+        listWidget = self._visibleGroupsListWidget
+        listWidget.itemSelectionChanged.disconnect()
+        for item in listWidget.items():
+            item.setSelected(False)
+        for group in visibleGroups:
+            if group in groups:
+                listWidget.item(groups.index(group)).setSelected(True)
+        listWidget.itemSelectionChanged.connect(self._onVisibleGroupsChanged)
+        self._onVisibleGroupsChanged()
+    
+    def visibleNames(self) -> list:
+        names = self.seriesNames()
+        if not names:
+            return []
+        selectedIndexes = [index.row() for index in self._visibleNamesListWidget.selectedIndexes()]
+        visibleNames = [names[i] for i in selectedIndexes if i < len(names)]
+        return visibleNames if visibleNames else names
+    
+    def setVisibleNames(self, visibleNames: list):
+        self._updateVisibleNamesListView()
+        names = self.seriesNames()
+        listWidget = self._visibleNamesListWidget
+        listWidget.itemSelectionChanged.disconnect()
+        for item in listWidget.items():
+            item.setSelected(False)
+        for name in visibleNames:
+            if name in names:
+                listWidget.item(names.index(name)).setSelected(True)
+        listWidget.itemSelectionChanged.connect(self._onVisibleNamesChanged)
+        self._onVisibleNamesChanged()
+    
+    def initUI(self):
+        # episode traversal
+        self._visibleEpisodesEdit = QLineEdit("0")
+        self._visibleEpisodesEdit.setMinimumWidth(64)
+        self._visibleEpisodesEdit.setMaximumWidth(128)
+        self._visibleEpisodesEdit.setToolTip("Visible Episodes")
+        self._visibleEpisodesEdit.textEdited.connect(self._updateGroupPlots)
+        self._visibleEpisodesEdit.textEdited.connect(lambda text: self._updateEpisodeSlider())
+
+        self._prevEpisodeButton = QPushButton()
+        if qta is not None:
+            icon = qta.icon("fa.step-backward")
+            self._prevEpisodeButton.setIcon(icon)
+        else:
+            self._prevEpisodeButton.setText("<")
+            self._prevEpisodeButton.setMaximumWidth(32)
+        self._prevEpisodeButton.setToolTip("Previous Episode")
+        self._prevEpisodeButton.clicked.connect(self.prevEpisode)
+
+        self._nextEpisodeButton = QPushButton()
+        if qta is not None:
+            icon = qta.icon("fa.step-forward")
+            self._nextEpisodeButton.setIcon(icon)
+        else:
+            self._nextEpisodeButton.setText(">")
+            self._nextEpisodeButton.setMaximumWidth(32)
+        self._nextEpisodeButton.setToolTip("Next Episode")
+        self._nextEpisodeButton.clicked.connect(self.nextEpisode)
+
+        self._playButton = QPushButton()
+        self._playButton.setCheckable(True)
+        if qta is not None:
+            icon = qta.icon("fa.play")
+            self._playButton.setIcon(icon)
+        else:
+            self._playButton.setText("Play")
+        self._playButton.setToolTip("Play Episodes")
+        self._playButton.clicked.connect(lambda checked: self.play() if checked else self.pause())
+
+        self._episodeSlider = QSlider(Qt.Horizontal)
+        self._episodeSlider.setMinimumWidth(64)
+        self._episodeSlider.setMaximumWidth(256)
+        self._episodeSlider.setToolTip("Scrub Episodes")
+        self._episodeSlider.valueChanged.connect(self._onEpisodeSliderChanged)
+
+        # visible group selection
+        self._visibleGroupsListWidget = QListWidget()
+        self._visibleGroupsListWidget.setSelectionMode(QAbstractItemView.MultiSelection)
+        self._visibleGroupsListWidget.itemSelectionChanged.connect(self._onVisibleGroupsChanged)
+
+        # visible name selection
+        self._visibleNamesListWidget = QListWidget()
+        self._visibleNamesListWidget.setSelectionMode(QAbstractItemView.MultiSelection)
+        self._visibleNamesListWidget.itemSelectionChanged.connect(self._onVisibleNamesChanged)
+
+        # Python interactive console
+        if PythonConsole is not None:
+            self._console = PythonConsole()
+            # In the console the variable `self` provides access to this instance.
+            self._console.push_local_ns('self', self)
+            self._console.eval_queued()
+
+            # TODO: Use better console colors. The default colors suck.
+            pal = self._console.palette()
+            pal.setColor(pal.Base, QColor(82, 82, 82))
+            self._console.setPalette(pal)
+        else:
+            self._console = None
+        
+        # main menu
+        self._fileMenu = QMenu("&File")
+        self._fileMenu.addAction("&Open", self.open)
+        self._fileMenu.addSection(" ")
+        self._fileMenu.addAction("Import HEKA", self.importHEKA)
+        self._fileMenu.addSection(" ")
+        self._fileMenu.addAction("&Save", self.save)
+
+        self._groupsMenu = QMenu("Groups")
+        action = QWidgetAction(self._groupsMenu)
+        action.setDefaultWidget(self._visibleGroupsListWidget)
+        self._groupsMenu.addAction(action)
+
+        self._namesMenu = QMenu("Names")
+        action = QWidgetAction(self._namesMenu)
+        action.setDefaultWidget(self._visibleNamesListWidget)
+        self._namesMenu.addAction(action)
+
+        self._reduceMenu = QMenu("Reduce Visible Episodes")
+        self._reduceMenu.addAction("Mean", lambda: self.reduceVisibleSeries(['mean']))
+        self._reduceMenu.addAction("Variance", lambda: self.reduceVisibleSeries(['var']))
+        self._reduceMenu.addAction("Standard Deviation", lambda: self.reduceVisibleSeries(['std']))
+        self._reduceMenu.addAction("Min/Max Envelope", lambda: self.reduceVisibleSeries(['min', 'max']))
+
+        self._mainMenu = QMenu()
+        self._mainMenu.addMenu(self._fileMenu)
+        self._mainMenu.addSection(" ")
+        self._mainMenu.addMenu(self._groupsMenu)
+        self._mainMenu.addMenu(self._namesMenu)
+        self._mainMenu.addSection(" ")
+        self._mainMenu.addMenu(self._reduceMenu)
+        self._mainMenu.addAction("Filter Visible Episodes", self.filterVisibleSeries)
+        self._mainMenu.addSection(" ")
+        action = self._makeAction(self._mainMenu, "Data Table", self.showDataTable, "fa.table")
+        self._mainMenu.addAction(action)
+        if self._console is not None:
+            action = self._makeAction(self._mainMenu, "Python Console", self.showCosole, "fa.terminal")
+            self._mainMenu.addAction(action)
+        self._profilingOverlayAction = self._makeAction(self._mainMenu, "Profiling Overlay", self.showProfilingOverlay, "fa.tachometer")
+        self._profilingOverlayAction.setCheckable(True)
+        self._mainMenu.addAction(self._profilingOverlayAction)
+
+        self._mainMenuButton = QToolButton()
+        self._mainMenuButton.setPopupMode(QToolButton.InstantPopup)
+        self._mainMenuButton.setMenu(self._mainMenu)
+        if qta is not None:
+            icon = qta.icon("fa.bars")
+            self._mainMenuButton.setIcon(icon)
+        else:
+            self._mainMenuButton.setText("Menu")
+
+        # top toolbar
+        self._toolbar = QToolBar()
+        self._mainMenuButtonAction = self._toolbar.addWidget(self._mainMenuButton)
+        self._visibleEpisodesEditAction = self._toolbar.addWidget(self._visibleEpisodesEdit)
+        self._prevEpisodeButtonAction = self._toolbar.addWidget(self._prevEpisodeButton)
+        self._nextEpisodeButtonAction = self._toolbar.addWidget(self._nextEpisodeButton)
+        self._playButtonAction = self._toolbar.addWidget(self._playButton)
+        self._episodeSliderAction = self._toolbar.addWidget(self._episodeSlider)
+        
+        # plots layout
+        self._groupPlotsLayout = QVBoxLayout()
+        self._groupPlotsLayout.setContentsMargins(0, 0, 0, 0)
+        self._groupPlotsLayout.setSpacing(0)
+
+        # main layout
+        self._mainLayout = QVBoxLayout(self)
+        self._mainLayout.setContentsMargins(3, 3, 3, 3)
+        self._mainLayout.setSpacing(0)
+        self._mainLayout.addWidget(self._toolbar)
+        self._mainLayout.addLayout(self._groupPlotsLayout)
+    
+    def updateUI(self):
+        if self._batchUpdateDepth:
+            self._pendingUpdate = 'all'
+            return
+        
+        # series dicts may have been edited directly, so refresh cached metadata and redraw all series
+        start = self.profiler.start()
+        TimeSeriesAnalyzer.updateUI(self)
+        self._allSeriesDirty = True
+        seriesIds = set(id(series) for series in self.data)
+        self._pyramids = {key: value for key, value in self._pyramids.items() if key in seriesIds}
+        self._clearPrefetch()
+
+        self._refreshUI()
+        self.profiler.stop('updateUI', start)
+    
+    def _refreshUI(self):
+        """ Same as updateUI, but for changes that are already tracked (e.g., appended series and setSeriesAttr). """
+        if self._batchUpdateDepth:
+            if self._pendingUpdate is None:
+                self._pendingUpdate = 'refresh'
+            return
+        
+        # update visible groups and names
+        self._updateVisibleGroupsListView()
+        self._updateVisibleNamesListView()
+
+        # update plots
+        self._updateGroupPlots()
+
+        # update toolbar
+        showEpisodeControls = len(self.seriesEpisodes()) > 1
+        self._visibleEpisodesEditAction.setVisible(showEpisodeControls)
+        self._prevEpisodeButtonAction.setVisible(showEpisodeControls)
+        self._nextEpisodeButtonAction.setVisible(showEpisodeControls)
+        self._playButtonAction.setVisible(showEpisodeControls)
+        self._episodeSliderAction.setVisible(showEpisodeControls)
+        if showEpisodeControls:
+            self._updateEpisodeSlider()
+
+        # update table model (only the rows fetched so far)
+        if self._dataTableModel is not None:
+            self._dataTableModel.refresh()
+    
+    def _updateGroupPlots(self):
+        if self._batchUpdateDepth:
+            if self._pendingUpdate is None:
+                self._pendingUpdate = 'refresh'
+            return
+        start = self.profiler.start()
+        visibleEpisodes = self.visibleEpisodes()
+        visibleGroups = self.visibleGroups()
+        visibleNames = self.visibleNames()
+        groups = self.seriesGroups()
+        plots = self.groupPlots()
+        numExistingPlots = len(plots)
+
+        for i, group in enumerate(groups):
+            # group plot
+            if len(plots) > i:
+                plot = plots[i]
+            else:
+                plot = PlotWidget()
+                self._groupPlotsLayout.addWidget(plot, stretch=1)
+                plots.append(plot)
+            
+            # visible series
+            queryStart = self.profiler.start()
+            indexes = self.seriesIndexes(groups=[group], episodes=visibleEpisodes, names=visibleNames)
+            self.profiler.stop('seriesIndexes', queryStart)
+            seriesList = [self.data[index] for index in indexes]
+            seriesList = [series for series in seriesList if series.get('y') is not None]
+
+            # keep plot data items for series that are still visible, recycle the rest
+            items = plot.seriesItems
+            plot.seriesItems = {}
+            for series in seriesList:
+                plotDataItem = items.pop(id(series), None)
+                if plotDataItem is not None and plotDataItem.seriesDict is series:
+                    plot.seriesItems[id(series)] = plotDataItem
+            spareItems = list(items.values())
+            
+            # plot series (only touch what changed)
+            colorIndex = 0
+            for series in seriesList:
+                isDirty = self._allSeriesDirty or id(series) in self._dirtySeries
+                plotDataItem = plot.seriesItems.get(id(series))
+                if plotDataItem is None:
+                    if spareItems:
+                        # reuse plot data item from a series that is no longer visible
+                        plotDataItem = spareItems.pop()
+                    else:
+                        # add new plot data item
+                        plotDataItem = PlotDataItem()
+                        plot.addItem(plotDataItem)
+                    plotDataItem.seriesDict = series
+                    plot.seriesItems[id(series)] = plotDataItem
+                    isDirty = True
+                
+                # data
+                plottedData = self._seriesDataState(series)
+                if isDirty or plotDataItem.plottedData is None or not self._isSameState(plottedData, plotDataItem.plottedData):
+                    x = self.seriesAttr('x', series)
+                    y = self.seriesAttr('y', series)
+                    mask = series.get('mask')
+                    if mask is not None and len(mask):
+                        # masked samples are not drawn (broken segments)
+                        y = maskedValues(x, y, mask)
+                    plotDataItem.setData(x, y, pyramid=self._seriesPyramid(series, x, y))
+                    plotDataItem.plottedData = plottedData
+                
+                # style
+                style = self.seriesAttr('style', series)
+                if style is None:
+                    style = {}
+                styleState = (dict(style), colorIndex)
+                if isDirty or plotDataItem.styleState is None or plotDataItem.styleState[0] != styleState:
+                    nextColorIndex = plotDataItem.setCustomStyle(style, colorIndex)
+                    plotDataItem.styleState = (styleState, nextColorIndex)
+                colorIndex = plotDataItem.styleState[1]
+                
+                # text items
+                labels = series.get('labels', [])
+                textItems = plotDataItem.textItems
+                for j, label in enumerate(labels):
+                    if len(textItems) > j:
+                        # update existing text item
+                        textItem = textItems[j]
+                    else:
+                        # add new text item
+                        textItem = TextItem()
+                        plot.getViewBox().addItem(textItem)
+                        textItem.dataItem = plotDataItem
+                        textItems.append(textItem)
+                    textItem.seriesDict = series
+                    if isDirty or textItem.labelDict is not label or textItem.labelState != label:
+                        textItem.setLabelDict(label)
+                        textItem.labelState = dict(label)
+                
+                # remove extra text items
+                while len(textItems) > len(labels):
+                    textItem = textItems.pop()
+                    plot.getViewBox().removeItem(textItem)
+                    textItem.deleteLater()
+            
+            # remove extra plot data items
+            for plotDataItem in spareItems:
+                for textItem in plotDataItem.textItems:
+                    plot.getViewBox().removeItem(textItem)
+                    textItem.deleteLater()
+                plot.removeItem(plotDataItem)
+                plotDataItem.deleteLater()
+            
+            # axis labels (based on first series with axis labels)
+            if seriesList:
+                for series in seriesList:
+                    xlabel = self.seriesAttr('xlabel', series)
+                    if xlabel != '':
+                        break
+                for series in seriesList:
+                    ylabel = self.seriesAttr('ylabel', series)
+                    if isinstance(group, int):
+                        ylabel = str(group) + ":" + ylabel
+                    if ylabel != '':
+                        break
+                if plot.getAxis('bottom').labelText != xlabel:
+                    plot.getAxis('bottom').setLabel(xlabel)
+                if plot.getAxis('left').labelText != ylabel:
+                    plot.getAxis('left').setLabel(ylabel)
+                
+            # show/hide plot
+            if group in visibleGroups:
+                plot.show()
+            else:
+                plot.hide()
+        
+        # remove extra plots
+        while len(plots) > len(groups):
+            i = len(plots) - 1
+            self._groupPlotsLayout.takeAt(i)
+            plot = plots.pop(i)
+            plot.deleteLater()
+
+        # left align visible plot axes
+        visiblePlots = [plot for plot in plots if plot.isVisible()]
+        leftAxisWidths = [plot.getAxis('left').width() for plot in visiblePlots]
+        for plot in visiblePlots:
+            if plot.getAxis('left').width() != max(leftAxisWidths):
+                plot.getAxis('left').setWidth(max(leftAxisWidths))
+
+        # link x-axis of new plots
+        # TODO: link based on xlink attr?
+        for i in range(max(1, numExistingPlots), len(plots)):
+            plots[i].setXLink(plots[0])
+        
+        # everything is now up to date
+        self._allSeriesDirty = False
+        self._dirtySeries.clear()
+        self.profiler.stop('_updateGroupPlots', start)
+    
+    def _seriesPyramid(self, series, x, y):
+        """ Cached min/max level of detail pyramid for series x, y (None for short series). """
+        if np.size(y) < MinMaxPyramid.minSize:
+            return None
+        rawData = self._seriesDataState(series)
+        cached = self._pyramids.get(id(series))
+        if cached is not None and self._isSameState(cached[0], rawData):
+            return cached[1]
+        pyramid = MinMaxPyramid(x, y)
+        self._pyramids[id(series)] = (rawData, pyramid)
+        return pyramid
+    
+    @staticmethod
+    def _seriesDataState(series) -> tuple:
+        # what is drawn for a series (compared by identity), including the sources of derived series
+        y = series.get('y')
+        state = (series.get('x'), series.get('x0'), series.get('mask'), y)
+        if isinstance(y, DerivedArray):
+            state += y._sourceState()
+        return state
+    
+    @staticmethod
+    def _isSameState(a: tuple, b: tuple) -> bool:
+        return len(a) == len(b) and all(value is other for value, other in zip(a, b))
+    
+    def groupPlots(self):
+        widgets = [self._groupPlotsLayout.itemAt(i).widget() for i in range(self._groupPlotsLayout.count())]
+        plots = [widget for widget in widgets if isinstance(widget, PlotWidget)]
+        return plots
+    
+    def nextEpisode(self):
+        episodes = self.seriesEpisodes()
+        if not episodes:
+            return
+        if self._visibleEpisodesEdit.text().strip() == '':
+            self.setVisibleEpisodes([episodes[0]])
+            return
+        visibleEpisodes = self.visibleEpisodes()
+        if not visibleEpisodes:
+            self.setVisibleEpisodes([episodes[0]])
+            return
+        index = episodes.index(visibleEpisodes[-1])
+        index = min(index + 1, len(episodes) - 1)
+        self.setVisibleEpisodes([episodes[index]])
+        self._prefetchEpisodes()
+    
+    def prevEpisode(self):
+        episodes = self.seriesEpisodes()
+        if not episodes:
+            return
+        if self._visibleEpisodesEdit.text().strip() == '':
+            self.setVisibleEpisodes([episodes[-1]])
+            return
+        visibleEpisodes = self.visibleEpisodes()
+        if not visibleEpisodes:
+            self.setVisibleEpisodes([episodes[-1]])
+            return
+        index = episodes.index(visibleEpisodes[0])
+        index = max(0, index - 1)
+        self.setVisibleEpisodes([episodes[index]])
+        self._prefetchEpisodes(-1)
+    
+    def play(self, rate=None):
+        """
+        Page through episodes from the visible one at rate (default playbackRate) episodes per second.
+
+        Upcoming episodes are loaded and decimated in a background thread, and playback waits for them
+        rather than stalling the UI. Stops at the last episode or on pause().
+        """
+        if rate is not None:
+            self.playbackRate = rate
+        if self._playbackTimer is None:
+            self._playbackTimer = QTimer(self)
+            self._playbackTimer.timeout.connect(self._onPlaybackTimeout)
+        self._playbackTimer.start(max(1, int(1000 / self.playbackRate)))
+        self._playButton.setChecked(True)
+        self._prefetchEpisodes()
+    
+    def pause(self):
+        if self._playbackTimer is not None:
+            self._playbackTimer.stop()
+        self._playButton.setChecked(False)
+    
+    def isPlaying(self) -> bool:
+        return self._playbackTimer is not None and self._playbackTimer.isActive()
+    
+    def _onPlaybackTimeout(self):
+        episodes = self.seriesEpisodes()
+        visibleEpisodes = self.visibleEpisodes()
+        if not episodes or (visibleEpisodes and visibleEpisodes[-1] == episodes[-1]):
+            self.pause()
+            return
+        if visibleEpisodes:
+            nextEpisode = episodes[episodes.index(visibleEpisodes[-1]) + 1]
+            if nextEpisode in self._prefetchPending:
+                # wait for the background prefetch
+                return
+        self.nextEpisode()
+    
+    def _onEpisodeSliderChanged(self, index):
+        episodes = self.seriesEpisodes()
+        if 0 <= index < len(episodes):
+            self.setVisibleEpisodes([episodes[index]])
+            self._prefetchEpisodes()
+    
+    def _updateEpisodeSlider(self):
+        episodes = self.seriesEpisodes()
+        visibleEpisodes = self.visibleEpisodes()
+        self._episodeSlider.blockSignals(True)
+        self._episodeSlider.setRange(0, max(0, len(episodes) - 1))
+        if visibleEpisodes:
+            self._episodeSlider.setValue(episodes.index(visibleEpisodes[0]))
+        self._episodeSlider.blockSignals(False)
+    
+    def _prefetchEpisodes(self, direction=1):
+        """ Request background loading and decimation of the next prefetchCount episodes (previous if direction < 0). """
+        episodes = self.seriesEpisodes()
+        visibleEpisodes = self.visibleEpisodes()
+        if not episodes or not visibleEpisodes or self.prefetchCount <= 0:
+            return
+        if direction > 0:
+            index = episodes.index(visibleEpisodes[-1])
+            upcoming = episodes[index + 1:index + 1 + self.prefetchCount]
+        else:
+            index = episodes.index(visibleEpisodes[0])
+            upcoming = episodes[max(0, index - self.prefetchCount):index][::-1]
+        if not self._prefetchPending.issubset(upcoming):
+            # moved elsewhere, skip outdated requests
+            self._prefetchRequests.clear()
+            self._prefetchPending.clear()
+        visibleNames = self.visibleNames()
+        for episode in upcoming:
+            if episode in self._prefetchedEpisodes:
+                self._prefetchedEpisodes.move_to_end(episode)
+                continue
+            if episode in self._prefetchPending:
+                continue
+            items = []
+            for index in self.seriesIndexes(episodes=[episode], names=visibleNames):
+                series = self.data[index]
+                if series.get('y') is None:
+                    continue
+                rawData = self._seriesDataState(series)
+                items.append((series, rawData, self.seriesAttr('x', series), series['y'], series.get('mask')))
+            self._prefetchRequests.append((episode, items))
+            self._prefetchPending.add(episode)
+        self._startPrefetch()
+    
+    def _startPrefetch(self):
+        if self._prefetch is not None or not self._prefetchRequests:
+            return
+        worker = EpisodePrefetchWorker(self._prefetchRequests)
+        thread = QThread()
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.sigPrefetched.connect(self._onEpisodePrefetched)
+        # direct so that thread.wait() does not wait on the event loop of this thread
+        worker.sigFinished.connect(thread.quit, Qt.DirectConnection)
+        thread.finished.connect(self._onPrefetchFinished)
+        self._prefetch = (thread, worker)
+        thread.start()
+    
+    def _onPrefetchFinished(self):
+        if self._prefetch is None:
+            return
+        thread, worker = self._prefetch
+        self._prefetch = None
+        worker.deleteLater()
+        thread.deleteLater()
+        # requests added after the worker ran out of them
+        self._startPrefetch()
+    
+    def _onEpisodePrefetched(self, episode, results):
+        self._prefetchPending.discard(episode)
+        for series, rawData, pyramid in results:
+            # only if the series data was not changed in the meantime
+            if pyramid is not None and self._isSameState(rawData, self._seriesDataState(series)):
+                self._pyramids[id(series)] = (rawData, pyramid)
+        self._prefetchedEpisodes[episode] = [series for series, rawData, pyramid in results]
+        self._prefetchedEpisodes.move_to_end(episode)
+        if len(self._prefetchedEpisodes) > self.prefetchCacheSize:
+            visibleEpisodes = set(self.visibleEpisodes())
+            while len(self._prefetchedEpisodes) > self.prefetchCacheSize:
+                episode, seriesList = self._prefetchedEpisodes.popitem(last=False)
+                if episode not in visibleEpisodes:
+                    self._releaseSeries(seriesList)
+    
+    def _releaseSeries(self, seriesList):
+        """ Free the decimation and any lazily loaded data of (not visible) series. """
+        for series in seriesList:
+            self._pyramids.pop(id(series), None)
+            if isinstance(series.get('y'), LazyArray):
+                series['y'].unload()
+    
+    def _clearPrefetch(self):
+        self._prefetchRequests.clear()
+        self._prefetchPending.clear()
+        self._prefetchedEpisodes.clear()
+    
+    def _updateVisibleGroupsListView(self):
+        groups = self.seriesGroups()
+        groupNames = self.groupNames()
+        listWidget = self._visibleGroupsListWidget
+        selectedIndexes = [index.row() for index in listWidget.selectedIndexes()]
+        listWidget.itemSelectionChanged.disconnect()
+        listWidget.clear()
+        if qta is not None:
+            for name in groupNames:
+                item = QListWidgetItem(name)
+                item.setIcon(qta.icon('mdi.circle-small'))
+                listWidget.addItem(item)
+            listWidget.setIconSize(QSize(16, 16))
+        else:
+            listWidget.addItems(groupNames)
+        for i in selectedIndexes:
+            if i < len(groups):
+                listWidget.item(i).setSelected(True)
+        listWidget.itemSelectionChanged.connect(self._onVisibleGroupsChanged)
+    
+    def _onVisibleGroupsChanged(self):
+        groups = self.seriesGroups()
+        visibleGroups = self.visibleGroups()
+        for i, plot in enumerate(self.groupPlots()):
+            if i < len(groups) and groups[i] in visibleGroups:
+                plot.show()
+            else:
+                plot.hide()
+
+    def _updateVisibleNamesListView(self):
+        names = self.seriesNames()
+        listWidget = self._visibleNamesListWidget
+        selectedIndexes = [index.row() for index in listWidget.selectedIndexes()]
+        listWidget.itemSelectionChanged.disconnect()
+        listWidget.clear()
+        if qta is not None:
+            for name in names:
+                item = QListWidgetItem(name)
+                item.setIcon(qta.icon('mdi.circle-small'))
+                listWidget.addItem(item)
+            listWidget.setIconSize(QSize(16, 16))
+        else:
+            listWidget.addItems(names)
+        for i in selectedIndexes:
+            if i < len(names):
+                listWidget.item(i).setSelected(True)
+        listWidget.itemSelectionChanged.connect(self._onVisibleNamesChanged)
+    
+    def _onVisibleNamesChanged(self):
+        self._updateGroupPlots()
+    
+    def showDataTable(self):
+        if self._dataTableModel is None:
+            self._dataTableModel = DataTableModel(self)
+        if self._dataTableView is None:
+            self._dataTableView = QTableView()
+            self._dataTableView.setModel(self._dataTableModel)
+            self._dataTableView.resizeColumnsToContents()
+        self._dataTableView.show()
+    
+    def showCosole(self):
+        if self._console is None:
+            return
+        self._console.show()
+    
+    def showProfilingOverlay(self, show=True):
+        """
+        Show/hide redraw latency, FPS and point counts on top of the plots.
+
+        The profiler is enabled while the overlay is shown (see Profiler, e.g., self.profiler.report() from the console).
+        """
+        self._profilingOverlayAction.setChecked(show)
+        if not show:
+            if self._profilingOverlay is not None:
+                self._profilingTimer.stop()
+                self._profilingOverlay.hide()
+                self.profiler.enabled = False
+            return
+        if self._profilingOverlay is None:
+            self._profilingOverlay = QLabel(self)
+            self._profilingOverlay.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+            self._profilingOverlay.setStyleSheet("background-color: rgb(255, 255, 224); border: 1px solid gray; padding: 2px;")
+            self._profilingOverlay.setAttribute(Qt.WA_TransparentForMouseEvents)
+            self._profilingTimer = QTimer(self)
+            self._profilingTimer.timeout.connect(self._updateProfilingOverlay)
+        self.profiler.enabled = True
+        self._updateProfilingOverlay()
+        self._profilingOverlay.show()
+        self._profilingOverlay.raise_()
+        self._profilingTimer.start(int(1000 / self.profilingOverlayRate))
+    
+    def _updateProfilingOverlay(self):
+        window = 1.0
+        stats = self.profiler.stats(window)
+        visiblePlots = [plot for plot in self.groupPlots() if plot.isVisible()]
+        lines = []
+        redraw = stats.get('_updateGroupPlots')
+        if redraw is not None:
+            lines.append(f"redraw  {redraw['last']:7.1f} ms  (mean {redraw['mean']:.1f}, max {redraw['max']:.1f})")
+        paint = stats.get('paint')
+        if paint is not None:
+            # each visible plot is painted once per frame
+            fps = paint['rate'] / max(1, len(visiblePlots))
+            lines.append(f"paint   {paint['last']:7.1f} ms  {fps:5.1f} fps")
+        for stage in ['seriesIndexes', 'setData', 'setCustomStyle', 'ViewBox.updateViewRange']:
+            if stage in stats:
+                lines.append(f"{stage:<24} {stats[stage]['load']:4.0%} of time")
+        
+        # points drawn (after level of detail) vs. points in the visible series
+        numDrawn = numPoints = numItems = 0
+        for plot in visiblePlots:
+            for plotDataItem in plot.seriesItems.values():
+                if plotDataItem.isVisible():
+                    numItems += 1
+                    numDrawn += np.size(plotDataItem.curve.yData) if plotDataItem.curve.yData is not None else 0
+                    numPoints += np.size(plotDataItem.seriesDict.get('y'))
+        lines.append(f"points  {numDrawn:,} drawn of {numPoints:,} in {numItems} series")
+        
+        self._profilingOverlay.setText("\n".join(lines))
+        self._profilingOverlay.adjustSize()
+        self._positionProfilingOverlay()
+    
+    def _positionProfilingOverlay(self):
+        # top right corner of the plots
+        margin = 8
+        x = self.width() - self._profilingOverlay.width() - margin
+        y = self._toolbar.geometry().bottom() + margin
+        self._profilingOverlay.move(max(0, x), y)
+    
+    def resizeEvent(self, event):
+        QWidget.resizeEvent(self, event)
+        if self._profilingOverlay is not None and self._profilingOverlay.isVisible():
+            self._positionProfilingOverlay()
+    
+    def _makeAction(self, parent, text, func, qta_icon=None) -> QAction:
+        action = QAction(parent)
+        action.setText(text)
+        if qta_icon is not None and qta is not None:
+            icon = qta.icon(qta_icon)
+            action.setIcon(icon)
+        action.triggered.connect(func)
+        return action
+    
+
+class EpisodePrefetchWorker(QObject):
+    """ Loads (e.g., lazy) series data and builds level of detail pyramids for requested episodes, e.g., in a worker thread.
+
+    Requests are taken from a shared deque until it is empty, so pending requests can be dropped by clearing it.
+    """
+
+    sigPrefetched = pyqtSignal(object, object)  # episode, list of (series, rawData, MinMaxPyramid or None)
+    sigFinished = pyqtSignal()
+
+    def __init__(self, requests: collections.deque):
+        QObject.__init__(self)
+        self._requests = requests
+    
+    def run(self):
+        while True:
+            try:
+                episode, items = self._requests.popleft()
+            except IndexError:
+                break
+            results = []
+            for series, rawData, x, y, mask in items:
+                # reads lazy arrays
+                y = np.asarray(y) if mask is None or len(mask) == 0 else maskedValues(x, y, mask)
+                pyramid = MinMaxPyramid(x, y) if np.size(y) >= MinMaxPyramid.minSize else None
+                results.append((series, rawData, pyramid))
+            self.sigPrefetched.emit(episode, results)
+        self.sigFinished.emit()
+
+
+class HEKAImportWorker(QObject):
+    """ Decodes the traces of a HEKA group (experiment) into series dicts, e.g., in a worker thread.
+
+    With more than one process, chunks of sweeps are decoded in a pool of worker processes which hand back the
+    trace arrays in shared memory (see _hekaDecodeTraces). The first sweep and chunk are decoded in this thread
+    while the worker processes start. Decoded chunks are emitted in file order.
+    """
+
+    sigSeriesDecoded = pyqtSignal(object)  # list of series dicts
+    sigProgress = pyqtSignal(int, int)  # number of traces decoded, total number of traces
+    sigError = pyqtSignal(str)  # the import stopped on an error (e.g., a corrupt trace), sigFinished follows
+    sigFinished = pyqtSignal()
+
+    batchInterval = 0.25  # seconds between batches after the first sweep
+    minParallelTraces = 256  # fewer traces are not worth the process startup when the number of processes is not given
+    minParallelFileSize = 64 * 1024 * 1024  # bytes, smaller files are decoded serially when the number of processes is not given
+    chunksPerProcess = 4  # chunks of sweeps per worker process for parallel decoding
+
+    def __init__(self, filepath, hekaGroupIndex=0, processes=None):
+        QObject.__init__(self)
+        self._filepath = filepath
+        self._hekaGroupIndex = hekaGroupIndex
+        self._processes = processes
+        self._isCancelled = False
+    
+    def cancel(self):
+        self._isCancelled = True
+    
+    def run(self):
+        numDecoded = 0
+        numTraces = 0
+        batch = []
+        try:
+            bundle = _optionalImport('heka_reader').Bundle(self._filepath)
+            sweeps = hekaSweepTraceIndexes(bundle, self._hekaGroupIndex)
+            numTraces = sum([len(sweep) for sweep in sweeps])
+            processes = self._processes
+            if processes is None:
+                isWorthIt = numTraces >= self.minParallelTraces and os.path.getsize(self._filepath) >= self.minParallelFileSize
+                processes = (os.cpu_count() or 1) if isWorthIt else 1
+            processes = min(processes, len(sweeps))
+            if processes > 1:
+                chunks = self._decodeParallel(bundle, sweeps, processes)
+            else:
+                chunks = ([hekaTraceSeries(bundle, index) for index in sweep] for sweep in sweeps)
+            lastEmitTime = None
+            try:
+                for chunk in chunks:
+                    if self._isCancelled:
+                        break
+                    batch.extend(chunk)
+                    numDecoded += len(chunk)
+                    # first sweep asap, then batches at most every batchInterval seconds
+                    if batch and (lastEmitTime is None or time.perf_counter() - lastEmitTime >= self.batchInterval):
+                        self.sigSeriesDecoded.emit(batch)
+                        self.sigProgress.emit(numDecoded, numTraces)
+                        batch = []
+                        lastEmitTime = time.perf_counter()
+            finally:
+                # stops any worker processes
+                chunks.close()
+        except Exception as error:
+            # e.g., a corrupt trace or an error in a worker process, reported rather than raised in the worker's thread
+            self.sigError.emit(f'{type(error).__name__}: {error}')
+        finally:
+            # always finish (with what was decoded so far), otherwise the thread would never quit
+            if batch:
+                self.sigSeriesDecoded.emit(batch)
+            self.sigProgress.emit(numDecoded, numTraces)
+            self.sigFinished.emit()
+    
+    def _decodeParallel(self, bundle, sweeps, processes):
+        """ Yield series dicts for chunks of sweeps in file order as they are decoded by a process pool. """
+        chunkSize = max(1, int(np.ceil((len(sweeps) - 1) / (processes * self.chunksPerProcess))))
+        chunks = [sweeps[i:i + chunkSize] for i in range(1, len(sweeps), chunkSize)]
+        chunks = [[index for sweep in chunk for index in sweep] for chunk in chunks]
+        # first sweep on its own so it can be shown asap (starting the pool takes a while)
+        yield [hekaTraceSeries(bundle, index) for index in sweeps[0]]
+        # first chunk is decoded here while the worker processes start
+        localChunks = chunks[:1]
+        chunks = iter(chunks[1:])
+        # spawn rather than fork the GUI process along with its threads
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(processes, mp_context=context, initializer=_hekaProcessInit, initargs=(self._filepath,)) as pool:
+            # bounded number of chunks in flight so that decoded arrays do not pile up in shared memory
+            pending = collections.deque()
+            try:
+                for chunk in itertools.islice(chunks, 2 * processes):
+                    pending.append((chunk, pool.submit(_hekaDecodeTraces, chunk)))
+                for chunk in localChunks:
+                    yield [hekaTraceSeries(bundle, index) for index in chunk]
+                while pending:
+                    chunk, future = pending.popleft()
+                    for nextChunk in itertools.islice(chunks, 1):
+                        pending.append((nextChunk, pool.submit(_hekaDecodeTraces, nextChunk)))
+                    yield self._chunkSeries(bundle, chunk, future.result())
+            finally:
+                # cancelled: free shared memory of chunks that were already decoded
+                for chunk, future in pending:
+                    if not future.cancel():
+                        sharedMemory = shared_memory.SharedMemory(future.result()[0])
+                        sharedMemory.close()
+                        sharedMemory.unlink()
+    
+    @staticmethod
+    def _chunkSeries(bundle, indexes, decoded):
+        sharedMemoryName, dtype, lengths = decoded
+        sharedMemory = shared_memory.SharedMemory(sharedMemoryName)
+        try:
+            buffer = np.ndarray((sum(lengths),), dtype=dtype, buffer=sharedMemory.buf)
+            offsets = np.cumsum([0] + lengths)
+            data = [hekaTraceSeries(bundle, index, buffer[offsets[i]:offsets[i + 1]].copy()) for i, index in enumerate(indexes)]
+            del buffer
+        finally:
+            sharedMemory.close()
+            sharedMemory.unlink()
+        return data
+
+class PlotWidget(pg.PlotWidget):
+    """ pg.PlotWidget with custom view box. """
+
+    def __init__(self,  *args, **kwargs):
+        kwargs['viewBox'] = ViewBox()
+        pg.PlotWidget.__init__(self, *args, **kwargs)
+
+        # colormap (for default line colors)
+        self.colormap = [
+            [0, 113.9850, 188.9550],
+            [216.7500, 82.8750, 24.9900],
+            [236.8950, 176.9700, 31.8750],
+            [125.9700, 46.9200, 141.7800],
+            [118.8300, 171.8700, 47.9400],
+            [76.7550, 189.9750, 237.9150],
+            [161.9250, 19.8900, 46.9200]
+        ]
+        self.colorIndex = 0
+
+        # id(series dict) -> PlotDataItem
+        self.seriesItems = {}
+    
+    def paintEvent(self, event):
+        # rendering the whole plot scene (the view box prepares for painting first)
+        start = QtTimeSeriesAnalyzer.profiler.start()
+        pg.PlotWidget.paintEvent(self, event)
+        QtTimeSeriesAnalyzer.profiler.stop('paint', start)
+
+
+class ViewBox(pg.ViewBox):
+    """ pg.ViewBox with custom context menu for measuring and curve fitting. """
+
+    def __init__(self,  *args, **kwargs):
+        pg.ViewBox.__init__(self, *args, **kwargs)
+
+        self._initContextMenu()
+
+        self._isDrawingROIs = False
+
+        self.sigTransformChanged.connect(self._onViewChanged)
+        self.sigResized.connect(self._onViewChanged)
+    
+    def getPlotItem(self):
+        return self.parentWidget()
+    
+    def updateViewRange(self, *args, **kwargs):
+        # range change, including items updating to the new range (e.g., level of detail)
+        start = QtTimeSeriesAnalyzer.profiler.start()
+        pg.ViewBox.updateViewRange(self, *args, **kwargs)
+        QtTimeSeriesAnalyzer.profiler.stop('ViewBox.updateViewRange', start)
+    
+    def prepareForPaint(self):
+        # auto range and view transform before painting
+        start = QtTimeSeriesAnalyzer.profiler.start()
+        pg.ViewBox.prepareForPaint(self)
+        QtTimeSeriesAnalyzer.profiler.stop('ViewBox.prepareForPaint', start)
+    
+    def getPlotWidget(self):
+        return self.getViewWidget()
+    
+    def mousePressEvent(self, event):
+        if self._isDrawingROIs:
+            if event.button() == Qt.LeftButton:
+                posInAxes = self.mapSceneToView(self.mapToScene(event.pos()))
+                if self._roiOrientation == "vertical":
+                    posAlongAxis = posInAxes.x()
+                elif self._roiOrientation == "horizontal":
+                    posAlongAxis = posInAxes.y()
+                self._roiStartPos = posAlongAxis
+            else:
+                self.stopDrawingROIs()
+            event.accept()
+            return
+        pg.ViewBox.mousePressEvent(self, event)
+    
+    def mouseReleaseEvent(self, event):
+        if self._isDrawingROIs:
+            if event.button() == Qt.LeftButton:
+                self._roi = None
+                event.accept()
+                return
+        pg.ViewBox.mouseReleaseEvent(self, event)
+    
+    def mouseMoveEvent(self, event):
+        if self._isDrawingROIs:
+            if event.buttons() & Qt.LeftButton:
+                posInAxes = self.mapSceneToView(self.mapToScene(event.pos()))
+                if self._roiOrientation == "vertical":
+                    posAlongAxis = posInAxes.x()
+                elif self._roiOrientation == "horizontal":
+                    posAlongAxis = posInAxes.y()
+                limits = sorted([self._roiStartPos, posAlongAxis])
+                if self._roi is None:
+                    self._roi = LinearRegionItem(orientation=self._roiOrientation, values=limits)
+                    self.addItem(self._roi)
+                else:
+                    self._roi.setRegion(limits)
+                event.accept()
+                return
+        pg.ViewBox.mouseMoveEvent(self, event)
+    
+    def _initContextMenu(self):
+        self._roiMenu = QMenu("ROIs")
+        self._roiMenu.addAction("Draw X-Axis ROIs", lambda: self.startDrawingROIs(orientation="vertical"))
+        self._roiMenu.addSection(" ")
+        self._roiMenu.addAction("Hide All", self.hideROIs)
+        self._roiMenu.addAction("Show All", self.showROIs)
+        self._roiMenu.addSection(" ")
+        self._roiMenu.addAction("Delete All", self.deleteROIs)
+        self._roiMenu.addSection(" ")
+        self._roiMenu.addAction("Mask Samples in ROIs", self.maskROIs)
+        self._roiMenu.addAction("Unmask Series", self.unmaskSeries)
+
+        self._measureMenu = QMenu("Measure")
+        self._measureMenu.addAction("Mean", lambda: self.measure(measurementType="mean"))
+        self._measureMenu.addAction("Median", lambda: self.measure(measurementType="median"))
+        self._measureMenu.addAction("Min", lambda: self.measure(measurementType="min"))
+        self._measureMenu.addAction("Max", lambda: self.measure(measurementType="max"))
+        self._measureMenu.addAction("AbsMax", lambda: self.measure(measurementType="absmax"))
+        self._measureMenu.addAction("Variance", lambda: self.measure(measurementType="var"))
+        self._measureMenu.addAction("Standard Deviation", lambda: self.measure(measurementType="std"))
+
+        self._curveFitMenu = QMenu("Curve Fit")
+        self._curveFitMenu.addAction("Mean", lambda: self.curveFit(fitType="mean"))
+        self._curveFitMenu.addAction("Line", lambda: self.curveFit(fitType="line"))
+        self._curveFitMenu.addAction("Polynomial", lambda: self.curveFit(fitType="polynomial"))
+        self._curveFitMenu.addAction("Spline", lambda: self.curveFit(fitType="spline"))
+        self._curveFitMenu.addAction("Custom", lambda method="custom": self.curveFit(fitType=method))
+
+        self._transformMenu = QMenu("Transform")
+        self._transformMenu.addAction("Baseline Zero", lambda: self.deriveSeries(transform="baseline"))
+        self._transformMenu.addAction("Scale", lambda: self.deriveSeries(transform="scale"))
+        self._transformMenu.addAction("Filter", lambda: self.deriveSeries(transform="filter"))
+        self._transformMenu.addAction("Interpolate ROIs", lambda: self.deriveSeries(transform="interpolate"))
+
+        # append to default context menu
+        self.menu.addSection(" ")
+        self.menu.addMenu(self._roiMenu)
+        self.menu.addSection(" ")
+        self.menu.addMenu(self._measureMenu)
+        self.menu.addMenu(self._curveFitMenu)
+        self.menu.addMenu(self._transformMenu)
+        self.menu.addSection(" ")
+    
+    def _onViewChanged(self):
+        # ROI labels are disabled for now (see LinearRegionItem)
+        pass
+        # for item in self.allChildren():
+        #     if isinstance(item, LinearRegionItem):
+        #         # reposition ROI label
+        #         item.updateLabelPos()
+    
+    def startDrawingROIs(self, orientation="vertical"):
+        self._isDrawingROIs = True
+        self._roiOrientation = orientation
+        self._roi = None
+
+    def stopDrawingROIs(self):
+        self._isDrawingROIs = False
+        self._roi = None
+    
+    def hideROIs(self):
+        for item in self.allChildren():
+            if isinstance(item, LinearRegionItem):
+                item.setVisible(False)
+    
+    def showROIs(self):
+        for item in self.allChildren():
+            if isinstance(item, LinearRegionItem):
+                item.setVisible(True)
+    
+    def deleteROIs(self):
+        for item in self.allChildren():
+            if isinstance(item, LinearRegionItem):
+                self.removeItem(item)
+                item.deleteLater()
+    
+    def seriesList(self) -> list:
+        """ Series dicts drawn in the plot. """
+        plot = self.getPlotWidget()
+        return [item.seriesDict for item in plot.seriesItems.values() if item.seriesDict is not None]
+    
+    def regions(self) -> list:
+        """ Sorted (xmin, xmax) of visible x-axis ROIs. """
+        return sorted([tuple(item.getRegion()) for item in self.allChildren() 
+            if isinstance(item, LinearRegionItem) and item.orientation == 'vertical' and item.isVisible()])
+    
+    def measure(self, measurementType="mean"):
+        """
+        Measure all series in the plot within each x-axis ROI (or over the entire series if there are no ROIs).
+
+        The measurements for each series are added as a new series of points (one per ROI)
+        with the same episode and group and the measurement type appended to the name.
+        """
+        plot = self.getPlotWidget()
+        tsa = plot.parentWidget()
+        seriesList = self.seriesList()
+        if not seriesList:
+            return
+        regions = self.regions()
+        if not regions:
+            regions = [(-np.inf, np.inf)]
+        xs = [tsa.seriesAttr('x', series) for series in seriesList]
+        ys = [tsa.seriesAttr('y', series) for series in seriesList]
+        masks = [tsa.seriesAttr('mask', series) for series in seriesList]
+        mx, my = measureRegions(xs, ys, regions, measurementType, masks)
+        measurements = []
+        for i, series in enumerate(seriesList):
+            name = tsa.seriesAttr('name', series)
+            measurements.append({
+                'x': mx[i], 
+                'y': my[i], 
+                'xlabel': tsa.seriesAttr('xlabel', series), 
+                'ylabel': tsa.seriesAttr('ylabel', series), 
+                'episode': tsa.seriesAttr('episode', series), 
+                'group': tsa.seriesAttr('group', series), 
+                'name': measurementType if not name else name + ' ' + measurementType, 
+                'style': {'linestyle': 'none', 'marker': 'o'}
+                })
+        tsa.addSeriesBatch(measurements)
+    
+    def maskROIs(self):
+        """ Mask the samples within the x-axis ROIs in all series in the plot (see TimeSeriesAnalyzer.maskSeries). """
+        regions = self.regions()
+        seriesList = self.seriesList()
+        if regions and seriesList:
+            self.getPlotWidget().parentWidget().maskSeries(regions, seriesList)
+    
+    def unmaskSeries(self):
+        seriesList = self.seriesList()
+        if seriesList:
+            self.getPlotWidget().parentWidget().unmaskSeries(seriesList)
+    
+    def deriveSeries(self, transform="baseline"):
+        """
+        Lazily derived series (see TimeSeriesAnalyzer.deriveSeries) of all series in the plot.
+
+        Baseline zero uses the x-axis ROIs (or the entire series if there are no ROIs), interpolate applies within the ROIs.
+        """
+        plot = self.getPlotWidget()
+        tsa = plot.parentWidget()
+        seriesList = self.seriesList()
+        if not seriesList:
+            return
+        params = {}
+        if transform in ["baseline", "interpolate", "mask"]:
+            params['regions'] = self.regions()
+            if not params['regions'] and transform != "baseline":
+                return
+        elif transform == "scale":
+            factor, ok = QInputDialog.getDouble(None, "Scale", "Factor", 1, -1e12, 1e12, 6)
+            if not ok:
+                return
+            params['factor'] = factor
+        elif transform == "filter":
+            text, ok = QInputDialog.getText(None, "Filter", "Filters (e.g., lowpass 1000, notch 60 q=30, highpass 1 order=2):", text=tsa._filtersText)
+            if not ok or not text.strip():
+                return
+            try:
+                params['filters'] = parseFilters(text)
+            except ValueError as error:
+                QMessageBox.warning(None, "Filter", str(error))
+                return
+            tsa._filtersText = text
+        tsa.deriveSeries(transform, seriesList, **params)
+    
+    def curveFit(self, fitType="mean"):
+        """
+        Fit all series in the plot within the x-axis ROIs (or the entire series if there are no ROIs) in one batch.
+
+        fitType: mean, line, polynomial, spline or custom (lmfit expression).
+        The fits are added as new series spanning the ROIs with the same episode and group and ' fit' appended to the name.
+        Fit parameters are stored in the 'fitParams' attribute of each fit series.
+        """
+        plot = self.getPlotWidget()
+        tsa = plot.parentWidget()
+        seriesList = self.seriesList()
+        if not seriesList:
+            return
+        regions = self.regions()
+        if not regions:
+            regions = [(-np.inf, np.inf)]
+        xs = [tsa.seriesAttr('x', series) for series in seriesList]
+        ys = [tsa.seriesAttr('y', series) for series in seriesList]
+        masks = [tsa.seriesAttr('mask', series) for series in seriesList]
+
+        params = [None] * len(seriesList)
+        if fitType in ["mean", "line", "polynomial"]:
+            if fitType == "mean":
+                degree = 0
+            elif fitType == "line":
+                degree = 1
+            else:
+                degree, ok = QInputDialog.getInt(None, "Polynomial Fit", "Degree", 2, 0, 20)
+                if not ok:
+                    return
+            fits = polyfitRegions(xs, ys, regions, degree, masks)
+            params = [None if fit is None else {f'c{k}': float(c) for k, c in enumerate(fit.convert().coef)} for fit in fits]
+        elif fitType == "spline":
+            numKnots, ok = QInputDialog.getInt(None, "Spline Fit", "Interior Knots", 8, 1, 1000)
+            if not ok:
+                return
+            fits = splinefitRegions(xs, ys, regions, numKnots, masks)
+        elif fitType == "custom":
+            lmfit = _optionalImport('lmfit')
+            if lmfit is None:
+                QMessageBox.warning(None, "Curve Fit", "Custom curve fits require lmfit.")
+                return
+            dlg = QDialog()
+            dlg.setWindowTitle("Custom Fit")
+            form = QFormLayout(dlg)
+            expressionEdit = QLineEdit("a * exp(-x / tau) + b")
+            initialValuesEdit = QLineEdit("a=1, tau=1, b=0")
+            form.addRow('Equation', expressionEdit)
+            form.addRow('Initial Values', initialValuesEdit)
+            btns = QDialogButtonBox()
+            btns.setStandardButtons(QDialogButtonBox.Cancel | QDialogButtonBox.Ok)
+            btns.accepted.connect(dlg.accept)
+            btns.rejected.connect(dlg.reject)
+            form.addRow(btns)
+            dlg.setWindowModality(Qt.ApplicationModal)
+            if dlg.exec_() != QDialog.Accepted:
+                return
+            expression = expressionEdit.text()
+            initialValues = {}
+            for item in initialValuesEdit.text().split(','):
+                if '=' in item:
+                    name, value = item.split('=')
+                    initialValues[name.strip()] = float(value)
+            params = lmfitRegions(xs, ys, regions, expression, initialValues, masks=masks)
+            model = lmfit.models.ExpressionModel(expression)
+            fits = [None if values is None else lambda x, values=values: model.eval(x=x, **values) for values in params]
+        else:
+            raise ValueError(f'Unknown fit type: {fitType}')
+        
+        fitSeriesList = []
+        for series, x, fit, fitParams in zip(seriesList, xs, fits, params):
+            if fit is None:
+                continue
+            # fit spans the ROIs
+            start = np.searchsorted(x, min([region[0] for region in regions]), 'left')
+            stop = np.searchsorted(x, max([region[1] for region in regions]), 'right')
+            x = x[start:stop] if isinstance(x, UniformAxis) else np.array(x[start:stop])
+            name = tsa.seriesAttr('name', series)
+            fitSeries = {
+                'x': x, 
+                'y': np.asarray(fit(np.asarray(x, dtype=float)), dtype=float), 
+                'xlabel': tsa.seriesAttr('xlabel', series), 
+                'ylabel': tsa.seriesAttr('ylabel', series), 
+                'episode': tsa.seriesAttr('episode', series), 
+                'group': tsa.seriesAttr('group', series), 
+                'name': 'fit' if not name else name + ' fit', 
+                'style': {'linestyle': '--'}
+                }
+            if fitParams is not None:
+                fitSeries['fitParams'] = fitParams
+            fitSeriesList.append(fitSeries)
+        tsa.addSeriesBatch(fitSeriesList)
+
+
+class StyleCache:
+    """
+    Resolved plot styles keyed on the content of style dicts, with interned pens and brushes.
+
+    Plot data items with the same style share the same resolved options and QPen/QBrush objects,
+    so restyling many series only resolves each distinct style once. hits and misses count lookups.
+    """
+
+    maxSize = 4096  # resolved styles (cleared when exceeded)
+
+    def __init__(self):
+        self._styles = {}
+        self._pens = {}
+        self._brushes = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def styleKey(style: dict):
+        # content of style dict (values may not be hashable, e.g., lists)
+        return tuple(sorted([(key, repr(value)) for key, value in style.items()]))
+
+    def lookup(self, key, resolve):
+        """ Resolved style for key, calling resolve() if not already cached. """
+        resolved = self._styles.get(key)
+        if resolved is not None:
+            self.hits += 1
+            return resolved
+        self.misses += 1
+        if len(self._styles) >= self.maxSize:
+            self._styles.clear()
+        resolved = resolve()
+        self._styles[key] = resolved
+        return resolved
+
+    def pen(self, color, width=1, style=Qt.SolidLine) -> QPen:
+        """ Shared pen (None for no pen). """
+        key = (tuple(color), width, style) if color is not None else None
+        pen = self._pens.get(key)
+        if pen is None:
+            pen = pg.mkPen(color=color, width=width, style=style) if color is not None else pg.mkPen(None)
+            self._pens[key] = pen
+        return pen
+
+    def brush(self, color) -> QBrush:
+        key = tuple(color)
+        brush = self._brushes.get(key)
+        if brush is None:
+            brush = pg.mkBrush(color)
+            self._brushes[key] = brush
+        return brush
+
+    def clear(self):
+        self._styles.clear()
+        self._pens.clear()
+        self._brushes.clear()
+
+    def stats(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses, 'styles': len(self._styles), 'pens': len(self._pens), 'brushes': len(self._brushes)}
+
+
+class PlotDataItem(pg.PlotDataItem):
+    """ Clickable pg.PlotDataItem with context menu. """
+
+    # resolved styles shared by all plot data items
+    styleCache = StyleCache()
+
+    def __init__(self, *args, **kwargs):
+        # min/max level of detail for long series
+        self._pyramid = None
+        self._lodKey = None
+
+        pg.PlotDataItem.__init__(self, *args, **kwargs)
+
+        self.seriesDict = None
+
+        # what is currently drawn, so unchanged series are not redrawn
+        self.plottedData = None
+        self.styleState = None
+        self.textItems = []
+
+        self.menu = None
+    
+    def _delete(self):
+        try:
+            tsa = self.getViewBox().getPlotWidget().parentWidget()
+        except:
+            tsa = None
+        if (tsa is not None) and (self.seriesDict is not None):
+            for i, series in enumerate(tsa.data):
+                if series is self.seriesDict:
+                    # delete the series, the plot will be updated accordingly
+                    del tsa.data[i]
+                    tsa.updateUI()
+                    return
+        for textItem in self.textItems:
+            self.getViewBox().removeItem(textItem)
+            textItem.deleteLater()
+        self.getViewBox().removeItem(self)
+        self.deleteLater()
+
+    def setData(self, *args, **kwargs):
+        """
+        Same as pg.PlotDataItem.setData, except that long (x, y) series are drawn from a min/max level of detail pyramid.
+
+        Optionally pass a prebuilt (e.g., cached) MinMaxPyramid for x, y via the pyramid keyword.
+        """
+        start = QtTimeSeriesAnalyzer.profiler.start()
+        pyramid = kwargs.pop('pyramid', None)
+        if pyramid is None and len(args) == 2 and np.size(args[1]) >= MinMaxPyramid.minSize:
+            pyramid = MinMaxPyramid(*args)
+        if pyramid is None or pyramid.numLevels < 2:
+            self._pyramid = None
+            if len(args) == 2:
+                # e.g., read lazy arrays or materialize a uniform axis
+                args = [np.asarray(arg) for arg in args]
+            pg.PlotDataItem.setData(self, *args, **kwargs)
+        else:
+            self._pyramid = pyramid
+            self._lodKey = None
+            self._updateLevelOfDetail(**kwargs)
+        QtTimeSeriesAnalyzer.profiler.stop('setData', start)
+    
+    def _updateLevelOfDetail(self, **kwargs):
+        viewBox = self.getViewBox()
+        if viewBox is None or viewBox.width() < 2:
+            xmin, xmax = self._pyramid.bounds(0)
+            width = 1000
+        else:
+            xmin, xmax = viewBox.viewRange()[0]
+            width = viewBox.width()
+        x, y, key = self._pyramid.decimate(xmin, xmax, width)
+        if key == self._lodKey and not kwargs:
+            return
+        self._lodKey = key
+        pg.PlotDataItem.setData(self, x, y, **kwargs)
+    
+    def viewRangeChanged(self, *args, **kwargs):
+        if self._pyramid is not None:
+            self._updateLevelOfDetail()
+        pg.PlotDataItem.viewRangeChanged(self, *args, **kwargs)
+    
+    def dataBounds(self, ax, frac=1.0, orthoRange=None):
+        if self._pyramid is not None:
+            # bounds of all of the data, not just the drawn level of detail
+            return self._pyramid.bounds(ax, orthoRange)
+        return pg.PlotDataItem.dataBounds(self, ax, frac, orthoRange)
+    
+    def shape(self):
+        return self.curve.shape()
+
+    def boundingRect(self):
+        return self.shape().boundingRect()
+    
+    def setName(self, name):
+        self.opts['name'] = name
+    
+    def setCustomStyle(self, style: dict, colorIndex=0):
+        """ Apply style dict (see QtTimeSeriesAnalyzer.styleAttr) and return the next default color index. """
+        start = QtTimeSeriesAnalyzer.profiler.start()
+        colormap = self.getViewBox().getPlotWidget().colormap
+        key = (StyleCache.styleKey(style), colorIndex % len(colormap), tuple([tuple(color) for color in colormap]))
+        opts, colorIndexIncrement = self.styleCache.lookup(key, lambda: self._resolveStyle(style, colorIndex))
+        if any([self.opts[name] is not value for name, value in opts.items()]):
+            # one update for all style options
+            self.opts.update(opts)
+            self.updateItems(styleUpdate=True)
+        QtTimeSeriesAnalyzer.profiler.stop('setCustomStyle', start)
+        return colorIndex + colorIndexIncrement
+    
+    def _resolveStyle(self, style: dict, colorIndex=0):
+        """ Return pg.PlotDataItem style options for style dict and whether the default color at colorIndex was used. """
+        plot = self.getViewBox().getPlotWidget()
+        tsa = plot.parentWidget()
+        cache = self.styleCache
+        colorIndexIncrement = 0
+
+        # color
+        color = tsa.styleAttr(style, 'color')
+        if color is not None:
+            color = str2color(color)
+        if color is None or (len(color) == 4 and color[3] == 0):
+            colormap = plot.colormap
+            color = colormap[colorIndex % len(colormap)]
+            color = [int(c) for c in color]
+            if len(color) == 3:
+                color.append(255)
+            color = tuple(color)
+            colorIndexIncrement = 1
+
+        # line
+        lineStyle = tsa.styleAttr(style, 'linestyle')
+        if not isinstance(lineStyle, int):
+            lineStyles = {
+                '-': Qt.SolidLine, '--': Qt.DashLine, ':': Qt.DotLine, '-.': Qt.DashDotLine, 
+                'none': None, '': None, None: Qt.SolidLine
+            }
+            lineStyle = lineStyles[lineStyle]
+
+        lineWidth = tsa.styleAttr(style, 'linewidth')
+        if lineWidth is None:
+            lineWidth = 2
+        else:
+            lineWidth = float(lineWidth)
+        
+        if lineStyle is None:
+            linePen = cache.pen(None)
+        else:
+            linePen = cache.pen(color, lineWidth, lineStyle)
+
+        # symbol
+        symbol = tsa.styleAttr(style, 'marker')
+        
+        symbolSize = tsa.styleAttr(style, 'markersize')
+        if symbolSize is None:
+            symbolSize = 10
+        else:
+            symbolSize = float(symbolSize)
+
+        symbolEdgeWidth = tsa.styleAttr(style, 'markeredgewidth')
+        if symbolEdgeWidth is None:
+            symbolEdgeWidth = lineWidth
+        else:
+            symbolEdgeWidth = float(symbolEdgeWidth)
+        
+        symbolEdgeColor = tsa.styleAttr(style, 'markeredgecolor')
+        if symbolEdgeColor is None:
+            symbolEdgeColor = color
+        else:
+            symbolEdgeColor = str2color(symbolEdgeColor)
+        
+        symbolPen = cache.pen(symbolEdgeColor, symbolEdgeWidth)
+
+        symbolFaceColor = tsa.styleAttr(style, 'markerfacecolor')
+        if symbolFaceColor is None:
+            symbolFaceColor = symbolEdgeColor[:3] + (0,)
+        else:
+            symbolFaceColor = str2color(symbolFaceColor)
+        symbolBrush = cache.brush(symbolFaceColor)
+        
+        opts = {'pen': linePen, 'symbol': symbol, 'symbolSize': symbolSize, 'symbolPen': symbolPen, 'symbolBrush': symbolBrush}
+        return opts, colorIndexIncrement
+    
+    def mouseClickEvent(self, event):
+        if event.button() == Qt.RightButton:
+            if self.curve.mouseShape().contains(event.pos()):
+                if self.raiseContextMenu(event):
+                    self._lastClickPos = self.mapToView(event.pos())
+                    event.accept()
+    
+    def raiseContextMenu(self, event):
+        menu = self.getContextMenus()
+        
+        # Let the scene add on to the end of our context menu (this is optional)
+        menu = self.scene().addParentContextMenus(self, menu, event)
+        
+        pos = event.screenPos()
+        menu.popup(QPoint(int(pos.x()), int(pos.y())))
+        return True
+    
+    def getContextMenus(self, event=None):
+        name = self.name()
+        if name is None:
+            name = "Data Series"
+        self._dataMenu = QMenu(name)
+        self._dataMenu.addAction("Rename", self.editNameDialog)
+        self._dataMenu.addAction("Edit Style", self.editStyleDialog)
+        self._dataMenu.addSection(" ")
+        self._dataMenu.addAction("Add Label", self.addTextItem)
+        self._dataMenu.addSection(" ")
+        self._dataMenu.addAction("Delete", self._delete)
+
+        self.menu = QMenu()
+        self.menu.addMenu(self._dataMenu)
+        self.menu.addSection(" ")
+        return self.menu
+    
+    def editNameDialog(self):
+        name = self.name()
+        if name is None:
+            name = ''
+        name, ok = QInputDialog.getText(self.getViewBox().getPlotWidget(), "Series Name", "Name:", text=name)
+        if not ok:
+            return
+        name = name.strip()
+        if name == '':
+            name = None
+
+        # update this widget
+        self.setName(name)
+
+        # update series dict
+        if self.seriesDict is not None:
+            tsa = self.getViewBox().getPlotWidget().parentWidget()
+            tsa.setSeriesAttr('name', name, self.seriesDict)
+    
+    def editStyleDialog(self):
+        try:
+            tsa = self.getViewBox().getPlotWidget().parentWidget()
+        except:
+            tsa = None
+        if (tsa is not None) and (self.seriesDict is not None):
+            style = tsa.seriesAttr('style', self.seriesDict)
+            if style is None:
+                style = {}
+        else:
+            style = None
+        
+        dlg = QDialog()
+        form = QFormLayout(dlg)
+
+        # QPen, QBrush
+        pen = pg.mkPen(self.opts['pen'])
+        symbolPen = pg.mkPen(self.opts['symbolPen'])
+        symbolBrush = pg.mkBrush(self.opts['symbolBrush'])
+
+        # Qt.PenStyle.NoPen = 0
+        # Qt.PenStyle.SolidLine = 1
+        # Qt.PenStyle.DashLine = 2
+        # Qt.PenStyle.DotLine = 3
+        # Qt.PenStyle.DashDotLine = 4
+        lineStyleComboBox = QComboBox()
+        lineStyleComboBox.addItems(['No Line', 'Solid Line', 'Dash Line', 'Dot Line', 'Dash Dot Line'])
+        lineStyleComboBox.setCurrentIndex(pen.style())  # Set via a Qt.PenStyle enum value.
+        form.addRow('Line Style', lineStyleComboBox)
+
+        lineWidthSpinBox = QDoubleSpinBox()
+        lineWidthSpinBox.setMinimum(0)
+        lineWidthSpinBox.setValue(pen.widthF())
+        form.addRow('Line Width', lineWidthSpinBox)
+
+        if style is not None:
+            color = tsa.styleAttr(style, 'color')
+            if color is None:
+                color = QColor('transparent')
+            else:
+                color = QColor(*color)
+        else:
+            color = pen.color()
+        colorButton = ColorButton(color)
+        defaultColorButton = QPushButton('Default')
+        defaultColorButton.setToolTip('Use current color in colormap')
+        defaultColorButton.clicked.connect(lambda: colorButton.setColor(QColor('transparent')))
+        colorLayout = QHBoxLayout()
+        colorLayout.setContentsMargins(0, 0, 0, 0)
+        colorLayout.setSpacing(5)
+        colorLayout.addWidget(colorButton)
+        colorLayout.addWidget(defaultColorButton)
+        form.addRow('Color', colorLayout)
+
+        markerComboBox = QComboBox()
+        markers = [None, 'o', 't', 't1', 't2', 't3', 's', 'p', 'h', 'star', '+', 'd', 'x']
+        markerComboBox.addItems([
+            'None', 'Circle', 'Triangle Down', 'Triangle Up', 'Triangle Right', 'Triangle Left', 'Square', 
+            'Pentagon', 'Hexagon', 'Star', 'Plus', 'Prism', 'Cross'])
+        markerComboBox.setCurrentIndex(markers.index(self.opts['symbol']))
+        form.addRow('Marker', markerComboBox)
+
+        markerSizeSpinBox = QDoubleSpinBox()
+        markerSizeSpinBox.setMinimum(0)
+        markerSizeSpinBox.setValue(self.opts['symbolSize'])
+        form.addRow('Marker Size', markerSizeSpinBox)
+
+        markerEdgeWidthSpinBox = QDoubleSpinBox()
+        markerEdgeWidthSpinBox.setMinimum(0)
+        markerEdgeWidthSpinBox.setValue(symbolPen.widthF())
+        form.addRow('Marker Edge Width', markerEdgeWidthSpinBox)
+
+        if style is not None:
+            markerEdgeColor = tsa.styleAttr(style, 'markeredgecolor')
+            if markerEdgeColor is None:
+                markerEdgeColor = QColor('transparent')
+            else:
+                markerEdgeColor = QColor(*markerEdgeColor)
+        else:
+            markerEdgeColor = symbolPen.color()
+        markerEdgeColorButton = ColorButton(markerEdgeColor)
+        defaultMarkerEdgeColorButton = QPushButton('Default')
+        defaultMarkerEdgeColorButton.setToolTip('Same as color')
+        defaultMarkerEdgeColorButton.clicked.connect(lambda: markerEdgeColorButton.setColor(QColor('transparent')))
+        markerEdgeColorLayout = QHBoxLayout()
+        markerEdgeColorLayout.setContentsMargins(0, 0, 0, 0)
+        markerEdgeColorLayout.setSpacing(5)
+        markerEdgeColorLayout.addWidget(markerEdgeColorButton)
+        markerEdgeColorLayout.addWidget(defaultMarkerEdgeColorButton)
+        form.addRow('Marker Edge Color', markerEdgeColorLayout)
+
+        if style is not None:
+            markerFaceColor = tsa.styleAttr(style, 'markerfacecolor')
+            if markerFaceColor is None:
+                markerFaceColor = QColor('transparent')
+            else:
+                markerFaceColor = QColor(*markerFaceColor)
+        else:
+            markerFaceColor = symbolBrush.color()
+        markerFaceColorButton = ColorButton(markerFaceColor)
+        defaultMarkerFaceColorButton = QPushButton('Default')
+        defaultMarkerFaceColorButton.setToolTip('Transparent')
+        defaultMarkerFaceColorButton.clicked.connect(lambda: markerFaceColorButton.setColor(QColor('transparent')))
+        markerFaceColorLayout = QHBoxLayout()
+        markerFaceColorLayout.setContentsMargins(0, 0, 0, 0)
+        markerFaceColorLayout.setSpacing(5)
+        markerFaceColorLayout.addWidget(markerFaceColorButton)
+        markerFaceColorLayout.addWidget(defaultMarkerFaceColorButton)
+        form.addRow('Marker Edge Color', markerFaceColorLayout)
+
+        btns = QDialogButtonBox()
+        btns.setStandardButtons(QDialogButtonBox.Cancel | QDialogButtonBox.Ok)
+        btns.accepted.connect(dlg.accept)
+        btns.rejected.connect(dlg.reject)
+        form.addRow(btns)
+
+        dlg.setWindowModality(Qt.ApplicationModal)
+        if dlg.exec_() != QDialog.Accepted:
+            return
+        
+        # apply style
+        linestyle = lineStyleComboBox.currentIndex()
+        lineWidth = lineWidthSpinBox.value()
+        color = colorButton.color()
+        if color == QColor('transparent'):
+            color = None
+        marker = markers[markerComboBox.currentIndex()]
+        markerSize = markerSizeSpinBox.value()
+        markerEdgeWidth = markerEdgeWidthSpinBox.value()
+        markerEdgeColor = markerEdgeColorButton.color()
+        if markerEdgeColor == QColor('transparent'):
+            markerEdgeColor = None
+        markerFaceColor = markerFaceColorButton.color()
+        if markerFaceColor == QColor('transparent'):
+            markerFaceColor = None
+
+        pen.setStyle(linestyle)
+        pen.setWidthF(lineWidth)
+        if color is not None:
+            pen.setColor(color)
+        self.setPen(pen)
+
+        self.setSymbol(marker)
+        self.setSymbolSize(markerSize)
+
+        symbolPen.setWidthF(markerEdgeWidth)
+        if markerEdgeColor is not None:
+            symbolPen.setColor(markerEdgeColor)
+        else:
+            symbolPen.setColor(pen.color())
+        self.setSymbolPen(symbolPen)
+
+        if markerFaceColor is not None:
+            symbolBrush.setColor(markerFaceColor)
+        else:
+            r = symbolPen.color().red()
+            g = symbolPen.color().green()
+            b = symbolPen.color().blue()
+            symbolBrush.setColor(QColor(r, g, b, 0))
+        self.setSymbolBrush(symbolBrush)
+
+        # update style dict
+        if style is None:
+            return
+
+        lineStyles = ['none', '-', '--', ':', '-.']
+        tsa.setStyleAttr(style, 'linestyle', lineStyles[linestyle])
+        tsa.setStyleAttr(style, 'linewidth', lineWidth)
+        if colorButton.colorWasPicked():
+            if color:
+                color = color.red(), color.green(), color.blue(), color.alpha()
+            tsa.setStyleAttr(style, 'color', color)
+        tsa.setStyleAttr(style, 'marker', marker)
+        tsa.setStyleAttr(style, 'markersize', markerSize)
+        tsa.setStyleAttr(style, 'markeredgewidth', markerEdgeWidth)
+        if markerEdgeColorButton.colorWasPicked():
+            if markerEdgeColor:
+                markerEdgeColor = markerEdgeColor.red(), markerEdgeColor.green(), markerEdgeColor.blue(), markerEdgeColor.alpha()
+            tsa.setStyleAttr(style, 'markeredgecolor', markerEdgeColor)
+        if markerFaceColorButton.colorWasPicked():
+            if markerFaceColor:
+                markerFaceColor = markerFaceColor.red(), markerFaceColor.green(), markerFaceColor.blue(), markerFaceColor.alpha()
+            tsa.setStyleAttr(style, 'markerfacecolor', markerFaceColor)
+        tsa.setSeriesAttr('style', style, self.seriesDict)
+    
+    def addTextItem(self):
+        if self.seriesDict is None:
+            return
+        textItem = TextItem()
+        self.getViewBox().addItem(textItem)
+        textItem.seriesDict = self.seriesDict
+        textItem.dataItem = self
+        self.textItems.append(textItem)
+        x = self._lastClickPos.x()
+        y = self._lastClickPos.y()
+        labelDict = {'x': x, 'y': y, 'text': ''}
+        if 'labels' not in self.seriesDict:
+            self.seriesDict['labels'] = [labelDict]
+        else:
+            self.seriesDict['labels'].append(labelDict)
+        textItem.setLabelDict(labelDict)
+        textItem.editDialog()
+        print(self.seriesDict)
+
+
+class LinearRegionItem(pg.LinearRegionItem):
+    """ pg.LinearRegionItem with optional label in upper left corner and context menu for editing. """
+
+    def __init__(self, *args, **kwargs):
+        pg.LinearRegionItem.__init__(self, *args, **kwargs)
+
+        # self._labelItem = None
+        self.menu = None
+
+        # self.sigRegionChanged.connect(self._onRegionChanged)
+    
+    def _delete(self):
+        # self.removeLabel()
+        self.getViewBox().removeItem(self)
+        self.deleteLater()
+    
+    def _setVisible(self, isVisible: bool):
+        self.setVisible(isVisible)
+        # if self._labelItem:
+        #     self._labelItem.setVisible(isVisible)
+    
+    # def _onRegionChanged(self):
+    #     self.updateLabelPos()
+    
+    def mouseClickEvent(self, event):
+        if event.button() == Qt.RightButton:
+            if self.boundingRect().contains(event.pos()):
+                if self.raiseContextMenu(event):
+                    event.accept()
+    
+    def raiseContextMenu(self, event):
+        menu = self.getContextMenus()
+        
+        # Let the scene add on to the end of our context menu (this is optional)
+        menu = self.scene().addParentContextMenus(self, menu, event)
+        
+        pos = event.screenPos()
+        menu.popup(QPoint(int(pos.x()), int(pos.y())))
+        return True
+    
+    def getContextMenus(self, event=None):
+        self._roiMenu = QMenu("ROI")
+        self._roiMenu.addAction("Set Limits", self.editDialog)
+        self._roiMenu.addSection(" ")
+        self._roiMenu.addAction("Hide", lambda: self._setVisible(False))
+        self._roiMenu.addSection(" ")
+        self._roiMenu.addAction("Delete", self._delete)
+
+        self.menu = QMenu()
+        self.menu.addMenu(self._roiMenu)
+        self.menu.addSection(" ")
+        return self.menu
+    
+    # def labelText(self):
+    #     try:
+    #         return self._labelItem.text
+    #     except:
+    #         return ''
+    
+    # def setLabelText(self, text):
+    #     if text == '':
+    #         self.removeLabel()
+    #         return
+    #     if self._labelItem is None:
+    #         self._labelItem = pg.LabelItem(text=text, size="8pt", color=(0,0,0,128))
+    #         self._labelItem.setParentItem(self.getViewBox())
+    #         self.updateLabelPos()
+    #     else:
+    #         self._labelItem.setText(text)
+    
+    # def removeLabel(self):
+    #     if self._labelItem is not None:
+    #         self.getViewBox().removeItem(self._labelItem)
+    #         self._labelItem = None
+    
+    # def updateLabelPos(self):
+    #     """ place label in upper left of visible portion of region """
+    #     if self._labelItem is None:
+    #         return
+    #     viewBox = self.getViewBox()
+    #     if self.orientation == 'vertical':
+    #         xViewMin, xViewMax = viewBox.viewRange()[0]
+    #         xRegionMin, xRegionMax = self.getRegion()
+    #         if xRegionMin >= xViewMax or xRegionMax <= xViewMin:
+    #             # hide the label if the region is not visible
+    #             self._labelItem.setVisible(False)
+    #             return
+    #         xFraction = (max(xRegionMin, xViewMin) - xViewMin) / (xViewMax - xViewMin)
+    #         # itemPos=(0,0) => anchor top left of label
+    #         # parentPos=(x,0) => place label anchor at top left of portion of region in view
+    #         # offset=(2,2) => offset label 2 pixels right and 2 pixels down
+    #         self._labelItem.anchor(itemPos=(0,0), parentPos=(xFraction,0), offset=(2,2))
+    #         self._labelItem.setVisible(True)
+    #     elif self.orientation == 'horizontal':
+    #         yViewMin, yViewMax = viewBox.viewRange()[1]
+    #         yRegionMin, yRegionMax = self.getRegion()
+    #         if yRegionMin >= yViewMax or yRegionMax <= yViewMin:
+    #             # hide the label if the region is not visible
+    #             self._labelItem.setVisible(False)
+    #             return
+    #         yFraction = (yViewMax - min(yRegionMax, yViewMax)) / (yViewMax - yViewMin)
+    #         # itemPos=(0,0) => anchor top left of label
+    #         # parentPos=(0,y) => place label anchor at top left of portion of region in view
+    #         # offset=(2,2) => offset label 2 pixels right and 2 pixels down
+    #         self._labelItem.anchor(itemPos=(0,0), parentPos=(0,yFraction), offset=(2,2))
+    #         self._labelItem.setVisible(True)
+    
+    def editDialog(self):
+        dlg = QDialog()
+        form = QFormLayout(dlg)
+
+        limits = self.getRegion()
+        form.addRow('Limits', QLineEdit(str(limits[0])+", "+str(limits[1])))
+        # form.addRow('Label', QLineEdit(self.labelText()))
+
+        btns = QDialogButtonBox()
+        btns.setStandardButtons(QDialogButtonBox.Cancel | QDialogButtonBox.Ok)
+        btns.accepted.connect(dlg.accept)
+        btns.rejected.connect(dlg.reject)
+        form.addRow(btns)
+
+        dlg.setWindowModality(Qt.ApplicationModal)
+        if dlg.exec_() == QDialog.Accepted:
+            limits = [float(value) for value in form.itemAt(0, 1).widget().text().split(',')]
+            self.setRegion(sorted(limits))
+            # text = form.itemAt(1, 1).widget().text()
+            # self.setLabelText(text)
+
+
+class TextItem(pg.TextItem):
+    """ Draggable pg.TextItem with context menu for editing text, color, etc. """
+
+    def __init__(self, *args, **kwargs):
+        pg.TextItem.__init__(self, *args, **kwargs)
+
+        self.seriesDict = None
+        self.labelDict = None
+
+        # PlotDataItem this label belongs to and the label dict contents it currently shows
+        self.dataItem = None
+        self.labelState = None
+        
+        self.menu = None
+
+        self.setColor((0,0,0,255))
+    
+    def _delete(self):
+        if self.seriesDict is not None:
+            if self.labelDict is not None:
+                self.seriesDict['labels'].remove(self.labelDict)
+        if self.dataItem is not None and self in self.dataItem.textItems:
+            self.dataItem.textItems.remove(self)
+        self.getViewBox().removeItem(self)
+        self.deleteLater()
+    
+    def setLabelDict(self, labelDict: dict):
+        self.labelDict = labelDict
+
+        self.setPlainText(labelDict['text'])
+
+        x = labelDict.get('x', self.pos().x())
+        y = labelDict.get('y', self.pos().y())
+        self.setPos(x, y)
+
+        if 'anchor' in labelDict:
+            try:
+                halign, valign = labelDict['anchor']
+                self.setAnchorAlignment(halign, valign)
+            except:
+                pass
+
+        if 'color' in labelDict:
+            self.setColor(labelDict['color'])
+
+        if 'angle' in labelDict:
+            self.setAngle(labelDict['angle'])
+
+        if 'font-size' in labelDict:
+            self.textItem.font().setPointSize(labelDict['font-size'])
+    
+    def mouseClickEvent(self, event):
+        if event.button() == Qt.RightButton:
+            if self.boundingRect().contains(event.pos()):
+                if self.raiseContextMenu(event):
+                    event.accept()
+    
+    def mouseDragEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            if event.isStart():
+                self._dragOffset = self.pos() - self.getViewBox().mapSceneToView(self.mapToScene(event.buttonDownPos()))
+            elif event.isFinish():
+                self._dragOffset = None
+                return
+            if self._dragOffset is not None:
+                self.setPos(self.getViewBox().mapSceneToView(self.mapToScene(event.pos())) + self._dragOffset)
+                event.accept()
+    
+    def raiseContextMenu(self, event):
+        menu = self.getContextMenus()
+        
+        # Let the scene add on to the end of our context menu (this is optional)
+        menu = self.scene().addParentContextMenus(self, menu, event)
+        
+        pos = event.screenPos()
+        menu.popup(QPoint(int(pos.x()), int(pos.y())))
+        return True
+    
+    def getContextMenus(self, event=None):
+        self._labelMenu = QMenu("Label")
+        self._labelMenu.addAction("Edit", self.editDialog)
+        self._labelMenu.addSection(" ")
+        self._labelMenu.addAction("Delete", self._delete)
+
+        self.menu = QMenu()
+        self.menu.addMenu(self._labelMenu)
+        self.menu.addSection(" ")
+
+        return self.menu
+    
+    def setAnchorAlignment(self, halign, valign):
+        if halign == 'left':
+            halign = 0
+        elif halign == 'right':
+            halign = 1
+        elif halign == 'center':
+            halign = 0.5
+        
+        if valign == 'top':
+            valign = 0
+        elif valign == 'bottom':
+            valign = 1
+        elif valign == 'middle':
+            valign = 0.5
+        
+        self.anchor[0] = halign
+        self.anchor[1] = valign
+    
+    def editDialog(self):
+        dlg = QDialog()
+        form = QFormLayout(dlg)
+
+        text = self.toPlainText()
+        textEdit = QTextEdit()
+        textEdit.setPlainText(text)
+        form.addRow('Text', textEdit)
+
+        xStr = f'{self.pos().x():.6f}'.rstrip('0').rstrip('.')
+        yStr = f'{self.pos().y():.6f}'.rstrip('0').rstrip('.')
+        form.addRow('Position', QLineEdit(xStr + ', ' + yStr))
+
+        leftAlignBtn = QRadioButton()
+        centerAlignBtn = QRadioButton()
+        rightAlignBtn = QRadioButton()
+        topAlignBtn = QRadioButton()
+        middleAlignBtn = QRadioButton()
+        bottomAlignBtn = QRadioButton()
+        if self.anchor[0] == 0:
+            leftAlignBtn.setChecked(True)
+        elif self.anchor[0] == 0.5:
+            centerAlignBtn.setChecked(True)
+        elif self.anchor[0] == 1:
+            rightAlignBtn.setChecked(True)
+        if self.anchor[1] == 0:
+            topAlignBtn.setChecked(True)
+        elif self.anchor[1] == 0.5:
+            middleAlignBtn.setChecked(True)
+        elif self.anchor[1] == 1:
+            bottomAlignBtn.setChecked(True)
+        if qta is not None:
+            leftAlignBtn.setIcon(qta.icon('mdi.format-horizontal-align-left'))
+            centerAlignBtn.setIcon(qta.icon('mdi.format-horizontal-align-center'))
+            rightAlignBtn.setIcon(qta.icon('mdi.format-horizontal-align-right'))
+            topAlignBtn.setIcon(qta.icon('mdi.format-vertical-align-top'))
+            middleAlignBtn.setIcon(qta.icon('mdi.format-vertical-align-center'))
+            bottomAlignBtn.setIcon(qta.icon('mdi.format-vertical-align-bottom'))
+        else:
+            leftAlignBtn.setText('Left')
+            centerAlignBtn.setText('Center')
+            rightAlignBtn.setText('Right')
+            topAlignBtn.setText('Top')
+            middleAlignBtn.setText('Middle')
+            bottomAlignBtn.setText('Bottom')
+        halignBtnGroup = QButtonGroup()
+        halignBtnGroup.setExclusive(True)
+        halignBtnGroup.addButton(leftAlignBtn)
+        halignBtnGroup.addButton(centerAlignBtn)
+        halignBtnGroup.addButton(rightAlignBtn)
+        valignBtnGroup = QButtonGroup()
+        valignBtnGroup.setExclusive(True)
+        valignBtnGroup.addButton(topAlignBtn)
+        valignBtnGroup.addButton(middleAlignBtn)
+        valignBtnGroup.addButton(bottomAlignBtn)
+        halignBtnLayout = QHBoxLayout()
+        halignBtnLayout.addWidget(leftAlignBtn)
+        halignBtnLayout.addWidget(centerAlignBtn)
+        halignBtnLayout.addWidget(rightAlignBtn)
+        halignBtnLayout.addStretch()
+        valignBtnLayout = QHBoxLayout()
+        valignBtnLayout.addWidget(topAlignBtn)
+        valignBtnLayout.addWidget(middleAlignBtn)
+        valignBtnLayout.addWidget(bottomAlignBtn)
+        valignBtnLayout.addStretch()
+        form.addRow('Horizontal Anchor', halignBtnLayout)
+        form.addRow('Vertical Anchor', valignBtnLayout)
+
+        form.addRow('Color', ColorButton(self.color))
+
+        angleSpinBox = QSpinBox()
+        angleSpinBox.setValue(self.angle)
+        angleSpinBox.setMinimum(-90)
+        angleSpinBox.setMaximum(90)
+        angleSpinBox.setSuffix(' degrees')
+        form.addRow('Rotation', angleSpinBox)
+
+        ptSizeSpinBox = QSpinBox()
+        ptSizeSpinBox.setValue(self.textItem.font().pointSize())
+        ptSizeSpinBox.setMinimum(1)
+        ptSizeSpinBox.setSuffix(' pt')
+        form.addRow('Font Size', ptSizeSpinBox)
+
+        btns = QDialogButtonBox()
+        btns.setStandardButtons(QDialogButtonBox.Cancel | QDialogButtonBox.Ok)
+        btns.accepted.connect(dlg.accept)
+        btns.rejected.connect(dlg.reject)
+        form.addRow(btns)
+
+        dlg.setWindowModality(Qt.ApplicationModal)
+        if dlg.exec_() != QDialog.Accepted:
+            if text == '':
+                self._delete()
+            return
+        
+        text = form.itemAt(0, 1).widget().toPlainText()
+        if text == '':
+            self._delete()
+            return
+        self.setPlainText(text)
+
+        x, y = [float(value) for value in form.itemAt(1, 1).widget().text().split(',')]
+        self.setPos(x, y)
+
+        if halignBtnGroup.checkedButton() is leftAlignBtn:
+            self.anchor[0] = 0
+            halign = 'left'
+        elif halignBtnGroup.checkedButton() is centerAlignBtn:
+            self.anchor[0] = 0.5
+            halign = 'center'
+        elif halignBtnGroup.checkedButton() is rightAlignBtn:
+            self.anchor[0] = 1
+            halign = 'right'
+        if valignBtnGroup.checkedButton() is topAlignBtn:
+            self.anchor[1] = 0
+            valign = 'top'
+        elif valignBtnGroup.checkedButton() is middleAlignBtn:
+            self.anchor[1] = 0.5
+            valign = 'middle'
+        elif valignBtnGroup.checkedButton() is bottomAlignBtn:
+            self.anchor[1] = 1
+            valign = 'bottom'
+
+        color = form.itemAt(4, 1).widget().color()
+        self.setColor(color)
+
+        angle = form.itemAt(5, 1).widget().value()
+        self.setAngle(angle)
+
+        fontPointSize = form.itemAt(6, 1).widget().value()
+        self.textItem.font().setPointSize(fontPointSize)
+
+        if self.labelDict is None:
+            return
+        
+        self.labelDict['text'] = text
+        self.labelDict['x'] = x
+        self.labelDict['y'] = y
+        self.labelDict['anchor'] = (halign, valign)
+        self.labelDict['color'] = (color.red(), color.green(), color.blue(), color.alpha())
+        self.labelDict['angle'] = angle
+        self.labelDict['font-size'] = fontPointSize
+
+
+class DataTableModel(QAbstractTableModel):
+    """
+    Table of series (rows) and their attributes (columns) that stays in sync with tsa.data.
+
+    Rows are fetched in batches as they are scrolled into view (canFetchMore/fetchMore),
+    and columns are discovered from the attributes of the rows fetched so far,
+    so opening or refreshing the table only costs time proportional to the rows that have been shown.
+    Cached metadata (e.g., default episodes) comes from the analyzer's series table.
+    """
+
+    batchSize = 1000  # rows fetched at a time
+
+    def __init__(self, tsa):
+        QAbstractTableModel.__init__(self)
+        self._tsa = tsa
+        self._requiredColumns = ['episode', 'group', 'name', 'x', 'y', 'xlabel', 'ylabel', 'style']
+        self._columns = list(self._requiredColumns)
+        self._numRowsFetched = 0
+        self.fetchMore()
+
+    def rowCount(self, index=QModelIndex()):
+        if index.isValid():
+            return 0
+        return self._numRowsFetched
+
+    def columnCount(self, index=QModelIndex()):
+        if index.isValid():
+            return 0
+        return len(self._columns)
+
+    def canFetchMore(self, index=QModelIndex()):
+        return not index.isValid() and self._numRowsFetched < len(self._tsa.data)
+
+    def fetchMore(self, index=QModelIndex()):
+        start = self._numRowsFetched
+        stop = min(start + self.batchSize, len(self._tsa.data))
+        if stop <= start:
+            return
+        self._addColumns(start, stop)
+        self.beginInsertRows(QModelIndex(), start, stop - 1)
+        self._numRowsFetched = stop
+        self.endInsertRows()
+
+    def _addColumns(self, start, stop):
+        # any new attributes in rows start:stop
+        newColumns = []
+        for series in self._tsa.data[start:stop]:
+            for attr in series:
+                if attr not in self._columns and attr not in newColumns:
+                    newColumns.append(attr)
+        if newColumns:
+            self.beginInsertColumns(QModelIndex(), len(self._columns), len(self._columns) + len(newColumns) - 1)
+            self._columns.extend(newColumns)
+            self.endInsertColumns()
+
+    def reset(self):
+        """ The list of series was replaced or restructured. """
+        self.beginResetModel()
+        self._columns = list(self._requiredColumns)
+        self._numRowsFetched = min(max(self._numRowsFetched, self.batchSize), len(self._tsa.data))
+        self.endResetModel()
+        self._addColumns(0, self._numRowsFetched)
+
+    def refresh(self):
+        """ Series may have been edited directly, so update the rows fetched so far. """
+        if self._numRowsFetched > len(self._tsa.data):
+            self.reset()
+            return
+        self._addColumns(0, self._numRowsFetched)
+        if self._numRowsFetched:
+            self.dataChanged.emit(self.index(0, 0), self.index(self._numRowsFetched - 1, len(self._columns) - 1))
+        if self._numRowsFetched < self.batchSize:
+            self.fetchMore()
+
+    def seriesAppended(self, start):
+        """ Series were appended to tsa.data starting at index start. """
+        if self._numRowsFetched >= start:
+            # all rows are shown, so show the new ones too (otherwise they will be fetched when scrolled to)
+            self.fetchMore()
+
+    def seriesChanged(self, row, attr):
+        """ Attribute attr of series at row was set. """
+        if row >= self._numRowsFetched:
+            return
+        if attr not in self._columns:
+            self._addColumns(row, row + 1)
+        if attr in self._columns:
+            column = self._columns.index(attr)
+            self.dataChanged.emit(self.index(row, column), self.index(row, column))
+        if attr in ['episode', 'group', 'name']:
+            # may change default episodes of other rows
+            column = self._columns.index('episode')
+            self.dataChanged.emit(self.index(0, column), self.index(self._numRowsFetched - 1, column))
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole or role == Qt.EditRole:
+            seriesIndex = index.row()
+            attr = self._columns[index.column()]
+            series = self._tsa.data[seriesIndex]
+            if attr in series:
+                value = series[attr]
+                if role == Qt.DisplayRole and isinstance(value, (np.ndarray, LazyArray, DerivedArray)):# and len(value) > 10:
+                    if value.ndim == 1:
+                        return f'x{len(value)} {value.dtype}'
+                    else:
+                        return 'x'.join([str(dim) for dim in value.shape]) + f' {value.dtype}'
+            elif attr not in ['x', 'y']:
+                # e.g., default values from cached metadata
+                value = self._tsa.seriesAttr(attr, seriesIndex)
+            else:
+                value = None
+            if value is None:
+                if attr == 'style':
+                    return '{}'
+                elif attr == 'labels':
+                    return '[]'
+                return ''
+            return str(value)
+        elif role == Qt.FontRole:
+            seriesIndex = index.row()
+            attr = self._columns[index.column()]
+            series = self._tsa.data[seriesIndex]
+            if attr in series:
+                value = series[attr]
+                if isinstance(value, (np.ndarray, LazyArray, DerivedArray)):
+                    font = QFont()
+                    font.setItalic(True)
+                    return font
+
+    def setData(self, index, value, role):
+        if not index.isValid():
+            return False
+        if role == Qt.EditRole:
+            seriesIndex = index.row()
+            attr = self._columns[index.column()]
+            try:
+                value = int(value)
+            except ValueError:
+                try:
+                    value = float(value)
+                except ValueError:
+                    try:
+                        value = str(value)
+                    except ValueError:
+                        return False
+            if attr == 'episode':
+                if not isinstance(value, int):
+                    return False
+                applyChange = QMessageBox.question(self._tsa, 'Confirm', 'Are you sure you want to change the episode number? This could invalidate your data structure.', QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+                if applyChange == QMessageBox.No:
+                    return False
+            elif attr in ['x', 'y']:
+                if isinstance(value, str):
+                    value = value.strip()
+                    if value.startswith('[') and value.endswith(']'):
+                        value = value[1:-1]
+                    fields = re.split(r'[,\s]+', value)
+                    values = []
+                    for field in fields:
+                        field = field.strip()
+                        if field == '':
+                            continue
+                        elif field == '...':
+                            # the string rep of this array is too long to display
+                            # if we were to update based on this string rep, we would lose data
+                            return False
+                        try:
+                            field = int(field)
+                        except ValueError:
+                            try:
+                                field = float(field)
+                            except ValueError:
+                                # non-numeric value
+                                return False
+                        values.append(field)
+                    if not values:
+                        value = None
+                        if attr == 'y':
+                            return False
+                    elif len(values) == 1:
+                        value = values[0]
+                    else:
+                        value = np.array(values)
+                elif isinstance(value, int) or isinstance(value, float):
+                    pass
+                else:
+                    return False
+                applyChange = QMessageBox.question(self._tsa, 'Confirm', 'Are you sure you want to change the series data?', QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+                if applyChange == QMessageBox.No:
+                    return False
+                if isinstance(value, np.ndarray) and isinstance(self._tsa.data[seriesIndex][attr], np.ndarray):
+                    if len(value) == len(self._tsa.data[seriesIndex][attr]):
+                        # mutate array in place
+                        self._tsa.data[seriesIndex][attr][:] = value
+                        self._tsa.setSeriesAttr(attr, self._tsa.data[seriesIndex][attr], seriesIndex)
+                        self._tsa.updateUI()
+                        return True
+            elif attr == 'style':
+                # should be a dictionary
+                try:
+                    value = ast.literal_eval(value)
+                except:
+                    return False
+                if not isinstance(value, dict):
+                    return False
+            if value == '' and attr not in self._tsa.data[seriesIndex]:
+                return False
+            self._tsa.setSeriesAttr(attr, value, seriesIndex)
+            self._tsa.updateUI()
+            return True
+        return False
+
+    def flags(self, index):
+        return Qt.ItemIsSelectable | Qt.ItemIsEnabled | Qt.ItemIsEditable
+    
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole:
+            if orientation == Qt.Horizontal:
+                return self._columns[section]
+            elif orientation == Qt.Vertical:
+                return section
+    
+
+
+class ColorButton(QGroupBox):
+    def __init__(self, color=QColor('transparent')):
+        QGroupBox.__init__(self)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(5)
+
+        self.colorButton = QPushButton()
+        self.colorButton.clicked.connect(self.pickColor)
+        self._colorWasPicked = False
+        layout.addWidget(self.colorButton)
+
+        self.setColor(color)
+    
+    def color(self) -> QColor:
+        pal = self.colorButton.palette()
+        return pal.brush(QPalette.Button).color()
+
+    def setColor(self, color):
+        if isinstance(color, str):
+            color = str2qcolor(color)
+        pal = self.colorButton.palette()
+        pal.setBrush(QPalette.Button, QBrush(color))
+        self.colorButton.setPalette(pal)
+        self.colorButton.setGraphicsEffect(QGraphicsOpacityEffect(opacity=color.alphaF()))
+    
+    def pickColor(self):
+        color = QColorDialog.getColor(self.color(), None, "Select Color", options=QColorDialog.ShowAlphaChannel)
+        if color.isValid():
+            self.setColor(color)
+            self._colorWasPicked = True
+    
+    def colorWasPicked(self) -> bool:
+        return self._colorWasPicked
+    
+
+# Utilities
+
+@functools.lru_cache(maxsize=1024)
+def str2color(colorStr):
+    if (colorStr.startswith('(') and colorStr.endswith(')')) or (colorStr.startswith('[') and colorStr.endswith(']')):
+        rgba = [int(c) for c in colorStr[1:-1].split(',')]
+        if len(rgba) == 3:
+            rgba.append(255)
+        return tuple(rgba)
+    elif colorStr in _colorNames():
+        qcolor = QColor(colorStr)
+        return qcolor.red(), qcolor.green(), qcolor.blue(), qcolor.alpha()
+
+def str2qcolor(colorStr):
+    if (colorStr.startswith('(') and colorStr.endswith(')')) or (colorStr.startswith('[') and colorStr.endswith(']')):
+        rgba = [int(c) for c in colorStr[1:-1].split(',')]
+        return QColor(*rgba)
+    elif colorStr in _colorNames():
+        return QColor(colorStr)
+    else:
+        return pg.mkColor(colorStr)  # ???
+
+def qcolor2str(color):
+    name = _colorNamesByRgba().get(color.rgba())
+    if name is not None:
+        return name
+    if color.alpha() == 255:
+        return f'({color.red()},{color.green()},{color.blue()})'
+    else:
+        return f'({color.red()},{color.green()},{color.blue()},{color.alpha()})'
+
+
+@functools.lru_cache(maxsize=None)
+def _colorNames() -> frozenset:
+    return frozenset(QColor.colorNames())
+
+@functools.lru_cache(maxsize=None)
+def _colorNamesByRgba() -> dict:
+    names = {}
+    for name in QColor.colorNames():
+        names.setdefault(QColor(name).rgba(), name)
+    return names
+
+
+# Run UI from REPL without blocking the REPL.
+
+def run():
+    """
+    Run the application from a REPL without blocking the REPL.
+    
+    e.g., in a REPL, run the following:
+
+    ```
+    import PyQtTimeSeriesAnalyzer
+    app, tsa = PyQtTimeSeriesAnalyzer.run()
+    ```
+
+    This will launch the UI and allow you to continue using the REPL
+    where you can access the QApplication object and QtTimeSeriesAnalyzer UI widget
+    via the variables `app` and `tsa`, respectively.
+    """
+
+    # Create the application
+    app = QApplication(sys.argv)
+    app.setStyle('Fusion')
+
+    # Create, show and return widget
+    tsa = QtTimeSeriesAnalyzer()
+    tsa.show()
+    tsa.raise_()  # bring UI window to front
+    
+    return app, tsa
+
+# Running this file directly will launch the UI.
+
+if __name__ == '__main__':
+    # Create the application
+    app = QApplication(sys.argv)
+    app.setStyle('Fusion')
+
+    # Create widget
+    tsa = QtTimeSeriesAnalyzer()
+
+    # testing
+    # tsa.importHEKA('heka.dat')
+    tsa.data = []
+    tsa.addSeries(y=np.random.random(10), xlabel="Time, s", ylabel="Current, pA", group=0, labels=[{'text': 'testing 1', 'x': 3, 'y': 0.5}])
+    tsa.addSeries(y=np.random.random(10) * 1000, xlabel="Time, s", ylabel="Voltage, mV", group=1)
+    tsa.addSeries(y=np.random.random(10), xlabel="Time, s", ylabel="Current, pA", group=0, labels=[{'text': 'testing 2', 'x': 6, 'y': 0.5}])
+    tsa.addSeries(y=np.random.random(10) * 1000, xlabel="Time, s", ylabel="Voltage, mV", group=1)
+    tsa.addSeries(y=np.random.random(10), xlabel="Time, s", ylabel="Current, pA", group=0, episode=1, name='fit')
+    tsa.updateUI()
+
+    # tsa.open()
+
+
+    # Show widget and run application
+    tsa.show()
+    status = app.exec()
+    sys.exit(status)
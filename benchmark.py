@@ -0,0 +1,248 @@
+"""
+benchmark.py
+
+Benchmarks of PyQtTimeSeriesAnalyzer hot paths on synthetic datasets at several scales.
+
+Results are written as JSON (one record per benchmark and scale), so that runs of different versions can be compared, e.g.,
+
+    python benchmark.py -o before.json
+    (change something)
+    python benchmark.py -o after.json --compare before.json
+
+The UI benchmarks run under the offscreen Qt platform unless QT_QPA_PLATFORM is set.
+"""
+
+
+import sys, os, json, time, argparse, functools, platform, subprocess, tempfile
+import numpy as np
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import PyQtTimeSeriesAnalyzer as tsamodule
+
+
+# name -> (number of series, samples per series)
+SCALES = {
+    '100x1k': (100, 1000),
+    '10kx1k': (10000, 1000),
+    '100kx1k': (100000, 1000),
+    '100x100k': (100, 100000),
+    '10x10M': (10, 10000000),
+}
+DEFAULT_SCALES = ['100x1k', '10kx1k', '100x100k']
+
+numGroups = 2  # series i is in group i % numGroups and episode i // numGroups
+# file benchmarks only use this many series/samples (files would otherwise be huge)
+maxFileSeries = 1000
+maxFileSamples = 10000000
+
+
+def makeData(numSeries, numSamples) -> list:
+    """
+    Synthetic series dicts like those of a HEKA import (uniform sampling interval, start, labels).
+
+    Series are views into a shared random buffer, so that many long series do not need as much memory.
+    """
+    rng = np.random.default_rng(0)
+    buffer = rng.standard_normal(numSamples + 1024)
+    data = []
+    for i in range(numSeries):
+        offset = i % 1024
+        data.append({
+            'x': 1e-4,
+            'x0': 0.0,
+            'y': buffer[offset:offset + numSamples],
+            'xlabel': 'Time, s',
+            'ylabel': 'Current, A' if i % numGroups == 0 else 'Voltage, V',
+            'episode': i // numGroups,
+            'group': i % numGroups
+            })
+    return data
+
+
+def timeRuns(func, repeat=5, setup=None) -> list:
+    """ Run times (seconds) of func() (after setup() if given, which is not timed). """
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def benchmarkFiles(data, repeat):
+    numSamples = max(1, np.size(data[0]['y'])) if data else 1
+    fileData = data[:max(1, min(maxFileSeries, maxFileSamples // numSamples))]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filepath = os.path.join(tmpdir, 'data.mat')
+        yield 'savemat', len(fileData), timeRuns(lambda: tsamodule.savemat(filepath, fileData), repeat)
+        yield 'loadmat', len(fileData), timeRuns(lambda: tsamodule.loadmat(filepath), repeat)
+        if tsamodule._optionalImport('h5py') is not None:
+            filepath = os.path.join(tmpdir, 'data.h5')
+            def removeFile():
+                # saveh5 only writes what is not already in the file
+                if os.path.exists(filepath):
+                    os.remove(filepath)
+            yield 'saveh5', len(fileData), timeRuns(lambda: tsamodule.saveh5(filepath, fileData), repeat, removeFile)
+            yield 'loadh5', len(fileData), timeRuns(lambda: tsamodule.loadh5(filepath), repeat)
+
+
+def benchmarkSelection(data, repeat):
+    tsa = tsamodule.TimeSeriesAnalyzer()
+    tsa.data = data
+    numEpisodes = len(data) // numGroups
+    episodes = list(range(0, numEpisodes, 3))
+    # cold: metadata cache rebuilt after series dicts may have been edited directly
+    yield 'seriesIndexes (cold)', len(data), timeRuns(lambda: tsa.seriesIndexes(episodes=episodes, groups=[0]), repeat, tsa.updateUI)
+    yield 'seriesIndexes', len(data), timeRuns(lambda: tsa.seriesIndexes(episodes=episodes, groups=[0]), repeat)
+    yield 'seriesEpisodes (cold)', len(data), timeRuns(tsa.seriesEpisodes, repeat, tsa.updateUI)
+    yield 'seriesEpisodes', len(data), timeRuns(tsa.seriesEpisodes, repeat)
+
+
+def benchmarkUI(data, repeat, heka=None):
+    from PyQt5.QtCore import Qt
+    from PyQt5.QtWidgets import QApplication
+    from PyQtTimeSeriesAnalyzerGUI import QtTimeSeriesAnalyzer, DataTableModel
+    app = QApplication.instance() or QApplication(sys.argv)
+    ui = QtTimeSeriesAnalyzer()
+    ui.resize(800, 600)
+    ui.show()
+    ui.data = data
+    ui.updateUI()
+    ui.setVisibleEpisodes([0])
+    app.processEvents()
+    numEpisodes = len(data) // numGroups
+
+    ui._visibleEpisodesEdit.setText(f'0-{min(9, numEpisodes - 1)} {numEpisodes // 2} {max(0, numEpisodes - 10)}-{numEpisodes - 1}')
+    ui._episodeSelection = None
+    yield 'visibleEpisodes (new text)', len(data), timeRuns(ui.visibleEpisodes, repeat, lambda: setattr(ui, '_episodeSelection', None))
+    yield 'visibleEpisodes', len(data), timeRuns(ui.visibleEpisodes, repeat)
+    ui.setVisibleEpisodes([0])
+
+    # redraw everything vs. step to the next episode
+    def redraw():
+        ui._allSeriesDirty = True
+        ui._updateGroupPlots()
+    yield '_updateGroupPlots (all)', len(data), timeRuns(redraw, repeat)
+    episode = [0]
+    def step():
+        episode[0] = (episode[0] + 1) % numEpisodes
+        ui._visibleEpisodesEdit.setText(str(episode[0]))
+        ui._updateGroupPlots()
+    yield '_updateGroupPlots (next episode)', len(data), timeRuns(step, repeat)
+
+    # first screen of table cells
+    model = DataTableModel(ui)
+    numRows = min(model.rowCount(), 50)
+    def tableData():
+        for row in range(numRows):
+            for column in range(model.columnCount()):
+                model.data(model.index(row, column), Qt.DisplayRole)
+    yield 'DataTableModel.data (screen)', numRows * model.columnCount(), timeRuns(tableData, repeat)
+    yield 'DataTableModel (open)', len(data), timeRuns(lambda: DataTableModel(ui), repeat)
+
+    # series streamed in batches as by the background HEKA import (see HEKAImportWorker)
+    batchSize = 256
+    def hekaStyleImport():
+        ui.data = []
+        for start in range(0, len(data), batchSize):
+            ui._onHEKASeriesDecoded(data[start:start + batchSize])
+    yield 'HEKA-style import (batches)', len(data), timeRuns(hekaStyleImport, repeat)
+    app.processEvents()
+    if heka is not None:
+        yield 'importHEKA', 1, timeRuns(lambda: ui.importHEKA(heka, background=False), repeat)
+
+    ui.close()
+    ui.deleteLater()
+    app.processEvents()
+
+
+def run(scales, repeat=5, ui=True, heka=None) -> dict:
+    """ Run benchmarks at each scale (see SCALES), the UI benchmarks only if ui, importHEKA only for a given HEKA file. """
+    results = []
+    for scale in scales:
+        numSeries, numSamples = SCALES[scale]
+        data = makeData(numSeries, numSamples)
+        suites = [benchmarkFiles, benchmarkSelection]
+        if ui:
+            suites.append(functools.partial(benchmarkUI, heka=heka))
+        for suite in suites:
+            for name, n, times in suite(data, repeat):
+                result = {
+                    'benchmark': name,
+                    'scale': scale,
+                    'numSeries': numSeries,
+                    'numSamples': numSamples,
+                    'n': n,
+                    'min': min(times),
+                    'median': float(np.median(times)),
+                    'repeat': len(times)
+                    }
+                results.append(result)
+                print(f"{scale:>10}  {name:<34} {result['min'] * 1000:10.3f} ms  (median {result['median'] * 1000:.3f} ms)", file=sys.stderr)
+    return {
+        'version': gitVersion(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'results': results
+        }
+
+
+def gitVersion():
+    try:
+        directory = os.path.dirname(os.path.abspath(__file__))
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=directory, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(report: dict, baseline: dict, threshold=1.2) -> int:
+    """ Print current/baseline min time ratios and return the number of benchmarks slower by more than threshold. """
+    baselineTimes = {(result['benchmark'], result['scale']): result['min'] for result in baseline['results']}
+    numRegressions = 0
+    print(f"compared to {baseline.get('version')} ({baseline.get('timestamp')}):", file=sys.stderr)
+    for result in report['results']:
+        key = (result['benchmark'], result['scale'])
+        if key not in baselineTimes or baselineTimes[key] <= 0:
+            continue
+        ratio = result['min'] / baselineTimes[key]
+        isRegression = ratio > threshold
+        numRegressions += isRegression
+        print(f"{result['scale']:>10}  {result['benchmark']:<34} {ratio:6.2f}x{'  REGRESSION' if isRegression else ''}", file=sys.stderr)
+    return numRegressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark PyQtTimeSeriesAnalyzer hot paths.')
+    parser.add_argument('--scales', nargs='+', default=DEFAULT_SCALES, choices=list(SCALES) + ['all'], help='dataset scales (#series x #samples)')
+    parser.add_argument('-n', '--repeat', type=int, default=5, help='runs per benchmark (min and median are reported)')
+    parser.add_argument('--no-ui', action='store_true', help='skip the Qt UI benchmarks')
+    parser.add_argument('--heka', help='HEKA .dat file for timing importHEKA (requires heka_reader)')
+    parser.add_argument('-o', '--output', default='-', help='JSON results file (default: stdout)')
+    parser.add_argument('--compare', help='JSON results of a previous run to compare to')
+    parser.add_argument('--threshold', type=float, default=1.2, help='slowdown ratio reported as a regression')
+    args = parser.parse_args(argv)
+
+    scales = list(SCALES) if 'all' in args.scales else args.scales
+    report = run(scales, args.repeat, not args.no_ui, args.heka)
+    if args.output == '-':
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        if compare(report, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
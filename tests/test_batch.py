@@ -0,0 +1,54 @@
+import csv
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQtTimeSeriesAnalyzer import main, savemat
+
+
+def writeFiles(tmp_path):
+    x = np.arange(1000) * 0.001
+    paths = []
+    for i in range(2):
+        path = str(tmp_path / f'data{i}.mat')
+        savemat(path, [{'x': x, 'y': x * (i + 1), 'episode': episode, 'group': 0} for episode in range(3)])
+        paths.append(path)
+    return paths
+
+
+def readRows(path):
+    with open(path, newline='') as file:
+        return list(csv.DictReader(file))
+
+
+def test_batch_exit_code_and_results(tmp_path):
+    paths = writeFiles(tmp_path)
+    output = str(tmp_path / 'results.csv')
+    assert main(paths + ['--regions', '0.1:0.2', '--measure', 'mean', '-j', '1', '-o', output]) == 0
+    rows = [row for row in readRows(output) if row['param'] == 'y']
+    assert len(rows) == 6
+    for row in rows:
+        scale = 1 + paths.index(row['file'])
+        x = np.arange(1000) * 0.001
+        np.testing.assert_allclose(float(row['value']), np.mean(scale * x[(x >= 0.1) & (x <= 0.2)]))
+
+
+@pytest.mark.parametrize('processes', ['1', '2'])
+def test_batch_exit_code_with_bad_file(tmp_path, processes):
+    paths = writeFiles(tmp_path)
+    bad = str(tmp_path / 'bad.mat')
+    with open(bad, 'wb') as file:
+        file.write(b'not a mat file')
+    output = str(tmp_path / 'results.csv')
+    assert main(paths + [bad, '--measure', 'max', '-j', processes, '-o', output]) == 1
+    assert len(readRows(output)) == 2 * 3 * 2
+
+
+def test_batch_usage_errors(tmp_path):
+    with pytest.raises(SystemExit) as exit:
+        main([str(tmp_path / 'missing'), '--measure', 'mean'])
+    assert exit.value.code == 2
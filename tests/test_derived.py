@@ -0,0 +1,66 @@
+import gc
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQtTimeSeriesAnalyzer import TimeSeriesAnalyzer, DerivedArray
+
+
+def makeAnalyzer():
+    tsa = TimeSeriesAnalyzer()
+    tsa.data = [{'x': 0.01, 'y': np.arange(100.0) + i, 'episode': i} for i in range(3)]
+    return tsa
+
+
+def test_derived_series_match_reference():
+    tsa = makeAnalyzer()
+    y = tsa.data[0]['y']
+    x = np.arange(100) * 0.01
+    scaled = tsa.deriveSeries('scale', [0], factor=2, offset=1)[0]
+    baseline = tsa.deriveSeries('baseline', [0], regions=[(0, 0.1)])[0]
+    interpolated = tsa.deriveSeries('interpolate', [0], regions=[(0.2, 0.3)])[0]
+    subtracted = tsa.deriveSeries('subtract', [1], other=0)[0]
+    np.testing.assert_allclose(scaled['y'], 2 * y + 1)
+    np.testing.assert_allclose(baseline['y'], y - y[x <= 0.1].mean())
+    np.testing.assert_allclose(interpolated['y'], y)
+    np.testing.assert_allclose(subtracted['y'], np.ones(100))
+    assert len(tsa.data) == 7
+
+
+def test_in_place_edits_invalidate_dependents():
+    tsa = makeAnalyzer()
+    source = tsa.data[0]
+    scaled = tsa.deriveSeries('scale', [0], factor=2)[0]
+    chained = tsa.deriveSeries('baseline', [scaled])[0]
+    np.asarray(chained['y'])
+    source['y'][:] = 5
+    tsa.setSeriesAttr('y', source['y'], source)
+    np.testing.assert_allclose(scaled['y'], 10)
+    np.testing.assert_allclose(chained['y'], 0)
+    # replaced source arrays are detected without setSeriesAttr
+    source['y'] = np.arange(100.0)
+    np.testing.assert_allclose(scaled['y'], 2 * np.arange(100.0))
+    with tsa.batchUpdate():
+        source['y'][:] = 1
+        tsa.setSeriesAttr('y', source['y'], source)
+    np.testing.assert_allclose(scaled['y'], 2)
+    assert [id(series) for series in tsa._dependentSeries([source])] == [id(scaled), id(chained)]
+    # no longer derived
+    tsa.setSeriesAttr('y', np.zeros(100), scaled)
+    assert tsa._dependentSeries([source]) == []
+
+
+def test_cache_releases_removed_series():
+    tsa = makeAnalyzer()
+    derived = tsa.deriveSeries('scale', factor=3)
+    for series in derived:
+        np.asarray(series['y'])
+    key = id(derived[0]['y'])
+    assert key in DerivedArray.cache._entries
+    del derived, series
+    tsa.data = tsa.data[:3]
+    gc.collect()
+    assert key not in DerivedArray.cache._entries
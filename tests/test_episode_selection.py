@@ -0,0 +1,39 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQtTimeSeriesAnalyzer import EpisodeSelection
+
+
+def referenceSelection(text, episodes):
+    # each field selects episodes one at a time, slices index range(largest episode + 1)
+    episodes = list(episodes)
+    allEpisodes = range(max(episodes) + 1) if episodes else range(0)
+    selected = set()
+    for field in text.replace(',', ' ').split():
+        if ':' in field:
+            selected.update(allEpisodes[slice(*[int(arg) if arg else None for arg in field.split(':')])])
+        elif '-' in field:
+            first, last = field.split('-')
+            selected.update(range(int(first), int(last) + 1))
+        else:
+            selected.add(int(field))
+    if not text.split():
+        return [True] * len(episodes)
+    return [episode in selected for episode in episodes]
+
+
+@pytest.mark.parametrize('text', ['', ' ', '3', '0, 3-5 10:20:2 100:', '1,2,,7', ':5', '::3', '-5:', '20:10:-3', '::-1', '2-2', '5-1'])
+def test_mask_matches_reference(text):
+    episodes = np.array([0, 1, 2, 3, 4, 5, 7, 10, 12, 15, 20, 21, 100, 101, 3, 3])
+    selection = EpisodeSelection(text)
+    assert selection.mask(episodes).tolist() == referenceSelection(text, episodes)
+    assert selection.isAll() == (text.strip() == '')
+
+
+def test_mask_of_no_episodes():
+    assert EpisodeSelection('1:5').mask([]).tolist() == []
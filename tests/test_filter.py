@@ -0,0 +1,68 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+import scipy.signal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQtTimeSeriesAnalyzer import filterSOS, filtfilt, parseFilters, TimeSeriesAnalyzer
+
+
+def test_parseFilters():
+    assert parseFilters('lowpass 1000, notch 60 q=20; bandpass 1-100 order=2') == [
+        {'type': 'lowpass', 'cutoff': 1000.0}, 
+        {'type': 'notch', 'cutoff': 60.0, 'q': 20.0}, 
+        {'type': 'bandpass', 'cutoff': [1.0, 100.0], 'order': 2}]
+    for text in ['lowpass', 'lowpass x', 'highband 10', 'bandpass 10']:
+        with pytest.raises(ValueError):
+            parseFilters(text)
+
+
+def test_filterSOS_matches_scipy_designs():
+    fs = 10000
+    sos = filterSOS(parseFilters('lowpass 1000, notch 60 q=20, bandpass 1-100 order=2'), fs)
+    b, a = scipy.signal.iirnotch(60, 20, fs=fs)
+    expected = np.concatenate([
+        scipy.signal.butter(4, 1000, 'lowpass', output='sos', fs=fs), 
+        scipy.signal.tf2sos(b, a), 
+        scipy.signal.butter(2, [1, 100], 'bandpass', output='sos', fs=fs)])
+    np.testing.assert_allclose(sos, expected)
+    # cached designs are not shared with the caller
+    sos[:] = 0
+    assert filterSOS([{'type': 'lowpass', 'cutoff': 1000}], fs).any()
+
+
+@pytest.mark.parametrize('filters', ['lowpass 50', 'highpass 5 order=2', 'notch 60 q=30', 'bandstop 40-70'])
+def test_chunked_filtfilt_matches_single_pass(filters):
+    rng = np.random.default_rng(3)
+    y = rng.standard_normal((3, 50000)).cumsum(axis=1)
+    sos = filterSOS(parseFilters(filters), 1000)
+    expected = scipy.signal.sosfiltfilt(sos, y, axis=-1)
+    chunked = filtfilt(sos, y, chunkSize=4096)
+    assert np.max(np.abs(chunked - expected)) < 1e-8 * np.max(np.abs(y))
+    np.testing.assert_allclose(filtfilt(sos, y), expected)
+
+
+def test_filtfilt_short_series():
+    sos = filterSOS(parseFilters('lowpass 50'), 1000)
+    for length in [1, 2, 10]:
+        assert filtfilt(sos, np.ones(length)).shape == (length,)
+
+
+def test_filterSeries_matches_per_series_filtering():
+    rng = np.random.default_rng(4)
+    tsa = TimeSeriesAnalyzer()
+    tsa.data = [{'x': 0.001, 'y': rng.standard_normal(n), 'episode': i} for i, n in enumerate([2000, 2000, 3000])]
+    filters = parseFilters('lowpass 50')
+    filtered = tsa.filterSeries(filters)
+    assert len(tsa.data) == 6
+    sos = filterSOS(filters, 1000)
+    for series, result in zip(tsa.data[:3], filtered):
+        np.testing.assert_allclose(result['y'], scipy.signal.sosfiltfilt(sos, series['y']), atol=1e-10)
+    # cached, and refiltered when the original is replaced
+    assert tsa.filterSeries(filters) == filtered and len(tsa.data) == 6
+    tsa.setSeriesAttr('y', np.ones(2000), 0)
+    assert tsa.filterSeries(filters)[0] is filtered[0]
+    np.testing.assert_allclose(filtered[0]['y'], scipy.signal.sosfiltfilt(sos, np.ones(2000)), atol=1e-10)
@@ -0,0 +1,31 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQtTimeSeriesAnalyzer import polyfitRegions, UniformAxis
+
+
+@pytest.mark.parametrize('degree', [0, 1, 3])
+def test_polyfitRegions_matches_polyfit(degree):
+    rng = np.random.default_rng(2)
+    xs = [np.sort(rng.uniform(0, 10, 300)), np.linspace(2, 8, 50), UniformAxis(1, 0.5, 40)]
+    ys = [np.cos(np.asarray(x)) + rng.standard_normal(len(x)) * 0.1 for x in xs]
+    regions = [(1, 3), (6, 9)]
+    fits = polyfitRegions(xs, ys, regions, degree)
+    for x, y, fit in zip(xs, ys, fits):
+        x = np.asarray(x)
+        inRegions = ((x >= 1) & (x <= 3)) | ((x >= 6) & (x <= 9))
+        expected = np.polynomial.Polynomial.fit(x[inRegions], y[inRegions], degree)
+        np.testing.assert_allclose(fit(x), expected(x), rtol=1e-8, atol=1e-8)
+
+
+def test_polyfitRegions_series_without_samples():
+    xs = [np.arange(10.0), np.arange(20.0, 30.0)]
+    ys = [2 * x + 1 for x in xs]
+    fits = polyfitRegions(xs, ys, [(0, 9)], 1)
+    assert fits[1] is None
+    np.testing.assert_allclose(fits[0].convert().coef, [1, 2], atol=1e-10)
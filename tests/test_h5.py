@@ -0,0 +1,56 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+h5py = pytest.importorskip('h5py')
+
+from PyQtTimeSeriesAnalyzer import TimeSeriesAnalyzer, LazyArray, saveh5, loadh5
+
+
+def makeData():
+    x = np.arange(5000) * 0.001
+    return [{'x': x, 'y': np.sin(x * (i + 1)), 'episode': i, 'name': 'y'} for i in range(3)]
+
+
+def test_saveh5_lazy_arrays_to_new_file(tmp_path):
+    src = str(tmp_path / 'a.h5')
+    dst = str(tmp_path / 'b.h5')
+    data = makeData()
+    saveh5(src, data)
+    loaded = loadh5(src)
+    assert isinstance(loaded[0]['y'], LazyArray)
+    saveh5(dst, loaded)
+    copied = loadh5(dst)
+    assert len(copied) == len(data)
+    for series, copy in zip(data, copied):
+        assert copy['y'].filename == dst
+        np.testing.assert_array_equal(np.asarray(copy['y']), series['y'])
+
+
+def test_save_lazy_session_to_new_file(tmp_path):
+    src = str(tmp_path / 'a.h5')
+    dst = str(tmp_path / 'c.h5')
+    saveh5(src, makeData())
+    tsa = TimeSeriesAnalyzer()
+    tsa.open(src)
+    tsa.save(dst)
+    tsa.open(dst)
+    assert len(tsa.data) == 3
+    np.testing.assert_array_equal(np.asarray(tsa.data[2]['y']), makeData()[2]['y'])
+
+
+def test_saveh5_overwrite_foreign_file_keeps_caller_data(tmp_path):
+    path = str(tmp_path / 'foreign.h5')
+    y = np.arange(5000, dtype=float)
+    with h5py.File(path, 'w') as file:
+        file.create_dataset('y', data=y)
+        handle = LazyArray.fromDataset(file['y'])
+    data = [{'y': handle, 'name': 'y'}]
+    saveh5(path, data)
+    assert data[0]['y'] is handle
+    np.testing.assert_array_equal(np.asarray(handle), y)
+    np.testing.assert_array_equal(np.asarray(loadh5(path)[0]['y']), y)
@@ -0,0 +1,91 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQtTimeSeriesAnalyzer import (
+    TimeSeriesAnalyzer, mergeIntervals, maskRanges, maskedValues, regionIndexes, measureRegions, polyfitRegions
+    )
+
+
+def referenceMasked(x, intervals):
+    # whether each sample is within any of the intervals
+    x = np.asarray(x)
+    masked = np.zeros(len(x), dtype=bool)
+    for xmin, xmax in intervals:
+        masked |= (x >= xmin) & (x <= xmax)
+    return masked
+
+
+def randomIntervals(rng, n):
+    starts = rng.uniform(0, 10, n)
+    return np.stack([starts, starts + rng.uniform(0, 2, n)], axis=1)
+
+
+def test_mergeIntervals():
+    assert mergeIntervals([]).shape == (0, 2)
+    np.testing.assert_array_equal(mergeIntervals([(5, 6), (1, 3), (2, 4), (4, 4.5), (7, 8)]), [[1, 4.5], [5, 6], [7, 8]])
+    rng = np.random.default_rng(5)
+    x = np.linspace(-1, 13, 2001)
+    for n in [1, 5, 20]:
+        intervals = randomIntervals(rng, n)
+        merged = mergeIntervals(intervals)
+        assert np.all(merged[1:, 0] > merged[:-1, 1])
+        np.testing.assert_array_equal(referenceMasked(x, merged), referenceMasked(x, intervals))
+
+
+def test_maskRanges_and_maskedValues():
+    rng = np.random.default_rng(6)
+    x = np.sort(rng.uniform(-1, 13, 1000))
+    y = rng.standard_normal(len(x))
+    mask = mergeIntervals(randomIntervals(rng, 8))
+    expected = referenceMasked(x, mask)
+    ranges = np.zeros(len(x), dtype=bool)
+    for start, stop in zip(*maskRanges(x, mask)):
+        ranges[start:stop] = True
+    np.testing.assert_array_equal(ranges, expected)
+    np.testing.assert_array_equal(np.isnan(maskedValues(x, y, mask)), expected)
+    np.testing.assert_array_equal(maskedValues(x, y, mask)[~expected], y[~expected])
+    np.testing.assert_array_equal(regionIndexes(x, [(0, 5), (4, 8)], mask), np.flatnonzero(referenceMasked(x, [(0, 8)]) & ~expected))
+
+
+@pytest.mark.parametrize('measurementType', ['mean', 'median', 'max', 'std'])
+def test_measureRegions_excludes_masked_samples(measurementType):
+    rng = np.random.default_rng(7)
+    xs = [np.linspace(0, 10, 1001) for i in range(3)]
+    ys = [rng.standard_normal(1001) for x in xs]
+    masks = [mergeIntervals([(1, 2), (6, 6.5)]), None, mergeIntervals([(0, 10)])]
+    regions = [(0, 3), (5, 7)]
+    mx, my = measureRegions(xs, ys, regions, measurementType, masks)
+    for i, (x, y, mask) in enumerate(zip(xs, ys, masks)):
+        keep = ~referenceMasked(x, [] if mask is None else mask)
+        for j, region in enumerate(regions):
+            inRegion = referenceMasked(x, [region]) & keep
+            if not inRegion.any():
+                assert np.isnan(my[i, j])
+                continue
+            expected = np.max(y[inRegion]) if measurementType == 'max' else getattr(np, measurementType)(y[inRegion])
+            np.testing.assert_allclose(my[i, j], expected)
+            if measurementType == 'max':
+                assert mx[i, j] == x[inRegion][np.argmax(y[inRegion])]
+
+
+def test_polyfit_and_maskSeries():
+    x = np.linspace(0, 1, 101)
+    y = 3 * x + 1
+    y[40:50] = 100
+    tsa = TimeSeriesAnalyzer()
+    tsa.data = [{'x': x, 'y': y.copy(), 'episode': i} for i in range(4)]
+    tsa.maskSeries([(0.395, 0.495)])
+    masks = tsa.seriesAttr('mask')
+    assert all(mask is masks[0] for mask in masks)
+    fit = polyfitRegions([x], [y], [(0, 1)], 1, masks[:1])[0]
+    np.testing.assert_allclose(fit.convert().coef, [1, 3])
+    tsa.maskSeries([(0.9, 1)], [0])
+    np.testing.assert_array_equal(tsa.seriesAttr('mask', 0), [[0.395, 0.495], [0.9, 1]])
+    assert tsa.seriesAttr('mask', 1) is masks[1]
+    tsa.unmaskSeries([1, 2, 3])
+    assert 'mask' not in tsa.data[1] and 'mask' in tsa.data[0]
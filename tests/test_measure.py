@@ -0,0 +1,49 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQtTimeSeriesAnalyzer import measureRegions, UniformAxis
+
+
+def referenceMeasure(x, y, xmin, xmax, measurementType):
+    # straightforward measurement of one series in one region
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    inRegion = (x >= xmin) & (x <= xmax)
+    inRegion[len(y):] = False
+    if not inRegion.any():
+        return np.nan, np.nan
+    x, y = x[inRegion], y[inRegion]
+    if measurementType in ['min', 'max', 'absmax']:
+        i = {'min': np.argmin(y), 'max': np.argmax(y), 'absmax': np.argmax(np.abs(y))}[measurementType]
+        return x[i], y[i]
+    return (xmin + xmax) / 2, getattr(np, measurementType)(y)
+
+
+def raggedSeries():
+    rng = np.random.default_rng(1)
+    xs = [np.sort(rng.uniform(0, 10, 500)), np.linspace(0, 5, 200), UniformAxis(0, 0.01, 1000), np.arange(3.0)]
+    ys = [rng.standard_normal(len(x)) for x in xs]
+    return xs, ys
+
+
+@pytest.mark.parametrize('measurementType', ['mean', 'median', 'min', 'max', 'absmax', 'var', 'std'])
+def test_measureRegions_matches_reference(measurementType):
+    xs, ys = raggedSeries()
+    regions = [(0, 1), (2.5, 7), (4.9, 5.1), (20, 30)]
+    mx, my = measureRegions(xs, ys, regions, measurementType)
+    assert mx.shape == my.shape == (len(ys), len(regions))
+    for i, (x, y) in enumerate(zip(xs, ys)):
+        for j, (xmin, xmax) in enumerate(regions):
+            expected = referenceMeasure(x, y, xmin, xmax, measurementType)
+            np.testing.assert_allclose([mx[i, j], my[i, j]], expected, rtol=1e-12, atol=1e-12)
+
+
+def test_measureRegions_without_series_or_regions():
+    xs, ys = raggedSeries()
+    assert measureRegions(xs, ys, [])[1].shape == (len(ys), 0)
+    assert measureRegions([], [], [(0, 1)])[1].shape == (0, 1)
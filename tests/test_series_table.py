@@ -0,0 +1,61 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQtTimeSeriesAnalyzer import TimeSeriesAnalyzer
+
+
+def referenceEpisodes(data):
+    # stored episode, else index of the series within all series having the same group and name
+    episodes = []
+    for i, series in enumerate(data):
+        if 'episode' in series:
+            episodes.append(series['episode'])
+            continue
+        bucket = (series.get('group', 0), series.get('name'))
+        episodes.append(sum([(other.get('group', 0), other.get('name')) == bucket for other in data[:i]]))
+    return episodes
+
+
+def checkEpisodes(tsa):
+    expected = referenceEpisodes(tsa.data)
+    indexes = list(range(len(tsa.data)))
+    assert tsa.seriesAttr('episode', indexes) == expected
+    assert [tsa.seriesAttr('episode', i) for i in indexes] == expected
+    for episode in set(expected):
+        assert tsa.seriesIndexes(episodes=[episode]) == [i for i in indexes if expected[i] == episode]
+    assert tsa.seriesEpisodes() == sorted(set(expected))
+
+
+def test_default_episodes_across_append_delete_edit():
+    rng = np.random.default_rng(0)
+    tsa = TimeSeriesAnalyzer()
+    tsa.data = [{'y': np.zeros(3), 'group': int(rng.integers(2)), 'name': str(rng.integers(2))} for i in range(20)]
+    checkEpisodes(tsa)
+    tsa.addSeriesBatch([{'y': np.zeros(3), 'group': int(rng.integers(2))} for i in range(10)])
+    checkEpisodes(tsa)
+    tsa.addSeries(y=np.zeros(3), group=1, name='0')
+    checkEpisodes(tsa)
+    del tsa.data[3]
+    tsa.data.pop(0)
+    checkEpisodes(tsa)
+    tsa.setSeriesAttr('group', 1, 5)
+    tsa.setSeriesAttr('name', 'new', [6, 7])
+    tsa.setSeriesAttr('episode', 100, 8)
+    checkEpisodes(tsa)
+    tsa.data.reverse()
+    checkEpisodes(tsa)
+    edited = [series for series in tsa.data if series.get('episode') == 100][0]
+    tsa.setSeriesAttr('episode', None, edited)
+    checkEpisodes(tsa)
+
+
+def test_non_integer_episodes_are_not_truncated():
+    tsa = TimeSeriesAnalyzer()
+    tsa.data = [{'y': np.zeros(3), 'episode': 1.5}, {'y': np.zeros(3)}, {'y': np.zeros(3), 'episode': 2}]
+    checkEpisodes(tsa)
+    assert tsa.seriesIndexes(episodes=[1]) == [1]
+    assert tsa.seriesIndexes(episodes=[1.5]) == [0]